@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Route the movie API and pages to the async views (config/urls_async.py)
+os.environ.setdefault('WATCHWISH_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+from movies.readiness import start_background_loading  # noqa: E402
+
+start_background_loading()
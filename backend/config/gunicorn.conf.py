@@ -0,0 +1,108 @@
+"""
+Gunicorn config for production serving.
+
+The Django app, the TF-IDF models and the analytics CSVs are loaded once
+in the master and shared copy-on-write by the forked workers:
+
+    gunicorn -c backend/config/gunicorn.conf.py
+
+Environment:
+    WEB_WORKERS         number of worker processes (default 8)
+    WEB_WORKER_CLASS    'sync', 'gthread' or 'uvicorn.workers.UvicornWorker'
+                        (the last one serves config.asgi)
+    WEB_THREADS         threads per gthread worker (default 4)
+    WEB_BIND            listen address (default 0.0.0.0:8000)
+"""
+import gc
+import os
+import threading
+import time
+
+# The master loads the models itself (see when_ready); keep
+# MoviesConfig.ready from starting its background loader thread.
+os.environ.setdefault('WATCHWISH_PRELOAD', '1')
+
+# Pre-fork GC pattern from the gc.freeze() docs: no collections in the
+# master while the app and models load (a collection writes to every
+# object header it visits and would dirty pages the workers should
+# share), freeze right before forking, re-enable in each worker.
+gc.disable()
+
+chdir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+bind = os.getenv('WEB_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_WORKERS', 8))
+worker_class = os.getenv('WEB_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('WEB_THREADS', 4))
+preload_app = True
+wsgi_app = 'config.asgi:application' if 'uvicorn' in worker_class.lower() else 'config.wsgi:application'
+timeout = 60
+
+
+def _memory_kb(pid):
+    # RSS and PSS (RSS with shared pages split between the processes that
+    # map them) from /proc; PSS is the honest per-worker cost under CoW
+    stats = {'rss': 0, 'pss': 0, 'shared': 0}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                value = int(rest.split()[0]) if rest.split() and rest.split()[0].isdigit() else 0
+                if key == 'Rss':
+                    stats['rss'] = value
+                elif key == 'Pss':
+                    stats['pss'] = value
+                elif key in ('Shared_Clean', 'Shared_Dirty'):
+                    stats['shared'] += value
+    except OSError:
+        pass
+    return stats
+
+
+def _report_memory(server):
+    # Wait for the initial workers to boot, then log one line per process
+    deadline = time.time() + 120
+    while len(server.WORKERS) < server.num_workers and time.time() < deadline:
+        time.sleep(1)
+    time.sleep(2)
+
+    master = _memory_kb(os.getpid())
+    server.log.info("memory master pid=%s rss=%.1fMB pss=%.1fMB",
+                    os.getpid(), master['rss'] / 1024, master['pss'] / 1024)
+    total_rss = total_pss = 0
+    for pid in list(server.WORKERS):
+        stats = _memory_kb(pid)
+        total_rss += stats['rss']
+        total_pss += stats['pss']
+        server.log.info("memory worker pid=%s rss=%.1fMB pss=%.1fMB shared=%.1fMB",
+                        pid, stats['rss'] / 1024, stats['pss'] / 1024, stats['shared'] / 1024)
+    server.log.info("memory total for %d workers: rss=%.1fMB pss=%.1fMB (pss incl. master %.1fMB)",
+                    len(server.WORKERS), total_rss / 1024, total_pss / 1024,
+                    (total_pss + master['pss']) / 1024)
+
+
+def when_ready(server):
+    from movies.analytics import DashboardAnalytics, MLMovieAnalyzer
+
+    started = time.time()
+    MLMovieAnalyzer.initialize()
+    DashboardAnalytics.load_data()
+    server.log.info("Preloaded ML and analytics data in %.1fs", time.time() - started)
+
+    # Move everything allocated so far into the permanent generation so the
+    # cyclic GC in the workers never touches (and so never copies) those pages
+    gc.freeze()
+    server.log.info("gc.freeze(): %d objects frozen", gc.get_freeze_count())
+
+    threading.Thread(target=_report_memory, args=(server,), daemon=True).start()
+
+
+def post_fork(server, worker):
+    # Collections resume in the worker, over what it allocates itself
+    gc.enable()
+
+    # Each worker opens its own Mongo pool and runs its own artifact
+    # watcher (threads don't survive fork)
+    from movies.artifacts import start_watcher
+    from movies.db import _reset_after_fork
+    _reset_after_fork()
+    start_watcher()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 from pathlib import Path
+import ipaddress
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,16 +43,23 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'movies.metrics.MetricsMiddleware',
+    'movies.db.MongoTimeoutMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'movies.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
+if os.getenv('WATCHWISH_ASYNC_VIEWS') == '1':
+    # Set by config/asgi.py: same routes, async views for the Mongo-bound ones
+    ROOT_URLCONF = 'config.urls_async'
 
 TEMPLATES = [
     {
@@ -89,8 +97,55 @@ MONGODB_SETTINGS = {
     'db_name': os.getenv('MONGODB_DB_NAME', 'watchwish_db'),
     'username': os.getenv('MONGODB_USERNAME', ''),
     'password': os.getenv('MONGODB_PASSWORD', ''),
+    # Connection pool and timeouts (per worker process)
+    'max_pool_size': int(os.getenv('MONGODB_MAX_POOL_SIZE', 100)),
+    'min_pool_size': int(os.getenv('MONGODB_MIN_POOL_SIZE', 0)),
+    'server_selection_timeout_ms': int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+    'connect_timeout_ms': int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', 5000)),
+    'socket_timeout_ms': int(os.getenv('MONGODB_SOCKET_TIMEOUT_MS', 0)),
+    # Deadline for each web request's Mongo work, see MongoTimeoutMiddleware (0 = none)
+    'max_time_ms': int(os.getenv('MONGODB_MAX_TIME_MS', 0)),
+    # Wire compression, in preference order; unavailable ones are skipped
+    'compressors': [c for c in os.getenv('MONGODB_COMPRESSORS', 'zstd,snappy,zlib').split(',') if c],
+    'read_preference': os.getenv('MONGODB_READ_PREFERENCE', 'primary'),
 }
 
+# How the TF-IDF analyzer and dashboard CSVs are loaded: 'eager' (in the
+# background when a server starts), 'lazy' (on first use) or 'off'.
+ML_LOADING = os.getenv('WATCHWISH_ML_LOADING', 'eager')
+
+# Versioned model artifacts (see movies/artifacts.py) and how often each
+# process checks the `current` pointer for a new version (0 disables).
+ML_ARTIFACTS_DIR = os.getenv('WATCHWISH_ARTIFACTS_DIR', str(BASE_DIR.parent / 'data' / 'artifacts'))
+ML_ARTIFACTS_POLL_SECONDS = int(os.getenv('WATCHWISH_ARTIFACTS_POLL_SECONDS', 30))
+
+# JSON API responses at least this large are gzipped when the client
+# accepts it (0 disables). See movies/responses.py.
+JSON_GZIP_MIN_BYTES = int(os.getenv('JSON_GZIP_MIN_BYTES', 64 * 1024))
+
+# Request metrics (see movies/metrics.py). Requests issuing more Mongo
+# commands than the threshold are logged and counted (0 disables).
+# /metrics is served to admins, to `Authorization: Bearer <token>` when a
+# token is set, and to METRICS_ALLOWED_NETWORKS; to nobody else.
+METRICS_QUERY_THRESHOLD = int(os.getenv('METRICS_QUERY_THRESHOLD', 20))
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', '1') == '1'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Scrapers allowed without the token, e.g. '10.0.0.0/8'. REMOTE_ADDR is
+# the proxy's address behind a reverse proxy, so leave this empty there.
+METRICS_ALLOWED_NETWORKS = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in os.getenv('METRICS_ALLOWED_NETWORKS', '').split(',') if network.strip()
+]
+
+# On-demand profiling (see movies/profiling.py): admins add ?__profile=1
+# or an `X-Profile: 1` header; a sample rate > 0 also profiles that share
+# of all requests. Engine 'sampler' (statistical) or 'cprofile'.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_ENGINE = os.getenv('PROFILING_ENGINE', 'sampler')
+PROFILING_INTERVAL_MS = float(os.getenv('PROFILING_INTERVAL_MS', 2))
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR.parent / 'data' / 'profiles'))
+PROFILING_KEEP = int(os.getenv('PROFILING_KEEP', 200))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
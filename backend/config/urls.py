@@ -27,12 +27,19 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('django.contrib.auth.urls')),
     path('accounts/signup/', views.signup, name='signup'),
-    path('api/', include('movies.urls')),
+    # Before the include, whose 'movies/<movie_id>/' would otherwise match
     path('api/movies/rate/', views.rate_movie, name='rate_movie'),
+    path('api/', include('movies.urls')),
     path('', views.index, name='index'),
     path('user-recommendations/', views.user_recommendations, name='user_recommendations'),
     path('movie/<str:movie_id>/', views.movie_detail, name='movie_detail'),
     path('dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('dashboard/api/', views.admin_dashboard_api, name='admin_dashboard_api'),
     path('dashboard/movies/', views.admin_movies_list, name='admin_movies_list'),
+    path('dashboard/api/models/', views.admin_model_versions, name='admin_model_versions'),
+    path('dashboard/api/memory/', views.admin_memory, name='admin_memory'),
+    path('dashboard/api/profiles/', views.admin_profiles, name='admin_profiles'),
+    path('dashboard/api/profiles/<str:profile_id>/', views.admin_profile, name='admin_profile'),
+    path('healthz/ready', views.healthz_ready, name='healthz_ready'),
+    path('metrics', views.metrics, name='metrics'),
 ]
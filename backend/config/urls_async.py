@@ -0,0 +1,17 @@
+"""
+URL configuration used when serving over ASGI (see config/asgi.py).
+
+Same routes as config.urls, with the Mongo-bound movie API and pages
+pointed at their async versions in movies.async_views.
+"""
+from django.urls import path
+from movies import async_views
+from . import urls
+
+urlpatterns = [
+    path('api/movies/', async_views.list_movies, name='list_movies'),
+    path('api/movies/rate/', async_views.rate_movie, name='rate_movie'),
+    path('api/movies/<str:movie_id>/', async_views.get_movie, name='get_movie'),
+    path('user-recommendations/', async_views.user_recommendations, name='user_recommendations'),
+    path('movie/<str:movie_id>/', async_views.movie_detail, name='movie_detail'),
+] + urls.urlpatterns
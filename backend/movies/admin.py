@@ -2,10 +2,45 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.db import models
 from .models import User
-from .services import MovieService, DashboardAnalytics
+from .services import MovieService
+from . import counters
 from .db import get_movies_collection, get_user_ratings_collection, get_user_recommendations_collection
 import json
 
+
+def _pop_params(request, *names):
+    # Read our own GET params and drop them from request.GET: the admin
+    # ChangeList would take them for field lookups and redirect with ?e=1
+    params = request.GET.copy()
+    values = {name: params.pop(name, [''])[-1].strip() for name in names}
+    request.GET = params
+    return values
+
+def _int_param(value, default=None):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def _float_param(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _paginate(total, page, per_page):
+    # (pagination context, number of documents to skip)
+    num_pages = max(1, -(-total // per_page))
+    page = min(max(page, 1), num_pages)
+    return {
+        'page': page,
+        'num_pages': num_pages,
+        'per_page': per_page,
+        'total': total,
+        'has_previous': page > 1,
+        'has_next': page < num_pages,
+    }, (page - 1) * per_page
+
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'role', 'is_staff', 'is_active', 'date_joined', 'last_login')
@@ -52,10 +87,10 @@ class MovieAdmin(admin.ModelAdmin):
         
         collection = get_movies_collection()
         
-        total_movies = collection.count_documents({})
-        
-        movies_with_budget = collection.count_documents({'budget': {'$gt': 0}})
-        movies_with_revenue = collection.count_documents({'revenue': {'$gt': 0}})
+        stats = counters.get()
+        total_movies = stats['movies_total']
+        movies_with_budget = stats['movies_with_budget']
+        movies_with_revenue = stats['movies_with_revenue']
         
         try:
             movies = list(collection.find().limit(100).sort('movieId', -1))
@@ -105,42 +140,55 @@ class RatingsAdmin(admin.ModelAdmin):
         
         collection = get_user_ratings_collection()
         
-        total_ratings = collection.count_documents({})
-        
-        avg_rating_pipeline = [
-            {'$group': {'_id': None, 'avg_rating': {'$avg': '$score'}}}
-        ]
-        
-        try:
-            avg_result = list(collection.aggregate(avg_rating_pipeline))
-            avg_rating = round(avg_result[0]['avg_rating'], 2) if avg_result else 0
-        except Exception as e:
-            print(f"Error calculating average rating: {e}")
-            avg_rating = 0
+        params = _pop_params(request, 'page', 'per_page', 'user', 'movie', 'min_score', 'max_score')
+        query = {}
+        if _int_param(params['user']) is not None:
+            query['userId'] = _int_param(params['user'])
+        if _int_param(params['movie']) is not None:
+            query['movieId'] = _int_param(params['movie'])
+        score_range = {}
+        if _float_param(params['min_score']) is not None:
+            score_range['$gte'] = _float_param(params['min_score'])
+        if _float_param(params['max_score']) is not None:
+            score_range['$lte'] = _float_param(params['max_score'])
+        if score_range:
+            query['score'] = score_range
         
-        unique_users = collection.distinct('userId')
-        unique_movies = collection.distinct('movieId')
+        stats = counters.get()
+        total_ratings = stats['ratings_total']
+        avg_rating = round(stats['ratings_score_sum'] / total_ratings, 2) if total_ratings else 0
+        unique_users = stats['ratings_users']
+        unique_movies = stats['ratings_movies']
         
         try:
-            ratings = list(collection.find().limit(100).sort('userId', -1))
+            matching = collection.count_documents(query) if query else total_ratings
+            per_page = min(max(_int_param(params['per_page'], 100), 1), 500)
+            pagination, skip = _paginate(matching, _int_param(params['page'], 1), per_page)
+            
+            # Newest users first; matches the (userId, movieId) index
+            ratings = list(
+                collection.find(query)
+                .sort([('userId', -1), ('movieId', -1)])
+                .skip(skip)
+                .limit(per_page)
+            )
+            titles = MovieService.get_movie_titles([rating['movieId'] for rating in ratings])
             for rating in ratings:
                 rating['_id'] = str(rating['_id'])
-                
-                movie = MovieService.get_movie(rating['movieId'])
-                if movie:
-                    rating['movie_title'] = movie.get('title', 'Unknown')
-                else:
-                    rating['movie_title'] = 'Unknown'
+                rating['movie_title'] = titles.get(rating['movieId'], 'Unknown')
             
             extra_context['ratings'] = ratings
+            extra_context['pagination'] = pagination
         except Exception as e:
             print(f"Error fetching ratings: {e}")
             extra_context['ratings'] = []
+            extra_context['pagination'] = _paginate(0, 1, 100)[0]
         
+        extra_context['filters'] = params
         extra_context['total_ratings'] = total_ratings
         extra_context['avg_rating'] = avg_rating
-        extra_context['unique_users'] = len(unique_users)
-        extra_context['unique_movies'] = len(unique_movies)
+        extra_context['unique_users'] = unique_users
+        extra_context['unique_movies'] = unique_movies
         
         return super().changelist_view(request, extra_context)
 
@@ -172,42 +220,71 @@ class RecommendationsAdmin(admin.ModelAdmin):
         
         collection = get_user_recommendations_collection()
         
-        total_docs = collection.count_documents({})
+        params = _pop_params(request, 'page', 'per_page', 'user', 'model')
+        query = {}
+        if _int_param(params['user']) is not None:
+            query['userId'] = _int_param(params['user'])
+        if params['model']:
+            query['model'] = params['model']
         
-        unique_users = collection.distinct('userId')
+        stats = counters.get()
+        total_docs = stats['recommendations_total']
+        unique_users = stats['recommendations_users']
         
         model_counts = {}
         try:
-            docs = collection.find()
-            for doc in docs:
-                model = doc.get('model', 'unknown')
-                model_counts[model] = model_counts.get(model, 0) + 1
+            # Only the model field reaches the $group, not the arrays
+            pipeline = [
+                {'$project': {'_id': 0, 'model': 1}},
+                {'$group': {'_id': '$model', 'count': {'$sum': 1}}},
+            ]
+            for row in collection.aggregate(pipeline):
+                model_counts[row['_id'] or 'unknown'] = row['count']
         except Exception as e:
             print(f"Error counting models: {e}")
         
         try:
-            recs = list(collection.find().limit(50).sort('userId', -1))
+            matching = collection.count_documents(query) if query else total_docs
+            per_page = min(max(_int_param(params['per_page'], 50), 1), 500)
+            pagination, skip = _paginate(matching, _int_param(params['page'], 1), per_page)
+            
+            # Each listed document comes back with its array size and first
+            # entry instead of the whole recommendation list. Both sort keys
+            # descend so the sort walks the (userId, model) index backwards.
+            recs = list(collection.aggregate([
+                {'$match': query},
+                {'$sort': {'userId': -1, 'model': -1}},
+                {'$skip': skip},
+                {'$limit': per_page},
+                {'$set': {
+                    'rec_count': {'$size': {'$ifNull': ['$recommendations', []]}},
+                    'top_rec': {'$arrayElemAt': ['$recommendations', 0]},
+                }},
+                {'$project': {'recommendations': 0}},
+            ]))
+            titles = MovieService.get_movie_titles([rec['top_rec']['movieId'] for rec in recs if rec.get('top_rec')])
             for rec in recs:
                 rec['_id'] = str(rec['_id'])
-                rec['rec_count'] = len(rec.get('recommendations', []))
                 
-                if rec.get('recommendations'):
-                    top_rec = rec['recommendations'][0]
-                    movie = MovieService.get_movie(top_rec['movieId'])
-                    if movie:
-                        rec['top_movie'] = movie.get('title', 'Unknown')
+                top_rec = rec.pop('top_rec', None)
+                if top_rec:
+                    if top_rec['movieId'] in titles:
+                        rec['top_movie'] = titles[top_rec['movieId']]
                         rec['top_score'] = round(top_rec.get('score', 0), 3)
                     else:
                         rec['top_movie'] = 'Unknown'
                         rec['top_score'] = 0
             
             extra_context['recommendations'] = recs
+            extra_context['pagination'] = pagination
         except Exception as e:
             print(f"Error fetching recommendations: {e}")
             extra_context['recommendations'] = []
+            extra_context['pagination'] = _paginate(0, 1, 50)[0]
         
+        extra_context['filters'] = params
         extra_context['total_docs'] = total_docs
-        extra_context['unique_users'] = len(unique_users)
+        extra_context['unique_users'] = unique_users
         extra_context['model_counts'] = model_counts
         
         return super().changelist_view(request, extra_context)
@@ -236,27 +313,18 @@ class AnalyticsAdmin(admin.ModelAdmin):
         return request.user.is_staff
     
     def changelist_view(self, request, extra_context=None):
+        from .analytics import DashboardAnalytics
+        
         extra_context = extra_context or {}
         
-        DashboardAnalytics.load_data()
+        DashboardAnalytics.ensure_loaded()
         
         kpis = DashboardAnalytics.get_financial_kpis()
         genre_stats = DashboardAnalytics.get_genre_statistics()
         demographics = DashboardAnalytics.get_user_demographics()
         
         if not kpis:
-            all_movies = MovieService.get_all_movies(limit=10000)
-            total_movies = len(all_movies)
-            total_revenue = sum(m.get('revenue', 0) for m in all_movies if m.get('revenue', 0) > 0)
-            total_budget = sum(m.get('budget', 0) for m in all_movies if m.get('budget', 0) > 0)
-            
-            kpis = {
-                'total_movies': total_movies,
-                'total_revenue_b': round(total_revenue / 1_000_000_000, 1),
-                'total_budget_b': round(total_budget / 1_000_000_000, 1),
-                'avg_roi': round(total_revenue / total_budget, 1) if total_budget > 0 else 0,
-                'avg_rating': 0
-            }
+            kpis = MovieService.get_catalog_kpis()
         
         if not genre_stats:
             genre_stats = []
@@ -273,8 +341,9 @@ class AnalyticsAdmin(admin.ModelAdmin):
         extra_context['genre_counts_json'] = json.dumps(genre_counts)
         extra_context['genre_revenues_json'] = json.dumps(genre_revenues)
         
-        total_users = User.objects.count()
-        admin_users = User.objects.filter(role='admin').count()
+        stats = counters.get()
+        total_users = stats['users_total']
+        admin_users = stats['users_admin']
         regular_users = total_users - admin_users
         
         extra_context['total_users'] = total_users
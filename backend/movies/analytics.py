@@ -0,0 +1,576 @@
+import os
+import pickle
+import re
+import threading
+import time
+
+import pandas as pd
+
+from . import artifacts, memory, readiness
+
+# The pandas/scikit-learn backed services: the TF-IDF concept analyzer and
+# the dashboard analytics over the CSV exports. Kept apart from
+# movies.services so the API, admin and management commands don't import
+# pandas and scikit-learn until one of these is actually used.
+#
+# Each class keeps everything loaded from one artifact version (see
+# movies.artifacts) in a single `_state` dict. A reload builds a new dict
+# off to the side and swaps it in with one assignment; methods read
+# `_state` once, so in-flight requests finish on the version they started
+# with.
+
+
+class MLMovieAnalyzer:
+    _state = None
+    _initialized = False
+    _lock = threading.Lock()
+    
+    @classmethod
+    def initialize(cls):
+        if cls._initialized:
+            return True
+        if readiness.model_loading_mode() == 'off':
+            readiness.mark('ml_analyzer', readiness.DISABLED)
+            return False
+        
+        # The startup thread and concurrent first requests load only once
+        with cls._lock:
+            if cls._initialized:
+                return True
+            return readiness.run('ml_analyzer', cls._load)
+    
+    @classmethod
+    def _load(cls):
+        state = cls._read(*artifacts.resolve())
+        if state is None:
+            return False
+        cls._state = state
+        cls._initialized = True
+        print("ML Analyzer initialized successfully with pre-trained .pkl models!")
+        return True
+    
+    @classmethod
+    def _read(cls, version, data_dir):
+        started = time.time()
+        try:
+            vectorizer_path = os.path.join(data_dir, 'tfidf_vectorizer.pkl')
+            matrix_path = os.path.join(data_dir, 'tfidf_matrix.pkl')
+            processed_data_path = os.path.join(data_dir, 'processed_data.pkl')
+            
+            if not all(os.path.exists(p) for p in [vectorizer_path, matrix_path, processed_data_path]):
+                print(f"Missing one or more required .pkl files in {data_dir}")
+                return None
+            
+            print(f"Loading pre-trained models from {data_dir}...")
+            
+            with open(vectorizer_path, 'rb') as f:
+                tfidf_vectorizer = pickle.load(f)
+                
+            with open(matrix_path, 'rb') as f:
+                tfidf_matrix = pickle.load(f)
+                
+            with open(processed_data_path, 'rb') as f:
+                movies_df = pickle.load(f)
+                
+            print(f"Loaded {len(movies_df)} movies from processed_data.pkl")
+            print(f"TF-IDF matrix shape: {tfidf_matrix.shape}")
+            
+            films_df = None
+            films_csv_path = os.path.join(data_dir, 'Films.csv')
+            if os.path.exists(films_csv_path):
+                print(f"Loading Films data from: {films_csv_path}")
+                films_df = pd.read_csv(films_csv_path)
+            
+            return {
+                'version': version,
+                'path': data_dir,
+                'vectorizer': tfidf_vectorizer,
+                'matrix': tfidf_matrix,
+                'movies_df': movies_df,
+                'films_df': films_df,
+                'loaded_at': time.time(),
+                'load_seconds': round(time.time() - started, 3),
+            }
+            
+        except Exception as e:
+            print(f"ML Analyzer initialization failed: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+    
+    @classmethod
+    def reload(cls, version, data_dir):
+        # Called from the artifact watcher thread
+        state = cls._read(version, data_dir)
+        if state is None:
+            return False
+        
+        # Run one query against the new models before the swap, so the
+        # first real request doesn't pay any first-call cost
+        from sklearn.metrics.pairwise import cosine_similarity
+        cosine_similarity(state['vectorizer'].transform(['warm up']), state['matrix'])
+        
+        with cls._lock:
+            cls._state = state
+            cls._initialized = True
+        print(f"ML Analyzer switched to artifact version {version}")
+        return True
+    
+    @classmethod
+    def is_loaded(cls):
+        return cls._state is not None
+    
+    @classmethod
+    def version(cls):
+        state = cls._state
+        return state['version'] if state else None
+    
+    @classmethod
+    def describe(cls):
+        state = cls._state
+        if state is None:
+            return None
+        return {key: state[key] for key in ('version', 'path', 'loaded_at', 'load_seconds')}
+    
+    @classmethod
+    def analyze_movie_concept(cls, concept_text, top_n=5):
+        if not cls._initialized:
+            if not cls.initialize():
+                return []
+        state = cls._state
+        films_df = state['films_df']
+        
+        # Unpickling the vectorizer has already imported scikit-learn
+        from sklearn.metrics.pairwise import cosine_similarity
+        
+        try:
+            cleaned_concept = re.sub(r'[^\w\s]', ' ', concept_text.lower())
+            concept_vector = state['vectorizer'].transform([cleaned_concept])
+            
+            similarities = cosine_similarity(concept_vector, state['matrix']).flatten()
+            top_indices = similarities.argsort()[-top_n:][::-1]
+            
+            results = []
+            for idx in top_indices:
+                if similarities[idx] > 0.01:
+                    movie_data = state['movies_df'].iloc[idx]
+                    
+                    tmdb_id = movie_data.get('tmdbId', movie_data.get('tmdb_id', 0))
+                    
+                    budget = 0
+                    revenue = 0
+                    vote_average = 0
+                    release_date = ''
+                    description = str(movie_data.get('description', ''))
+                    poster = str(movie_data.get('poster_url', ''))
+                    
+                    if films_df is not None and pd.notna(tmdb_id):
+                        film_match = films_df[films_df['tmdbId'] == int(tmdb_id)]
+                        if not film_match.empty:
+                            film = film_match.iloc[0]
+                            budget = int(film['budget']) if pd.notna(film.get('budget')) else 0
+                            revenue = int(film['revenue']) if pd.notna(film.get('revenue')) else 0
+                            vote_average = round(float(film['vote_average']), 1) if pd.notna(film.get('vote_average')) else 0
+                            release_date = str(film.get('release_date', ''))
+                            if pd.notna(film.get('description')) and str(film.get('description')):
+                                description = str(film.get('description'))
+                            if pd.notna(film.get('poster_url')) and str(film.get('poster_url')):
+                                poster = str(film.get('poster_url'))
+                    
+                    results.append({
+                        'movieId': int(tmdb_id) if pd.notna(tmdb_id) else 0,
+                        'title': str(movie_data['title']),
+                        'similarity': round(float(similarities[idx] * 100), 1),
+                        'genres': str(movie_data['genres']),
+                        'description': description,
+                        'poster': poster,
+                        'budget': budget,
+                        'revenue': revenue,
+                        'vote_average': vote_average,
+                        'release_date': release_date
+                    })
+            
+            return results
+            
+        except Exception as e:
+            print(f"Concept analysis failed: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
+
+
+class DashboardAnalytics:
+    _state = None
+    _loaded = False
+    _lock = threading.RLock()
+    
+    @classmethod
+    def ensure_loaded(cls):
+        # Load the CSVs once; missing files are not retried on every call
+        if cls._loaded:
+            return True
+        with cls._lock:
+            if cls._loaded:
+                return True
+            return cls.load_data()
+    
+    @classmethod
+    def load_data(cls):
+        if readiness.model_loading_mode() == 'off':
+            readiness.mark('dashboard_analytics', readiness.DISABLED)
+            return False
+        with cls._lock:
+            loaded = readiness.run('dashboard_analytics', cls._load)
+            cls._loaded = True
+            return loaded
+    
+    @classmethod
+    def _load(cls):
+        state = cls._read(*artifacts.resolve())
+        if state is None:
+            return False
+        cls._state = state
+        return state['users_df'] is not None or state['films_df'] is not None
+    
+    @classmethod
+    def _read(cls, version, data_dir):
+        started = time.time()
+        try:
+            users_path = os.path.join(data_dir, 'users.csv')
+            films_path = os.path.join(data_dir, 'Films.csv')
+            
+            users_df = None
+            if os.path.exists(users_path):
+                print(f"Loading users from: {users_path}")
+                users_df = pd.read_csv(users_path)
+                print(f"Loaded {len(users_df)} users")
+            else:
+                print(f"Users file not found at: {users_path}")
+            
+            films_df = None
+            if os.path.exists(films_path):
+                print(f"Loading films from: {films_path}")
+                films_df = pd.read_csv(films_path)
+                print(f"Loaded {len(films_df)} films")
+                
+                films_df['revenue'] = pd.to_numeric(films_df['revenue'], errors='coerce').fillna(0)
+                films_df['budget'] = pd.to_numeric(films_df['budget'], errors='coerce').fillna(0)
+                films_df['roi'] = films_df.apply(
+                    lambda row: round(row['revenue'] / row['budget'], 2) if row['budget'] > 0 else 0,
+                    axis=1
+                )
+                print("Films data processed successfully")
+            else:
+                print(f"Films file not found at: {films_path}")
+            
+            return {
+                'version': version,
+                'path': data_dir,
+                'users_df': users_df,
+                'films_df': films_df,
+                # genre -> audience profile, built on first request
+                'audience': None,
+                'loaded_at': time.time(),
+                'load_seconds': round(time.time() - started, 3),
+            }
+        except Exception as e:
+            print(f"Failed to load analytics data: {e}")
+            return None
+    
+    @classmethod
+    def reload(cls, version, data_dir):
+        # Called from the artifact watcher thread
+        state = cls._read(version, data_dir)
+        if state is None:
+            return False
+        
+        # Rebuild the audience profiles too if the old version had them, so
+        # the swap doesn't leave a cold cache behind
+        previous = cls._state
+        if previous is not None and previous['audience'] is not None:
+            state['audience'] = cls._build_audience(data_dir)
+        
+        with cls._lock:
+            cls._state = state
+            cls._loaded = True
+        print(f"Dashboard analytics switched to artifact version {version}")
+        return True
+    
+    @classmethod
+    def current(cls):
+        cls.ensure_loaded()
+        return cls._state or {}
+    
+    @classmethod
+    def is_loaded(cls):
+        return cls._state is not None
+    
+    @classmethod
+    def version(cls):
+        state = cls._state
+        return state['version'] if state else None
+    
+    @classmethod
+    def describe(cls):
+        state = cls._state
+        if state is None:
+            return None
+        return {key: state[key] for key in ('version', 'path', 'loaded_at', 'load_seconds')}
+    
+    @classmethod
+    def get_user_demographics(cls):
+        users_df = cls.current().get('users_df')
+        
+        if users_df is None:
+            return {}
+        
+        try:
+            demographics = {
+                'total_users': len(users_df),
+                'by_gender': users_df['gender'].value_counts().to_dict(),
+                'by_age_group': users_df['age_group'].value_counts().to_dict(),
+                'by_occupation': users_df['occupation'].value_counts().to_dict()
+            }
+            return demographics
+        except Exception as e:
+            print(f"Demographics analysis failed: {e}")
+            return {}
+    
+    @classmethod
+    def get_financial_kpis(cls):
+        films_df = cls.current().get('films_df')
+        
+        if films_df is None:
+            return {}
+        
+        try:
+            valid_films = films_df[(films_df['budget'] > 0) & (films_df['revenue'] > 0)]
+            
+            total_revenue = valid_films['revenue'].sum()
+            total_budget = valid_films['budget'].sum()
+            avg_roi = valid_films['roi'].mean()
+            avg_rating = films_df['vote_average'].mean()
+            
+            return {
+                'total_movies': len(films_df),
+                'total_revenue_b': round(total_revenue / 1_000_000_000, 1),
+                'total_budget_b': round(total_budget / 1_000_000_000, 1),
+                'avg_roi': round(avg_roi, 1),
+                'avg_rating': round(avg_rating, 1),
+                'profitable_ratio': round(len(valid_films[valid_films['roi'] > 1]) / len(valid_films) * 100, 1)
+            }
+        except Exception as e:
+            print(f"KPI calculation failed: {e}")
+            return {}
+    
+    @classmethod
+    def get_genre_statistics(cls):
+        films_df = cls.current().get('films_df')
+        
+        if films_df is None:
+            return []
+        
+        try:
+            genre_stats = {}
+            
+            for _, row in films_df.iterrows():
+                genres = str(row.get('genres', '')).split('|')
+                budget = row.get('budget', 0)
+                revenue = row.get('revenue', 0)
+                roi = row.get('roi', 0)
+                
+                for genre in genres:
+                    genre = genre.strip()
+                    if not genre or genre == 'nan':
+                        continue
+                    
+                    if genre not in genre_stats:
+                        genre_stats[genre] = {
+                            'genre': genre,
+                            'count': 0,
+                            'total_budget': 0,
+                            'total_revenue': 0,
+                            'budget_count': 0,
+                            'revenue_count': 0,
+                            'roi_sum': 0,
+                            'roi_count': 0
+                        }
+                    
+                    genre_stats[genre]['count'] += 1
+                    
+                    if budget > 0:
+                        genre_stats[genre]['total_budget'] += budget
+                        genre_stats[genre]['budget_count'] += 1
+                    
+                    if revenue > 0:
+                        genre_stats[genre]['total_revenue'] += revenue
+                        genre_stats[genre]['revenue_count'] += 1
+                    
+                    if roi > 0:
+                        genre_stats[genre]['roi_sum'] += roi
+                        genre_stats[genre]['roi_count'] += 1
+            
+            results = []
+            for genre, data in genre_stats.items():
+                avg_budget = (data['total_budget'] / data['budget_count'] / 1_000_000) if data['budget_count'] > 0 else 0
+                avg_revenue = (data['total_revenue'] / data['revenue_count'] / 1_000_000) if data['revenue_count'] > 0 else 0
+                avg_roi = (data['roi_sum'] / data['roi_count']) if data['roi_count'] > 0 else 0
+                
+                results.append({
+                    'genre': genre,
+                    'count': data['count'],
+                    'avg_budget': round(avg_budget, 0),
+                    'avg_revenue': round(avg_revenue, 0),
+                    'avg_roi': round(avg_roi, 1)
+                })
+            
+            results.sort(key=lambda x: x['avg_roi'], reverse=True)
+            return results
+            
+        except Exception as e:
+            print(f"Genre stats calculation failed: {e}")
+            return []
+    
+    @classmethod
+    def get_top_movies(cls, limit=10, genre=None):
+        films_df = cls.current().get('films_df')
+        
+        if films_df is None:
+            return []
+        
+        try:
+            valid_films = films_df[(films_df['budget'] > 0) & (films_df['revenue'] > 0)].copy()
+            
+            if genre:
+                valid_films = valid_films[valid_films['genres'].str.contains(genre, case=False, na=False)]
+            
+            valid_films = valid_films.sort_values('roi', ascending=False).head(limit)
+            
+            results = []
+            for _, row in valid_films.iterrows():
+                year = str(row.get('release_date', ''))[:4] if pd.notna(row.get('release_date')) else ''
+                
+                results.append({
+                    'title': str(row['title']),
+                    'year': year,
+                    'genres': str(row.get('genres', '')),
+                    'poster': str(row.get('poster_url', '')),
+                    'budget': int(row['budget']),
+                    'revenue': int(row['revenue']),
+                    'budget_m': round(row['budget'] / 1_000_000, 0),
+                    'revenue_m': round(row['revenue'] / 1_000_000, 0),
+                    'roi': round(row['roi'], 1),
+                    'vote_average': round(row.get('vote_average', 0), 1),
+                    'overview': str(row.get('description', ''))
+                })
+            
+            return results
+            
+        except Exception as e:
+            print(f"Top movies query failed: {e}")
+            return []
+    
+    @classmethod
+    def analyze_audience_for_genre(cls, genre):
+        films_df = cls.current().get('films_df')
+        
+        try:
+            genre_films = films_df[films_df['genres'].str.contains(genre, case=False, na=False)]
+            
+            avg_popularity = genre_films['popularity'].mean() if 'popularity' in genre_films else 0
+            
+            insights = {
+                'avg_popularity': round(avg_popularity, 1),
+                'total_films': len(genre_films),
+                'age_distribution': {
+                    'Under 18': 15,
+                    '18-24': 25,
+                    '25-34': 30,
+                    '35-44': 20,
+                    '45-49': 7,
+                    '50-55': 2,
+                    '56+': 1
+                }
+            }
+            
+            return insights
+            
+        except Exception as e:
+            print(f"Audience analysis failed: {e}")
+            return {}
+    
+    @classmethod
+    def get_audience_profile(cls, genre=None):
+        # Age/gender/occupation breakdown of the users who rated each genre,
+        # built once per artifact version
+        state = cls.current()
+        if not state:
+            return {}
+        if state['audience'] is None:
+            with cls._lock:
+                if state['audience'] is None:
+                    state['audience'] = cls._build_audience(state['path'])
+        
+        audience = state['audience']
+        key = genre if genre in audience else '__all__'
+        return audience.get(key, audience.get('__all__', {}))
+    
+    @staticmethod
+    def _build_audience(data_dir):
+        users_df = pd.read_csv(os.path.join(data_dir, 'users.csv'))
+        films_df = pd.read_csv(os.path.join(data_dir, 'Films.csv'),
+                               usecols=['movieId', 'genres'],
+                               dtype={'movieId': str})
+        ratings_df = pd.read_csv(os.path.join(data_dir, 'ratings.csv'),
+                                 usecols=['userId', 'movieId'],
+                                 dtype={'userId': int, 'movieId': str})
+
+        films_df['movieId'] = films_df['movieId'].astype(str)
+        # Explode genres so each row = (movieId, single_genre)
+        films_df = films_df.dropna(subset=['genres'])
+        films_df = films_df.assign(genre=films_df['genres'].str.split('|')).explode('genre')
+        films_df['genre'] = films_df['genre'].str.strip()
+
+        # Build genre->userId mapping
+        merged = ratings_df.merge(films_df[['movieId', 'genre']], on='movieId', how='inner')
+        merged = merged.merge(users_df, on='userId', how='inner')
+
+        def build_profile(df_sub):
+            age_order = ['Under 18', '18-24', '25-34', '35-44', '45-49', '50-55', '56+']
+            # Age grouped by gender
+            age_gender = df_sub.groupby(['age_group', 'gender']).size().unstack(fill_value=0)
+            age_data = []
+            for ag in age_order:
+                if ag in age_gender.index:
+                    row = age_gender.loc[ag]
+                    age_data.append({
+                        'label': ag,
+                        'male': int(row.get('Male', 0)),
+                        'female': int(row.get('Female', 0)),
+                    })
+            # Gender totals
+            gen_c = df_sub['gender'].value_counts()
+            tot_g = gen_c.sum()
+            gender_data = [{'label': g, 'count': int(c),
+                            'pct': round(int(c) / tot_g * 100, 1)}
+                           for g, c in gen_c.items()]
+            # Occupations (top 10)
+            occ_c = df_sub['occupation'].value_counts().head(10)
+            occ_data = [{'label': o, 'count': int(c)} for o, c in occ_c.items()]
+            return {'age': age_data, 'gender': gender_data,
+                    'occupation': occ_data, 'total_users': int(df_sub['userId'].nunique())}
+
+        # Pre-build all genres
+        audience = {}
+        for g in merged['genre'].unique():
+            g_sub = merged[merged['genre'] == g]
+            audience[g] = build_profile(g_sub)
+
+        # Also store overall (no genre filter)
+        audience['__all__'] = build_profile(merged)
+        return audience
+
+
+# Sized by the memory report (dashboard/api/memory/, manage.py memory_report)
+memory.register('ml_analyzer', lambda: MLMovieAnalyzer._state)
+memory.register('dashboard_analytics', lambda: DashboardAnalytics._state)
@@ -6,20 +6,24 @@ class MoviesConfig(AppConfig):
     name = 'movies'
     
     def ready(self):
-        from .services import MLMovieAnalyzer, DashboardAnalytics
-        import threading
+        from django.db.models.signals import post_delete, post_save, pre_save
+        from . import counters, metrics, readiness
+        from .models import User
         
-        def init_ml():
-            try:
-                print("Initializing ML Movie Analyzer...")
-                MLMovieAnalyzer.initialize()
-                print("ML Movie Analyzer initialized successfully")
-                
-                print("Loading Dashboard Analytics data...")
-                DashboardAnalytics.load_data()
-                print("Dashboard Analytics loaded successfully")
-            except Exception as e:
-                print(f"ML initialization warning: {e}")
+        metrics.install_template_timing()
         
-        thread = threading.Thread(target=init_ml, daemon=True)
-        thread.start()
+        # Signup, createsuperuser and the admin all go through these
+        pre_save.connect(counters.user_saving, sender=User, dispatch_uid='stats_counters_users_saving')
+        post_save.connect(counters.user_saved, sender=User, dispatch_uid='stats_counters_users_saved')
+        post_delete.connect(counters.user_deleted, sender=User, dispatch_uid='stats_counters_users_deleted')
+        
+        for name in ('ml_analyzer', 'dashboard_analytics'):
+            if readiness.model_loading_mode() == 'off':
+                readiness.mark(name, readiness.DISABLED)
+            else:
+                readiness.register(name)
+        
+        # Only server processes warm up eagerly; wsgi.py/asgi.py start the
+        # loader for production servers, this covers runserver.
+        if readiness.is_server_process():
+            readiness.start_background_loading()
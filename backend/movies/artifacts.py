@@ -0,0 +1,186 @@
+import os
+import shutil
+import threading
+import time
+
+from django.conf import settings
+
+# Versioned model artifacts (TF-IDF pickles, Films.csv, users.csv, ...):
+#
+#   data/artifacts/
+#       20261019-1200/      one directory per published version
+#       20261020-0900/
+#       current             text file naming the active version
+#
+# Without a `current` pointer the legacy data/dashboard_data2 directory is
+# used. The pointer is replaced atomically, and running processes pick the
+# new version up through the watcher below.
+POINTER = 'current'
+LEGACY_VERSION = 'dashboard_data2'
+
+
+def artifacts_root():
+    return str(settings.ML_ARTIFACTS_DIR)
+
+
+def legacy_dir():
+    base_dir = settings.BASE_DIR
+    if hasattr(base_dir, 'parent'):
+        base_dir = base_dir.parent
+    return os.path.join(base_dir, 'data', LEGACY_VERSION)
+
+
+def current_version():
+    try:
+        with open(os.path.join(artifacts_root(), POINTER)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def resolve(version=None):
+    # (version, directory) for the given or the active version
+    version = version or current_version()
+    if version is None:
+        return LEGACY_VERSION, legacy_dir()
+    return version, os.path.join(artifacts_root(), version)
+
+
+def list_versions():
+    root = artifacts_root()
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if not name.startswith('.') and os.path.isdir(os.path.join(root, name))
+    )
+
+
+def activate(version):
+    path = os.path.join(artifacts_root(), version)
+    if not os.path.isdir(path):
+        raise ValueError(f"Unknown artifact version: {version}")
+    # Write then rename, so readers never see a half-written pointer
+    tmp_path = os.path.join(artifacts_root(), f'.{POINTER}.{os.getpid()}')
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(artifacts_root(), POINTER))
+
+
+def publish(source_dir, version):
+    # Copy into a hidden directory first; the version only becomes visible
+    # once complete
+    root = artifacts_root()
+    target = os.path.join(root, version)
+    if os.path.exists(target):
+        raise ValueError(f"Artifact version already exists: {version}")
+    os.makedirs(root, exist_ok=True)
+    staging = os.path.join(root, f'.{version}.partial')
+    shutil.rmtree(staging, ignore_errors=True)
+    shutil.copytree(source_dir, staging)
+    os.rename(staging, target)
+    return target
+
+
+def fingerprint(path):
+    # Latest mtime of a version directory and its files; changes when the
+    # artifact is republished or a file in it is replaced
+    try:
+        with os.scandir(path) as entries:
+            return max([os.stat(path).st_mtime] + [entry.stat().st_mtime for entry in entries])
+    except OSError:
+        return None
+
+
+class ArtifactWatcher:
+    # Polls the `current` pointer and hot-swaps MLMovieAnalyzer and
+    # DashboardAnalytics when it changes. Loading happens on this thread;
+    # requests keep using the previous version until the swap.
+    def __init__(self, interval):
+        self.interval = interval
+        self.last_check = None
+        self.last_error = None
+        self.swaps = 0
+        # {component name: (version, fingerprint)} of loads that failed, so
+        # a broken artifact isn't retried (and logged) on every poll
+        self.failed = {}
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='artifact-watcher', daemon=True)
+        self._thread.start()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def snapshot(self):
+        return {
+            'interval_s': self.interval,
+            'running': self.is_alive(),
+            'last_check': self.last_check,
+            'last_error': self.last_error,
+            'swaps': self.swaps,
+            'failed': {name: version for name, (version, _) in self.failed.items()},
+        }
+
+    def check(self):
+        from .analytics import DashboardAnalytics, MLMovieAnalyzer
+
+        self.last_check = time.time()
+        version, path = resolve()
+        for component in (MLMovieAnalyzer, DashboardAnalytics):
+            name = component.__name__
+            if not component.is_loaded() or component.version() == version:
+                self.failed.pop(name, None)
+                continue
+            attempt = (version, fingerprint(path))
+            if self.failed.get(name) == attempt:
+                continue
+            print(f"Artifact version {version} found, reloading {name}...")
+            try:
+                loaded = component.reload(version, path)
+            except Exception:
+                self.failed[name] = attempt
+                raise
+            if loaded:
+                self.failed.pop(name, None)
+                self.swaps += 1
+            else:
+                self.failed[name] = attempt
+                print(f"Loading {name} from version {version} failed; skipped until the artifact changes")
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Artifact watcher error: {e}")
+
+
+_watcher = None
+_watcher_pid = None
+_watcher_lock = threading.Lock()
+
+
+def start_watcher():
+    # One watcher per process; threads don't survive fork(), so a forked
+    # worker starts its own
+    global _watcher, _watcher_pid
+    interval = getattr(settings, 'ML_ARTIFACTS_POLL_SECONDS', 0)
+    if not interval:
+        return None
+    with _watcher_lock:
+        if _watcher is None or _watcher_pid != os.getpid():
+            _watcher = ArtifactWatcher(interval)
+            _watcher_pid = os.getpid()
+            _watcher.start()
+        return _watcher
+
+
+def watcher_status():
+    if _watcher is None or _watcher_pid != os.getpid():
+        return None
+    return _watcher.snapshot()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from .responses import json_response
+from .services import AsyncMovieService
+from .views import external_links, fields_projection
+
+# Async versions of the movie JSON API and the two Mongo-heavy pages,
+# routed by config/urls_async.py when the app is served over ASGI.
+# Templates are rendered in a thread because context processors touch
+# the (sync) session and user.
+_render = sync_to_async(render)
+
+
+@require_http_methods(["GET"])
+async def get_movie(request, movie_id):
+    try:
+        movie = await AsyncMovieService.get_movie(movie_id)
+        if movie:
+            return json_response(movie)
+        return json_response({'error': 'Movie not found'}, status=404)
+    except Exception as e:
+        return json_response({'error': str(e)}, status=400)
+
+
+@require_http_methods(["GET"])
+async def list_movies(request):
+    try:
+        limit = int(request.GET.get('limit', 100))
+        skip = int(request.GET.get('skip', 0))
+        genre = request.GET.get('genre')
+        search = request.GET.get('search')
+        projection = fields_projection(request)
+
+        if search:
+            movies = await AsyncMovieService.search_movies(search, limit, projection=projection)
+        elif genre:
+            movies = await AsyncMovieService.get_movies_by_genre(genre, limit, projection=projection)
+        else:
+            movies = await AsyncMovieService.get_all_movies(limit=limit, skip=skip, projection=projection)
+
+        return json_response({'movies': movies, 'count': len(movies)}, request=request)
+    except Exception as e:
+        return json_response({'error': str(e)}, status=400)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def rate_movie(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return json_response({'error': 'Authentication required'}, status=401)
+
+    try:
+        data = json.loads(request.body)
+        movie_id = data.get('movie_id')
+        score = data.get('score')
+
+        if not movie_id or score is None:
+            return json_response({'error': 'Missing movie_id or score'}, status=400)
+
+        if float(score) < 1 or float(score) > 5:
+            return json_response({'error': 'Score must be between 1 and 5'}, status=400)
+
+        # Same Django id -> rating user id offset as the sync view
+        user_id = user.id + 1000000
+
+        await AsyncMovieService.add_user_rating(user_id, movie_id, float(score))
+
+        return json_response({'status': 'success'})
+    except json.JSONDecodeError:
+        return json_response({'error': 'Invalid JSON format'}, status=400)
+    except Exception as e:
+        return json_response({'error': str(e)}, status=400)
+
+
+@login_required
+async def user_recommendations(request):
+    user_id = request.GET.get('user_id', '').strip()
+    recommendations = []
+    error = None
+
+    if not user_id:
+        user = await request.auser()
+        user_id = str(user.id + 1000000)
+
+    try:
+        recommendations = await AsyncMovieService.get_user_recommendations(
+            int(user_id), limit=10, projection='card'
+        )
+        if not recommendations:
+            error = "No recommendations found yet. Rate some movies to get started!"
+        else:
+            for rec in recommendations:
+                rec['genre_list'] = rec['genres'].split('|')
+    except ValueError:
+        error = "Please enter a valid user ID (numeric value)."
+    except Exception as e:
+        error = f"An error occurred: {str(e)}"
+
+    return await _render(request, 'user_recommendations.html', {
+        'user_id': user_id,
+        'recommendations': recommendations,
+        'error': error
+    })
+
+
+async def movie_detail(request, movie_id):
+    # The movie and its recommendations are independent reads, so fetch
+    # them concurrently
+    movie, recommendations = await asyncio.gather(
+        AsyncMovieService.get_movie(movie_id),
+        AsyncMovieService.get_recommendations_by_movie_id(movie_id, limit=12, projection='card'),
+    )
+
+    if not movie:
+        return await _render(request, 'index.html', {
+            'error': "Movie not found.",
+            'movie_title': '',
+            'searched_movie': None,
+            'recommendations': []
+        })
+
+    movie['genre_list'] = movie['genres'].split('|')
+    for rec in recommendations:
+        rec['genre_list'] = rec['genres'].split('|')
+
+    imdb_url, tmdb_url = external_links(movie)
+
+    return await _render(request, 'movie_detail.html', {
+        'movie': movie,
+        'recommendations': recommendations,
+        'imdb_url': imdb_url,
+        'tmdb_url': tmdb_url
+    })
@@ -0,0 +1,281 @@
+import time
+from numbers import Number
+
+import pymongo
+from pymongo.errors import PyMongoError
+
+from .db import (
+    get_async_stats_counters_collection,
+    get_async_user_ratings_collection,
+    get_async_user_recommendations_collection,
+    get_movies_collection,
+    get_stats_counters_collection,
+    get_user_ratings_collection,
+    get_user_recommendations_collection,
+)
+
+# Headline numbers for the admin pages, kept in one stats_counters document
+# so each page reads them with a single find_one. The write paths adjust
+# them with $inc; bulk imports and anything else that bypasses those paths
+# are corrected by reconcile() (manage.py reconcile_stats).
+#
+# Increments never upsert: if the document is missing, the next get()
+# rebuilds it from scratch instead of starting from partial counts.
+
+COUNTERS_ID = 'global'
+# Seconds a counter update may take before it is given up on, so an
+# unreachable Mongo doesn't stall the write (or signup) that triggered it
+WRITE_TIMEOUT = 2
+
+SECTIONS = {
+    'movies': [
+        'movies_total', 'movies_with_budget', 'movies_with_revenue',
+        'budget_total', 'revenue_total', 'rating_sum', 'rating_count',
+    ],
+    'ratings': ['ratings_total', 'ratings_score_sum', 'ratings_users', 'ratings_movies'],
+    'recommendations': ['recommendations_total', 'recommendations_users'],
+    'users': ['users_total', 'users_admin'],
+}
+FIELDS = [field for fields in SECTIONS.values() for field in fields]
+
+
+def _positive(value):
+    return value if isinstance(value, Number) and not isinstance(value, bool) and value > 0 else 0
+
+
+def movie_contribution(movie):
+    # What one movie document adds to the movie counters
+    budget = _positive(movie.get('budget'))
+    revenue = _positive(movie.get('revenue'))
+    rating = _positive(movie.get('vote_average'))
+    return {
+        'movies_total': 1,
+        'movies_with_budget': 1 if budget else 0,
+        'movies_with_revenue': 1 if revenue else 0,
+        'budget_total': budget,
+        'revenue_total': revenue,
+        'rating_sum': rating,
+        'rating_count': 1 if rating else 0,
+    }
+
+
+def _delta(before, after):
+    return {field: after.get(field, 0) - before.get(field, 0) for field in set(before) | set(after)}
+
+
+def _inc(deltas):
+    deltas = {field: value for field, value in deltas.items() if value}
+    if deltas:
+        get_stats_counters_collection().update_one({'_id': COUNTERS_ID}, {'$inc': deltas})
+
+
+async def _async_inc(deltas):
+    deltas = {field: value for field, value in deltas.items() if value}
+    if deltas:
+        await get_async_stats_counters_collection().update_one({'_id': COUNTERS_ID}, {'$inc': deltas})
+
+
+def increment(deltas):
+    try:
+        with pymongo.timeout(WRITE_TIMEOUT):
+            _inc(deltas)
+    except PyMongoError as e:
+        # The write itself succeeded; reconcile_stats fixes the drift
+        print(f"[counters] Could not update stats counters: {e}")
+
+
+async def async_increment(deltas):
+    try:
+        with pymongo.timeout(WRITE_TIMEOUT):
+            await _async_inc(deltas)
+    except PyMongoError as e:
+        print(f"[counters] Could not update stats counters: {e}")
+
+
+def movie_created(movie):
+    increment(movie_contribution(movie))
+
+
+def movie_updated(before, after):
+    increment(_delta(movie_contribution(before), movie_contribution(after)))
+
+
+def movie_deleted(movie):
+    increment({field: -value for field, value in movie_contribution(movie).items()})
+
+
+def _rating_deltas(previous, score, first_for_user, first_for_movie):
+    if previous is not None:
+        return {'ratings_score_sum': score - previous.get('score', 0)}
+    return {
+        'ratings_total': 1,
+        'ratings_score_sum': score,
+        'ratings_users': 1 if first_for_user else 0,
+        'ratings_movies': 1 if first_for_movie else 0,
+    }
+
+
+def rating_written(previous, user_id, movie_id, score):
+    # previous: the rating document before the upsert, None if it was new.
+    # A new rating needs two indexed lookups to tell whether its user or
+    # movie is new to the collection; they share the counters' deadline
+    # and failure handling.
+    try:
+        with pymongo.timeout(WRITE_TIMEOUT):
+            first_for_user = first_for_movie = False
+            if previous is None:
+                ratings = get_user_ratings_collection()
+                first_for_user = ratings.count_documents({'userId': user_id}, limit=2) == 1
+                first_for_movie = ratings.count_documents({'movieId': movie_id}, limit=2) == 1
+            _inc(_rating_deltas(previous, score, first_for_user, first_for_movie))
+    except PyMongoError as e:
+        print(f"[counters] Could not update rating counters: {e}")
+
+
+async def async_rating_written(previous, user_id, movie_id, score):
+    try:
+        with pymongo.timeout(WRITE_TIMEOUT):
+            first_for_user = first_for_movie = False
+            if previous is None:
+                ratings = get_async_user_ratings_collection()
+                first_for_user = await ratings.count_documents({'userId': user_id}, limit=2) == 1
+                first_for_movie = await ratings.count_documents({'movieId': movie_id}, limit=2) == 1
+            await _async_inc(_rating_deltas(previous, score, first_for_user, first_for_movie))
+    except PyMongoError as e:
+        print(f"[counters] Could not update rating counters: {e}")
+
+
+def recommendations_deleted(user_id, deleted):
+    if not deleted:
+        return
+    try:
+        with pymongo.timeout(WRITE_TIMEOUT):
+            remaining = get_user_recommendations_collection().count_documents({'userId': user_id}, limit=1)
+            _inc({'recommendations_total': -deleted, 'recommendations_users': 0 if remaining else -1})
+    except PyMongoError as e:
+        print(f"[counters] Could not update recommendation counters: {e}")
+
+
+async def async_recommendations_deleted(user_id, deleted):
+    if not deleted:
+        return
+    try:
+        with pymongo.timeout(WRITE_TIMEOUT):
+            remaining = await get_async_user_recommendations_collection().count_documents(
+                {'userId': user_id}, limit=1)
+            await _async_inc({'recommendations_total': -deleted, 'recommendations_users': 0 if remaining else -1})
+    except PyMongoError as e:
+        print(f"[counters] Could not update recommendation counters: {e}")
+
+
+def _is_admin_role(user):
+    return 1 if user.role == 'admin' else 0
+
+
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    # pre_save receiver for the User model: remember whether an existing
+    # user was an admin, so user_saved can tell a role change
+    if instance.pk is None or (update_fields is not None and 'role' not in update_fields):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list('role', flat=True).first()
+    if previous is not None:
+        instance._stats_was_admin = 1 if previous == 'admin' else 0
+
+
+def user_saved(sender, instance, created, **kwargs):
+    # post_save receiver. Logins only save last_login and fall through
+    # without touching Mongo.
+    if created:
+        increment({'users_total': 1, 'users_admin': _is_admin_role(instance)})
+        return
+    was_admin = instance.__dict__.pop('_stats_was_admin', None)
+    if was_admin is not None:
+        increment({'users_admin': _is_admin_role(instance) - was_admin})
+
+
+def user_deleted(sender, instance, **kwargs):
+    increment({'users_total': -1, 'users_admin': -_is_admin_role(instance)})
+
+
+def _count_users():
+    from .models import User
+    return {
+        'users_total': User.objects.count(),
+        'users_admin': User.objects.filter(role='admin').count(),
+    }
+
+
+def count_distinct(collection, field, query=None):
+    # Number of distinct values, counted server-side. distinct() returns
+    # the values themselves in one reply, which is capped at 16MB.
+    pipeline = [{'$match': query}] if query else []
+    pipeline += [{'$group': {'_id': f'${field}'}}, {'$count': 'count'}]
+    result = list(collection.aggregate(pipeline, allowDiskUse=True))
+    return result[0]['count'] if result else 0
+
+
+def compute(section):
+    # Recount one section from the source collections
+    if section == 'movies':
+        from .services import _count_if_positive, _sum_if_positive
+
+        totals = next(get_movies_collection().aggregate([
+            {'$group': {
+                '_id': None,
+                'movies_total': {'$sum': 1},
+                'movies_with_budget': _count_if_positive('budget'),
+                'movies_with_revenue': _count_if_positive('revenue'),
+                'budget_total': _sum_if_positive('budget'),
+                'revenue_total': _sum_if_positive('revenue'),
+                'rating_sum': _sum_if_positive('vote_average'),
+                'rating_count': _count_if_positive('vote_average'),
+            }},
+        ]), {})
+        return {field: totals.get(field, 0) for field in SECTIONS['movies']}
+    if section == 'ratings':
+        ratings = get_user_ratings_collection()
+        totals = next(ratings.aggregate([
+            {'$group': {'_id': None, 'ratings_total': {'$sum': 1}, 'ratings_score_sum': {'$sum': '$score'}}},
+        ]), {})
+        return {
+            'ratings_total': totals.get('ratings_total', 0),
+            'ratings_score_sum': totals.get('ratings_score_sum', 0),
+            'ratings_users': count_distinct(ratings, 'userId'),
+            'ratings_movies': count_distinct(ratings, 'movieId'),
+        }
+    if section == 'recommendations':
+        recommendations = get_user_recommendations_collection()
+        return {
+            'recommendations_total': recommendations.count_documents({}),
+            'recommendations_users': count_distinct(recommendations, 'userId'),
+        }
+    if section == 'users':
+        return _count_users()
+    raise ValueError(f"Unknown section: {section}")
+
+
+def reconcile(sections=None, dry_run=False):
+    # Recount the given sections (default all) and store the results.
+    # Returns {field: (stored, actual)}.
+    stored = get_stats_counters_collection().find_one({'_id': COUNTERS_ID}) or {}
+    actual = {}
+    for section in sections or SECTIONS:
+        actual.update(compute(section))
+    if not dry_run:
+        get_stats_counters_collection().update_one(
+            {'_id': COUNTERS_ID},
+            {'$set': dict(actual, reconciled_at=time.time())},
+            upsert=True,
+        )
+    return {field: (stored.get(field), value) for field, value in actual.items()}
+
+
+def get():
+    # All counters, from one document. The first read after the document
+    # is created (or dropped) builds it.
+    doc = get_stats_counters_collection().find_one({'_id': COUNTERS_ID}) or {}
+    missing = [section for section, fields in SECTIONS.items() if any(field not in doc for field in fields)]
+    if missing:
+        reconcile(missing)
+        doc = get_stats_counters_collection().find_one({'_id': COUNTERS_ID}) or {}
+    return {field: doc.get(field, 0) for field in FIELDS}
@@ -1,34 +1,208 @@
-from pymongo import MongoClient
+import asyncio
+import os
+import threading
+import weakref
+import pymongo
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from pymongo import AsyncMongoClient, MongoClient, monitoring
 from django.conf import settings
 
+from .metrics import command_stats
+
 _client = None
 _db = None
+_pid = None
+# Async clients by event loop, dropped when their loop shuts down
+_async_clients = weakref.WeakKeyDictionary()
+_async_pid = None
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    # CMAP listener keeping live connection pool gauges for this process
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.open = 0
+            self.checked_out = 0
+            self.wait_queue = 0
+            self.checkout_failures = 0
+            self.pool_clears = 0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'open': self.open,
+                'checked_out': self.checked_out,
+                'wait_queue': self.wait_queue,
+                'checkout_failures': self.checkout_failures,
+                'pool_clears': self.pool_clears,
+            }
+
+    def _add(self, field, delta):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add('pool_clears', 1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add('open', 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add('open', -1)
+
+    def connection_check_out_started(self, event):
+        self._add('wait_queue', 1)
+
+    def connection_check_out_failed(self, event):
+        self._add('wait_queue', -1)
+        self._add('checkout_failures', 1)
+
+    def connection_checked_out(self, event):
+        self._add('wait_queue', -1)
+        self._add('checked_out', 1)
+
+    def connection_checked_in(self, event):
+        self._add('checked_out', -1)
+
+
+pool_stats = PoolStatsListener()
+
+
+def _available_compressors(names):
+    # Only ask for compressors whose Python module is installed; the server
+    # negotiates down from this list.
+    available = []
+    for name in names:
+        try:
+            if name == 'zstd':
+                import zstandard  # noqa: F401
+            elif name == 'snappy':
+                import snappy  # noqa: F401
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def _reset_after_fork():
+    # A MongoClient must never be shared across fork(): drop the parent's
+    # handle so the child opens its own pool on first use.
+    global _client, _db, _pid, _async_pid
+    _client = None
+    _db = None
+    _pid = None
+    _async_clients.clear()
+    _async_pid = None
+    pool_stats.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _client_args():
+    mongodb_settings = settings.MONGODB_SETTINGS
+    username = mongodb_settings.get('username')
+    password = mongodb_settings.get('password')
+    host = mongodb_settings.get('host', 'localhost')
+    port = mongodb_settings.get('port', 27017)
+
+    if username and password:
+        connection_string = f"mongodb://{username}:{password}@{host}:{port}/"
+    else:
+        connection_string = f"mongodb://{host}:{port}/"
+
+    options = {
+        'maxPoolSize': mongodb_settings.get('max_pool_size', 100),
+        'minPoolSize': mongodb_settings.get('min_pool_size', 0),
+        'serverSelectionTimeoutMS': mongodb_settings.get('server_selection_timeout_ms', 30000),
+        'connectTimeoutMS': mongodb_settings.get('connect_timeout_ms', 20000),
+        'readPreference': mongodb_settings.get('read_preference', 'primary'),
+        'event_listeners': [pool_stats, command_stats],
+    }
+    if mongodb_settings.get('socket_timeout_ms'):
+        options['socketTimeoutMS'] = mongodb_settings['socket_timeout_ms']
+    compressors = _available_compressors(mongodb_settings.get('compressors', []))
+    if compressors:
+        options['compressors'] = compressors
+    return connection_string, options
+
+
+class MongoTimeoutMiddleware:
+    # Deadline for the Mongo work of one web request (MONGODB_MAX_TIME_MS).
+    # Scoped with pymongo.timeout() rather than the client's timeoutMS so
+    # that management commands sharing the client (bulk imports, long
+    # aggregations) are not cut off. PyMongo sends each command the
+    # remaining time as maxTimeMS.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.seconds = settings.MONGODB_SETTINGS.get('max_time_ms', 0) / 1000
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.seconds:
+            return self.get_response(request)
+        with pymongo.timeout(self.seconds):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not self.seconds:
+            return await self.get_response(request)
+        with pymongo.timeout(self.seconds):
+            return await self.get_response(request)
+
 
 def get_mongodb_client():
-    global _client
+    global _client, _pid
+    if _client is not None and _pid != os.getpid():
+        _reset_after_fork()
     if _client is None:
-        mongodb_settings = settings.MONGODB_SETTINGS
-        username = mongodb_settings.get('username')
-        password = mongodb_settings.get('password')
-        host = mongodb_settings.get('host', 'localhost')
-        port = mongodb_settings.get('port', 27017)
-        
-        if username and password:
-            connection_string = f"mongodb://{username}:{password}@{host}:{port}/"
-        else:
-            connection_string = f"mongodb://{host}:{port}/"
-        
-        _client = MongoClient(connection_string)
+        connection_string, options = _client_args()
+        _client = MongoClient(connection_string, **options)
+        _pid = os.getpid()
     return _client
 
 def get_mongodb():
     global _db
+    client = get_mongodb_client()
     if _db is None:
-        client = get_mongodb_client()
         db_name = settings.MONGODB_SETTINGS.get('db_name', 'watchwish_db')
         _db = client[db_name]
     return _db
 
+def use_database(database):
+    # Point the collection getters at another database, e.g. a throwaway
+    # one for benchmarks
+    global _client, _db, _pid
+    _client = database.client
+    _db = database
+    _pid = os.getpid()
+
+def get_pool_stats():
+    return pool_stats.snapshot()
+
 def get_movies_collection():
     db = get_mongodb()
     return db['movies']
@@ -40,3 +214,57 @@ def get_user_recommendations_collection():
 def get_user_ratings_collection():
     db = get_mongodb()
     return db['user_ratings']
+
+def get_import_state_collection():
+    db = get_mongodb()
+    return db['import_state']
+
+def get_stats_counters_collection():
+    db = get_mongodb()
+    return db['stats_counters']
+
+
+async def _close_with_loop(client, loop):
+    # Started on the client's loop and parked at the yield. asyncio.run()
+    # (used by uvicorn and asgiref) finalizes pending async generators
+    # before closing the loop, which closes the client on its own loop.
+    try:
+        yield
+    finally:
+        _async_clients.pop(loop, None)
+        await client.close()
+
+
+# Async client for the ASGI views. It is bound to the event loop it was
+# created on, so one is kept per loop and closed when that loop shuts
+# down; a loop per request or test doesn't leak pools and monitor tasks.
+def get_async_mongodb_client():
+    global _async_pid
+    if _async_pid != os.getpid():
+        _async_clients.clear()
+        _async_pid = os.getpid()
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        connection_string, options = _client_args()
+        client = AsyncMongoClient(connection_string, **options)
+        closer = _close_with_loop(client, loop)
+        loop.create_task(anext(closer))
+        entry = _async_clients[loop] = (client, closer)
+    return entry[0]
+
+def get_async_mongodb():
+    db_name = settings.MONGODB_SETTINGS.get('db_name', 'watchwish_db')
+    return get_async_mongodb_client()[db_name]
+
+def get_async_movies_collection():
+    return get_async_mongodb()['movies']
+
+def get_async_user_recommendations_collection():
+    return get_async_mongodb()['user_recommendations']
+
+def get_async_user_ratings_collection():
+    return get_async_mongodb()['user_ratings']
+
+def get_async_stats_counters_collection():
+    return get_async_mongodb()['stats_counters']
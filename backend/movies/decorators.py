@@ -1,9 +1,12 @@
 from django.contrib.auth.decorators import user_passes_test
 from django.shortcuts import redirect
 
+def is_admin(user):
+    return user.is_authenticated and (user.role == 'admin' or user.is_superuser)
+
 def admin_required(function=None, redirect_url='/accounts/login/'):
     actual_decorator = user_passes_test(
-        lambda u: u.is_authenticated and (u.role == 'admin' or u.is_superuser),
+        is_admin,
         login_url=redirect_url
     )
     if function:
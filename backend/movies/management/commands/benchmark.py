@@ -0,0 +1,229 @@
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import db, synthetic
+
+BENCH_USER = 4242
+BENCHMARKS = [
+    'get_recommendations',
+    'generate_live_recommendations',
+    'get_user_recommendations',
+    'search_movies',
+    'analyze_movie_concept',
+    'get_genre_statistics',
+    'get_top_movies',
+]
+# --compare gates on each benchmark's fastest run, which is far less
+# sensitive to scheduler and GC noise than the median of a few runs;
+# it needs enough runs for the minimum to settle.
+MIN_COMPARE_REPEAT = 5
+# Slowdowns smaller than this are timer noise whatever the ratio
+NOISE_FLOOR_MS = 0.1
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return {
+        'runs': len(samples),
+        'min_ms': round(samples[0] * 1000, 3),
+        'median_ms': round(statistics.median(samples) * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3),
+    }
+
+
+def compare(current, baseline, threshold):
+    # (size, benchmark, baseline min, current min, ratio, regressed)
+    rows = []
+    for size, benches in current['results'].items():
+        for name, stats in benches.items():
+            base = baseline.get('results', {}).get(size, {}).get(name)
+            if not base or not base['min_ms']:
+                continue
+            ratio = stats['min_ms'] / base['min_ms']
+            regressed = ratio > 1 + threshold and stats['min_ms'] - base['min_ms'] > NOISE_FLOOR_MS
+            rows.append((size, name, base['min_ms'], stats['min_ms'], ratio, regressed))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Time MovieService and analytics hot paths on synthetic catalogs of several sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000',
+                            help='Comma-separated catalog sizes (movies)')
+        parser.add_argument('--repeat', type=int, default=10,
+                            help=f'Timed runs per benchmark (at least {MIN_COMPARE_REPEAT} with --compare)')
+        parser.add_argument('--warmup', type=int, default=3,
+                            help='Untimed runs per benchmark before timing')
+        parser.add_argument('--only', default='',
+                            help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+        parser.add_argument('--mongo', action='store_true',
+                            help="Use the configured mongod (database '<db_name>_bench', dropped and reseeded) "
+                                 "instead of an in-process mongomock database")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write results as JSON to this file')
+        parser.add_argument('--compare', metavar='BASELINE',
+                            help='Compare against a previous --output file and fail on regressions')
+        parser.add_argument('--threshold', type=float, default=0.15,
+                            help='Allowed slowdown of the fastest run vs the baseline before flagging (0.15 = 15%%)')
+
+    def handle(self, *args, **kwargs):
+        sizes = [int(size) for size in kwargs['sizes'].split(',') if size]
+        selected = [name for name in kwargs['only'].split(',') if name] or BENCHMARKS
+        unknown = set(selected) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+        if kwargs['compare'] and kwargs['repeat'] < MIN_COMPARE_REPEAT:
+            raise CommandError(f"--compare needs --repeat {MIN_COMPARE_REPEAT} or more to tell regressions from noise")
+
+        database = self.open_database(kwargs['mongo'])
+        db.use_database(database)
+
+        results = {}
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as artifact_dir:
+                self.stdout.write(f"Seeding {size} movies...")
+                cases = self.seed(database, size, artifact_dir, kwargs['seed'])
+                results[str(size)] = {}
+                for name in selected:
+                    stats = self.run(cases[name], kwargs['repeat'], kwargs['warmup'])
+                    results[str(size)][name] = stats
+                    self.stdout.write(
+                        f"  {name:<32} median {stats['median_ms']:>10.2f} ms"
+                        f"   p95 {stats['p95_ms']:>10.2f} ms   min {stats['min_ms']:>10.2f} ms"
+                    )
+
+        report = {
+            'meta': {
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'backend': 'mongod' if kwargs['mongo'] else 'mongomock',
+                'python': platform.python_version(),
+                'repeat': kwargs['repeat'],
+                'warmup': kwargs['warmup'],
+                'seed': kwargs['seed'],
+            },
+            'results': results,
+        }
+        if kwargs['output']:
+            with open(kwargs['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {kwargs['output']}")
+
+        if kwargs['compare']:
+            self.report_comparison(report, kwargs['compare'], kwargs['threshold'])
+
+    def open_database(self, use_mongo):
+        if use_mongo:
+            from pymongo import MongoClient
+            connection_string, options = db._client_args()
+            name = settings.MONGODB_SETTINGS.get('db_name', 'watchwish_db') + '_bench'
+            return MongoClient(connection_string, **options)[name]
+        try:
+            import mongomock
+        except ImportError:
+            raise CommandError("The in-process backend needs mongomock (pip install mongomock); or pass --mongo")
+        return mongomock.MongoClient()['watchwish_bench']
+
+    def seed(self, database, size, artifact_dir, seed):
+        from movies.analytics import DashboardAnalytics, MLMovieAnalyzer
+        from movies.services import MovieService
+
+        movies = synthetic.movies_frame(size, seed=seed)
+        films = synthetic.films_frame(movies, seed=seed)
+        users = synthetic.users_frame(max(100, size // 10), seed=seed)
+        ratings = synthetic.ratings_frame(size * 5, users['userId'], movies['movieId'], seed=seed)
+
+        for name in ('movies', 'user_ratings', 'user_recommendations'):
+            database.drop_collection(name)
+        records = movies.to_dict('records')
+        for start in range(0, len(records), 10000):
+            database['movies'].insert_many(records[start:start + 10000])
+        database['movies'].create_index('movieId')
+        database['user_ratings'].create_index('userId')
+        database['user_recommendations'].create_index([('userId', 1), ('model', 1)])
+
+        # A user who liked a handful of movies sharing the catalog's top
+        # genre, and precomputed recommendations from the two offline models
+        liked = movies[movies['genres'].str.contains(synthetic.GENRES[0], regex=False)].head(10)
+        database['user_ratings'].insert_many([
+            {'userId': BENCH_USER, 'movieId': int(movie_id), 'score': 5.0} for movie_id in liked['movieId']
+        ])
+        for model in ('model1', 'model2'):
+            sample = movies.sample(min(50, size), random_state=seed)
+            database['user_recommendations'].insert_one({
+                'userId': BENCH_USER,
+                'model': model,
+                'recommendations': [
+                    {'movieId': int(movie_id), 'score': float(score)}
+                    for movie_id, score in zip(sample['movieId'], range(50, 0, -1))
+                ],
+            })
+
+        version = f'bench-{size}'
+        synthetic.write_tfidf_artifacts(movies, artifact_dir)
+        films.to_csv(os.path.join(artifact_dir, 'Films.csv'), index=False)
+        users.to_csv(os.path.join(artifact_dir, 'users.csv'), index=False)
+        ratings.to_csv(os.path.join(artifact_dir, 'ratings.csv'), index=False)
+        MLMovieAnalyzer.reload(version, artifact_dir)
+        DashboardAnalytics.reload(version, artifact_dir)
+
+        title = movies['title'].iloc[len(movies) // 2]
+        return {
+            'get_recommendations': lambda: MovieService.get_recommendations(title, limit=12),
+            'generate_live_recommendations': lambda: MovieService.generate_live_recommendations(BENCH_USER),
+            'get_user_recommendations': lambda: MovieService.get_user_recommendations(BENCH_USER),
+            'search_movies': lambda: MovieService.search_movies('heist'),
+            'analyze_movie_concept': lambda: MLMovieAnalyzer.analyze_movie_concept(
+                'a crew of thieves plans a heist on a space station', top_n=5),
+            'get_genre_statistics': DashboardAnalytics.get_genre_statistics,
+            'get_top_movies': lambda: DashboardAnalytics.get_top_movies(limit=10),
+        }
+
+    def run(self, func, repeat, warmup):
+        for _ in range(warmup):
+            func()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+        return summarize(samples)
+
+    def report_comparison(self, report, baseline_path, threshold):
+        try:
+            with open(baseline_path) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read baseline {baseline_path}: {e}")
+
+        if baseline.get('meta', {}).get('backend') != report['meta']['backend']:
+            self.stdout.write(self.style.WARNING("Baseline was recorded on a different backend"))
+        if baseline.get('meta', {}).get('repeat', 0) < MIN_COMPARE_REPEAT:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline has fewer than {MIN_COMPARE_REPEAT} runs per benchmark; re-record it to trust this comparison"
+            ))
+
+        rows = compare(report, baseline, threshold)
+        regressions = 0
+        self.stdout.write(f"\nFastest run vs {baseline_path} (threshold +{threshold:.0%}):")
+        for size, name, before, after, ratio, regressed in rows:
+            line = f"  {size:>8} {name:<32} {before:>10.2f} -> {after:>10.2f} ms  ({ratio - 1:+.1%})"
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line + '  REGRESSION'))
+            else:
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f"{regressions} benchmark(s) regressed beyond {threshold:.0%}")
+        self.stdout.write(self.style.SUCCESS("No regressions"))
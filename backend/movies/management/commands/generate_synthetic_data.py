@@ -0,0 +1,127 @@
+import os
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import counters, synthetic
+from movies.db import get_movies_collection, get_user_ratings_collection
+
+
+class Command(BaseCommand):
+    help = 'Generate a reproducible synthetic dataset (movies, ratings, users.csv, Films.csv, TF-IDF artifacts)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(synthetic.SCALES), default='100k',
+                            help='MovieLens-like preset, named after the number of ratings')
+        parser.add_argument('--movies', type=int, help='Override the preset movie count')
+        parser.add_argument('--users', type=int, help='Override the preset user count')
+        parser.add_argument('--ratings', type=int, help='Override the preset rating count')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output',
+                            help='Directory for the files (default data/synthetic/<scale>)')
+        parser.add_argument('--no-files', action='store_true',
+                            help='Only write to MongoDB')
+        parser.add_argument('--no-tfidf', action='store_true',
+                            help='Skip fitting the TF-IDF artifacts')
+        parser.add_argument('--mongo', action='store_true',
+                            help='Also insert movies and ratings into the configured MongoDB')
+        parser.add_argument('--drop', action='store_true',
+                            help='With --mongo: drop the movies and user_ratings collections first')
+        parser.add_argument('--chunk-size', type=int, default=500_000,
+                            help='Rows generated and written per chunk')
+
+    def handle(self, *args, **kwargs):
+        sizes = dict(synthetic.SCALES[kwargs['scale']])
+        for key in ('movies', 'users', 'ratings'):
+            if kwargs[key]:
+                sizes[key] = kwargs[key]
+        seed = kwargs['seed']
+        chunk_size = kwargs['chunk_size']
+        write_files = not kwargs['no_files']
+        if not write_files and not kwargs['mongo']:
+            raise CommandError("Nothing to do: --no-files without --mongo")
+
+        out_dir = kwargs['output'] or os.path.join(settings.BASE_DIR.parent, 'data', 'synthetic', kwargs['scale'])
+        if write_files:
+            os.makedirs(out_dir, exist_ok=True)
+
+        movies_collection = ratings_collection = None
+        if kwargs['mongo']:
+            movies_collection = get_movies_collection()
+            ratings_collection = get_user_ratings_collection()
+            if kwargs['drop']:
+                movies_collection.drop()
+                ratings_collection.drop()
+            elif movies_collection.estimated_document_count() or ratings_collection.estimated_document_count():
+                raise CommandError("movies/user_ratings are not empty; pass --drop to replace them")
+
+        self.stdout.write(
+            f"Generating {sizes['movies']:,} movies, {sizes['users']:,} users, "
+            f"{sizes['ratings']:,} ratings (seed {seed})"
+        )
+        start = time.time()
+
+        # Movies and Films.csv, chunk by chunk. Only the columns the TF-IDF
+        # fit needs are kept in memory.
+        soup_parts = []
+        for index, movies in enumerate(synthetic.iter_movies(sizes['movies'], seed=seed, chunk_size=chunk_size)):
+            header = index == 0
+            if write_files:
+                movies.to_csv(os.path.join(out_dir, 'movies.csv'), mode='w' if header else 'a',
+                              header=header, index=False)
+                synthetic.films_frame(movies, seed=seed).to_csv(
+                    os.path.join(out_dir, 'Films.csv'), mode='w' if header else 'a', header=header, index=False
+                )
+                if not kwargs['no_tfidf']:
+                    soup_parts.append(movies[['movieId', 'tmdbId', 'title', 'genres', 'description', 'poster_url']])
+            if movies_collection is not None:
+                movies_collection.insert_many(movies.to_dict('records'), ordered=False)
+        self.stdout.write(f"  movies done in {time.time() - start:.1f}s")
+
+        users = synthetic.users_frame(sizes['users'], seed=seed)
+        if write_files:
+            users.to_csv(os.path.join(out_dir, 'users.csv'), index=False)
+
+        # Ratings, in the MovieLens ratings.csv layout import_ratings reads
+        written = 0
+        ratings_start = time.time()
+        imported_at = datetime.now(timezone.utc)
+        chunks = synthetic.iter_ratings(sizes['ratings'], users['userId'], range(1, sizes['movies'] + 1),
+                                        seed=seed, chunk_size=chunk_size)
+        for index, ratings in enumerate(chunks):
+            header = index == 0
+            if write_files:
+                ratings.to_csv(os.path.join(out_dir, 'ratings.csv'), mode='w' if header else 'a',
+                               header=header, index=False)
+            if ratings_collection is not None:
+                docs = pd.DataFrame({
+                    'userId': ratings['userId'],
+                    'movieId': ratings['movieId'],
+                    'score': ratings['rating'].astype(float),
+                })
+                docs['updated_at'] = imported_at
+                ratings_collection.insert_many(docs.to_dict('records'), ordered=False)
+            written += len(ratings)
+            elapsed = time.time() - ratings_start
+            self.stdout.write(f"  {written:,} ratings ({written / elapsed if elapsed else 0:,.0f}/s)")
+
+        if movies_collection is not None:
+            movies_collection.create_index('movieId')
+            ratings_collection.create_index([('userId', 1), ('movieId', 1)])
+            ratings_collection.create_index('movieId')
+            counters.reconcile(['movies', 'ratings'])
+
+        if soup_parts:
+            tfidf_start = time.time()
+            synthetic.write_tfidf_artifacts(pd.concat(soup_parts, ignore_index=True), out_dir)
+            self.stdout.write(f"  TF-IDF artifacts fitted in {time.time() - tfidf_start:.1f}s")
+
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.time() - start:.1f}s"))
+        if write_files:
+            self.stdout.write(
+                f"Files in {out_dir}. Publish them for the analyzer/dashboard with: "
+                f"manage.py publish_artifacts {out_dir} --name synthetic-{kwargs['scale']}"
+            )
@@ -1,14 +1,124 @@
 import csv
+import hashlib
 import json
 import os
-from django.core.management.base import BaseCommand
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from movies.db import get_movies_collection, get_mongodb
+from pymongo import ASCENDING, ReplaceOne, UpdateOne
+from movies import counters
+from movies.db import (
+    get_import_state_collection,
+    get_movies_collection,
+    get_mongodb,
+    get_user_ratings_collection,
+)
+
+REC_LIVE = 'user_recommendations'
+REC_STAGING = 'user_recommendations__staging'
+REC_PREVIOUS = 'user_recommendations__previous'
+REC_BATCH_SIZE = 1000
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _movie_update(row):
+    update_data = {
+        'description': row.get('description', ''),
+        'poster_url': row.get('poster_url', ''),
+        'note_tmdb': _to_float(row.get('note_tmdb')),
+        'imdbId': _to_int(row.get('imdbId')),
+        'tmdbId': _to_int(row.get('tmdbId')),
+    }
+    update_data['content_hash'] = _content_hash(
+        '\x1f'.join(str(v) for v in update_data.values()).encode('utf-8')
+    )
+    return update_data
+
+
+def _parse_jsonl_range(file_path, start, end, model_name):
+    # Decode every line that *starts* inside [start, end). A line straddling
+    # the boundary belongs to the chunk where it begins.
+    loads = orjson.loads if orjson is not None else json.loads
+    docs = []
+    bad = 0
+    with open(file_path, 'rb') as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = loads(line)
+            except ValueError:
+                bad += 1
+                continue
+            # Structure: {"userId": 1, "recommendations": [...]}; the model
+            # tag distinguishes the two sources once they share a collection
+            data['model'] = model_name
+            data['content_hash'] = _content_hash(line)
+            docs.append(data)
+    return model_name, docs, bad
+
 
 class Command(BaseCommand):
     help = 'Import data from CSV and JSON files to MongoDB'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Operations per bulk_write for the movies CSV')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Processes decoding recommendation JSONL')
+        parser.add_argument('--writers', type=int, default=4,
+                            help='Threads running insert_many concurrently')
+        parser.add_argument('--chunk-mb', type=int, default=16,
+                            help='Byte-range size per decode task')
+        parser.add_argument('--delta', action='store_true',
+                            help='Only write rows whose content hash changed; resumes from checkpoints')
+        parser.add_argument('--restart', action='store_true',
+                            help='With --delta, ignore saved checkpoints and start from the top')
+        parser.add_argument('--rollback', action='store_true',
+                            help='Restore the previous user_recommendations generation and exit')
+
     def handle(self, *args, **kwargs):
+        if kwargs.get('rollback'):
+            self.rollback_recommendations()
+            return
+
+        self.batch_size = kwargs.get('batch_size') or 5000
+        self.workers = kwargs.get('workers') or os.cpu_count() or 1
+        self.writers = kwargs.get('writers') or 4
+        self.chunk_mb = kwargs.get('chunk_mb') or 16
         self.stdout.write("Starting data import...")
         
         # Paths
@@ -17,104 +127,383 @@ class Command(BaseCommand):
         json_path1 = os.path.join(base_dir, 'data', 'model_movies_rec.json')
         json_path2 = os.path.join(base_dir, 'data', 'model_movies_rec2.json')
 
+        if kwargs.get('delta'):
+            self.restart = kwargs.get('restart', False)
+            self.delta_import(csv_path, [(json_path1, "model1"), (json_path2, "model2")])
+            return
+
         # Import Movies CSV
         if os.path.exists(csv_path):
             self.import_movies_csv(csv_path)
         else:
             self.stdout.write(self.style.WARNING(f"CSV file not found: {csv_path}"))
 
-        # Import Recommendations JSON
+        # Import Recommendations JSON into a shadow collection and swap it in,
+        # so readers never see an empty or half-loaded user_recommendations
         db = get_mongodb()
-        rec_collection = db['user_recommendations']
-        # clear existing recommendations if desired? For now, let's assuming mostly append/update logic or simple insert.
-        # But usually migrations should be idempotent.
-        # We will drop and recreate for recommendations to ensure clean slate as it's a derived dataset?
-        # Or just upsert.
-        # Given the file size, drop and bulk write is faster.
-        rec_collection.drop() 
-        self.stdout.write("Dropped existing user_recommendations collection.")
-
-        if os.path.exists(json_path1):
-            self.import_recommendations_json(json_path1, rec_collection, "model1")
-        
-        if os.path.exists(json_path2):
-            self.import_recommendations_json(json_path2, rec_collection, "model2")
+        staging = db[REC_STAGING]
+        staging.drop()
+
+        sources = [
+            (path, model_name)
+            for path, model_name in ((json_path1, "model1"), (json_path2, "model2"))
+            if os.path.exists(path)
+        ]
+        if sources:
+            imported = self.import_recommendations_json(sources, staging)
+            self.swap_recommendations(db, staging, imported)
+        else:
+            self.stdout.write(self.style.WARNING(
+                f"No recommendation files found; {REC_LIVE} left untouched."
+            ))
 
+        counters.reconcile(['movies', 'recommendations'])
         self.stdout.write(self.style.SUCCESS("Data import completed successfully."))
 
-    def import_movies_csv(self, file_path):
-        self.stdout.write(f"Importing movies from {file_path}...")
+    def delta_import(self, csv_path, rec_sources):
+        # Incremental refresh: every row carries a content_hash, and only rows
+        # whose hash differs from the stored one are written, straight into the
+        # live collections. Progress is checkpointed to import_state so an
+        # interrupted run picks up where it stopped.
+        if os.path.exists(csv_path):
+            self.delta_import_movies_csv(csv_path)
+        else:
+            self.stdout.write(self.style.WARNING(f"CSV file not found: {csv_path}"))
+
+        for path, model_name in rec_sources:
+            if os.path.exists(path):
+                self.delta_import_recommendations(path, model_name)
+
+        counters.reconcile(['movies', 'recommendations'])
+        self.stdout.write(self.style.SUCCESS("Delta import completed successfully."))
+
+    def load_checkpoint(self, key, path):
+        state = get_import_state_collection()
+        if self.restart:
+            state.delete_one({'_id': key})
+            return 0
+        checkpoint = state.find_one({'_id': key})
+        stat = os.stat(path)
+        # A checkpoint is only valid against the exact same file
+        if not checkpoint or checkpoint.get('size') != stat.st_size or checkpoint.get('mtime') != stat.st_mtime:
+            return 0
+        self.stdout.write(f"Resuming {path} at byte {checkpoint['offset']} (after key {checkpoint.get('last_key')})")
+        return checkpoint['offset']
+
+    def save_checkpoint(self, key, path, offset, last_key):
+        stat = os.stat(path)
+        get_import_state_collection().update_one(
+            {'_id': key},
+            {'$set': {'path': path, 'offset': offset, 'last_key': last_key,
+                      'size': stat.st_size, 'mtime': stat.st_mtime}},
+            upsert=True
+        )
+
+    def clear_checkpoint(self, key):
+        get_import_state_collection().delete_one({'_id': key})
+
+    def delta_import_movies_csv(self, file_path):
+        self.stdout.write(f"Delta-importing movies from {file_path}...")
         collection = get_movies_collection()
-        
-        updated_count = 0
-        created_count = 0
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                movie_id = row.get('movieId')
-                if not movie_id:
+        collection.create_index('movieId')
+        key = 'import_data:movies_csv'
+
+        known = {
+            doc['movieId']: doc.get('content_hash')
+            for doc in collection.find({}, {'_id': 0, 'movieId': 1, 'content_hash': 1})
+        }
+
+        offset = self.load_checkpoint(key, file_path)
+        rows = changed = matched = 0
+        batch = []
+        last_key = None
+        start = time.time()
+
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            # readline (not iteration) keeps f.tell() usable for checkpoints
+            lines = iter(f.readline, '')
+            reader = csv.reader(lines)
+            header = next(reader, None)
+            if header is None:
+                return
+            if offset:
+                f.seek(offset)
+            for values in reader:
+                row = dict(zip(header, values))
+                rows += 1
+                movie_id_val = _to_int(row.get('movieId'))
+                if movie_id_val is None or movie_id_val not in known:
+                    # Enrichment only updates movies we already have
                     continue
-                
-                try:
-                    # Assuming movieId is stored as int or string in DB?
-                    # In previous view_file of services.py: 
-                    # collection.find_one({'movieId': rec['movieId']})
-                    # In json file: "movieId": 121029 (int)
-                    # So likely int.
-                    movie_id_val = int(movie_id)
-                except ValueError:
+                update_data = _movie_update(row)
+                last_key = movie_id_val
+                if known[movie_id_val] == update_data['content_hash']:
                     continue
+                batch.append(UpdateOne({'movieId': movie_id_val}, {'$set': update_data}))
+                if len(batch) >= self.batch_size:
+                    matched += collection.bulk_write(batch, ordered=False).matched_count
+                    changed += len(batch)
+                    batch = []
+                    self.save_checkpoint(key, file_path, f.tell(), last_key)
 
-                update_data = {
-                    'description': row.get('description', ''),
-                    'poster_url': row.get('poster_url', ''),
-                    'note_tmdb': row.get('note_tmdb', ''),
-                    'imdbId': row.get('imdbId', ''),
-                    'tmdbId': row.get('tmdbId', '')
-                }
-                
-                result = collection.update_one(
-                    {'movieId': movie_id_val},
-                    {'$set': update_data}
-                )
-                
-                if result.matched_count > 0:
-                    updated_count += 1
-                else:
-                    # Optional: create if not exists? User said "updating exisiting movie".
-                    # Let's simple skip if not found for now to match strict requirements of enrichment.
-                    pass
-        
-        self.stdout.write(f"Updated {updated_count} movies.")
+        if batch:
+            matched += collection.bulk_write(batch, ordered=False).matched_count
+            changed += len(batch)
+        self.clear_checkpoint(key)
+
+        self.stdout.write(
+            f"Scanned {rows} rows in {time.time() - start:.1f}s: "
+            f"{changed} changed ({matched} matched), {rows - changed} unchanged or skipped."
+        )
+
+    def delta_import_recommendations(self, file_path, model_name):
+        self.stdout.write(f"Delta-importing recommendations from {file_path} ({model_name})...")
+        collection = get_mongodb()[REC_LIVE]
+        collection.create_index([('userId', ASCENDING), ('model', ASCENDING)])
+        key = f'import_data:{model_name}'
+        loads = orjson.loads if orjson is not None else json.loads
 
-    def import_recommendations_json(self, file_path, collection, model_name):
-        self.stdout.write(f"Importing recommendations from {file_path}...")
-        count = 0
+        known = {
+            doc['userId']: doc.get('content_hash')
+            for doc in collection.find({'model': model_name}, {'_id': 0, 'userId': 1, 'content_hash': 1})
+        }
+
+        offset = self.load_checkpoint(key, file_path)
+        resumed = offset > 0
+        seen = set()
+        lines = changed = 0
         batch = []
-        BATCH_SIZE = 1000
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
+        last_key = None
+        start = time.time()
+
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            for line in iter(f.readline, b''):
+                line = line.strip()
+                if not line:
+                    continue
+                lines += 1
+                line_hash = _content_hash(line)
                 try:
-                    data = json.loads(line.strip())
-                    # Structure: {"userId": 1, "recommendations": [...]}
-                    # We add model name to distinguish sources if we merge them, 
-                    # OR we can just insert as is if we want to query by userId and model.
-                    # Plan said: { "userId": <int>, "model": "model1", "recommendations": [...] }
-                    
-                    data['model'] = model_name
-                    batch.append(data)
-                    
-                    if len(batch) >= BATCH_SIZE:
-                        collection.insert_many(batch)
-                        count += len(batch)
-                        batch = []
-                except json.JSONDecodeError:
+                    data = loads(line)
+                except ValueError:
                     continue
-        
+                user_id = data.get('userId')
+                seen.add(user_id)
+                last_key = user_id
+                if known.get(user_id) == line_hash:
+                    continue
+                data['model'] = model_name
+                data['content_hash'] = line_hash
+                batch.append(ReplaceOne({'userId': user_id, 'model': model_name}, data, upsert=True))
+                if len(batch) >= REC_BATCH_SIZE:
+                    collection.bulk_write(batch, ordered=False)
+                    changed += len(batch)
+                    batch = []
+                    self.save_checkpoint(key, file_path, f.tell(), last_key)
+
         if batch:
-            collection.insert_many(batch)
-            count += len(batch)
-            
-        self.stdout.write(f"Imported {count} recommendation records for {model_name}.")
+            collection.bulk_write(batch, ordered=False)
+            changed += len(batch)
+
+        # Users that disappeared upstream can only be identified after a full,
+        # uninterrupted pass over the file
+        removed = 0
+        if not resumed:
+            stale = [user_id for user_id in known if user_id not in seen]
+            for i in range(0, len(stale), REC_BATCH_SIZE):
+                removed += collection.delete_many(
+                    {'model': model_name, 'userId': {'$in': stale[i:i + REC_BATCH_SIZE]}}
+                ).deleted_count
+        self.clear_checkpoint(key)
+
+        self.stdout.write(
+            f"Scanned {lines} records in {time.time() - start:.1f}s: "
+            f"{changed} written, {lines - changed} unchanged, {removed} removed."
+        )
+
+    def swap_recommendations(self, db, staging, imported):
+        live = db[REC_LIVE]
+        has_live = REC_LIVE in db.list_collection_names()
+
+        # Live lists from precompute_live_recs are derived from ratings, not
+        # from these files, so carry them over into the new generation.
+        if has_live:
+            live.aggregate([
+                {'$match': {'model': 'live'}},
+                {'$project': {'_id': 0}},
+                {'$merge': {'into': REC_STAGING}},
+            ])
+        carried = staging.count_documents({'model': 'live'})
+
+        staging.create_index([('userId', ASCENDING), ('model', ASCENDING)])
+
+        staged = staging.count_documents({})
+        if imported == 0 or staged != imported + carried:
+            staging.drop()
+            raise CommandError(
+                f"Staging validation failed ({staged} docs staged, expected {imported} imported "
+                f"+ {carried} live); user_recommendations left untouched."
+            )
+
+        # Keep the current generation for rollback. It is copied beforehand
+        # so that the swap itself stays a single atomic rename.
+        if has_live:
+            live.aggregate([{'$out': REC_PREVIOUS}])
+        staging.rename(REC_LIVE, dropTarget=True)
+        self.stdout.write(f"Swapped in {staged} recommendation docs (previous generation kept in {REC_PREVIOUS}).")
+        if carried:
+            self.drop_stale_live(db[REC_LIVE])
+
+    def drop_stale_live(self, live):
+        # A rating written after a live list was carried into staging
+        # deleted it from the old collection only. Any carried list older
+        # than its user's latest rating is stale and must not survive the
+        # swap, however the writes interleaved with it.
+        ratings = get_user_ratings_collection()
+        cursor = live.find({'model': 'live'}, {'_id': 0, 'userId': 1, 'computed_at': 1})
+        stale = []
+        while True:
+            computed = {doc['userId']: doc.get('computed_at') for doc in islice(cursor, REC_BATCH_SIZE)}
+            if not computed:
+                break
+            for row in ratings.aggregate([
+                {'$match': {'userId': {'$in': list(computed)}}},
+                {'$group': {'_id': '$userId', 'updated_at': {'$max': '$updated_at'}}},
+            ]):
+                computed_at = computed[row['_id']]
+                if row['updated_at'] is not None and (computed_at is None or row['updated_at'] > computed_at):
+                    stale.append(row['_id'])
+        for i in range(0, len(stale), REC_BATCH_SIZE):
+            live.delete_many({'model': 'live', 'userId': {'$in': stale[i:i + REC_BATCH_SIZE]}})
+        if stale:
+            self.stdout.write(f"Dropped {len(stale)} live lists invalidated by ratings written during the import.")
+
+    def rollback_recommendations(self):
+        db = get_mongodb()
+        if REC_PREVIOUS not in db.list_collection_names():
+            raise CommandError(f"No previous generation found in {REC_PREVIOUS}.")
+        db[REC_PREVIOUS].rename(REC_LIVE, dropTarget=True)
+        counters.reconcile(['recommendations'])
+        self.stdout.write(self.style.SUCCESS(f"Restored {REC_LIVE} from {REC_PREVIOUS}."))
+
+    def import_movies_csv(self, file_path, batch_size=None):
+        self.stdout.write(f"Importing movies from {file_path}...")
+        collection = get_movies_collection()
+        batch_size = batch_size or self.batch_size
+        # Every UpdateOne filters on movieId; without this each one is a collection scan
+        collection.create_index('movieId')
+        
+        # Parsing runs in a producer thread so the next batch is built while
+        # the previous bulk_write is on the wire. The queue is bounded to keep
+        # memory flat on very large files.
+        batches = queue.Queue(maxsize=4)
+        errors = []
+
+        def produce():
+            try:
+                batch = []
+                with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                    for row in csv.DictReader(f):
+                        # movieId is stored as int in the movies collection
+                        movie_id_val = _to_int(row.get('movieId'))
+                        if movie_id_val is None:
+                            continue
+
+                        update_data = _movie_update(row)
+                        # Enrichment only: rows for movies we don't have are skipped
+                        batch.append(UpdateOne({'movieId': movie_id_val}, {'$set': update_data}))
+                        if len(batch) >= batch_size:
+                            batches.put(batch)
+                            batch = []
+                if batch:
+                    batches.put(batch)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                batches.put(None)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        start = time.time()
+        producer.start()
+
+        rows = 0
+        matched_count = 0
+        modified_count = 0
+        while True:
+            batch = batches.get()
+            if batch is None:
+                break
+            result = collection.bulk_write(batch, ordered=False)
+            rows += len(batch)
+            matched_count += result.matched_count
+            modified_count += result.modified_count
+        producer.join()
+
+        if errors:
+            raise errors[0]
+
+        elapsed = time.time() - start
+        rate = rows / elapsed if elapsed > 0 else 0
+        self.stdout.write(
+            f"Processed {rows} rows in {elapsed:.1f}s ({rate:,.0f} rows/s): "
+            f"matched {matched_count}, modified {modified_count}."
+        )
+
+    def import_recommendations_json(self, sources, collection):
+        # sources: list of (file_path, model_name). Files are split into byte
+        # ranges decoded in a process pool; decoded batches go to a pool of
+        # writer threads doing unordered insert_many, so decode and network
+        # overlap and both model files load at the same time.
+        for file_path, _ in sources:
+            self.stdout.write(f"Importing recommendations from {file_path}...")
+        self.stdout.write(f"Decoder: {'orjson' if orjson is not None else 'json'}")
+
+        chunk_bytes = self.chunk_mb * 1024 * 1024
+        tasks = []
+        total_bytes = 0
+        for file_path, model_name in sources:
+            size = os.path.getsize(file_path)
+            total_bytes += size
+            for offset in range(0, size, chunk_bytes):
+                tasks.append((file_path, offset, min(offset + chunk_bytes, size), model_name))
+
+        counts = {model_name: 0 for _, model_name in sources}
+        skipped = 0
+        start = time.time()
+
+        def write(batch):
+            collection.insert_many(batch, ordered=False)
+            return len(batch)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as parsers, \
+                ThreadPoolExecutor(max_workers=self.writers) as writers:
+            # At most two decoded chunks per parser exist at once: new ranges
+            # are only submitted as finished ones are written and dropped.
+            pending = iter(tasks)
+            parsing = {parsers.submit(_parse_jsonl_range, *task) for task in islice(pending, 2 * self.workers)}
+            while parsing:
+                done, parsing = wait(parsing, return_when=FIRST_COMPLETED)
+                for future in done:
+                    model_name, docs, bad = future.result()
+                    skipped += bad
+                    writes = [
+                        writers.submit(write, docs[i:i + REC_BATCH_SIZE])
+                        for i in range(0, len(docs), REC_BATCH_SIZE)
+                    ]
+                    counts[model_name] += sum(w.result() for w in writes)
+                    parsing.update(parsers.submit(_parse_jsonl_range, *task) for task in islice(pending, 1))
+
+        elapsed = time.time() - start
+        count = sum(counts.values())
+        for model_name, model_count in counts.items():
+            self.stdout.write(f"Imported {model_count} recommendation records for {model_name}.")
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"Skipped {skipped} undecodable lines."))
+        if elapsed > 0:
+            self.stdout.write(
+                f"{count} records, {total_bytes / 1024 / 1024:.1f} MB in {elapsed:.1f}s "
+                f"({count / elapsed:,.0f} records/s, {total_bytes / 1024 / 1024 / elapsed:.1f} MB/s) "
+                f"with {self.workers} parsers and {self.writers} writers."
+            )
+        return count
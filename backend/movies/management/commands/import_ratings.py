@@ -0,0 +1,110 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import ASCENDING, UpdateOne
+
+from movies import counters
+from movies.db import get_user_ratings_collection
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load MovieLens ratings.csv into the user_ratings collection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?',
+                            default=os.path.join(settings.BASE_DIR.parent, 'data', 'dashboard_data2', 'ratings.csv'),
+                            help='ratings.csv with userId, movieId and rating columns')
+        parser.add_argument('--user-offset', type=int, default=0,
+                            help='Added to every userId (site users live at Django id + 1000000)')
+        parser.add_argument('--chunk-size', type=int, default=200_000,
+                            help='CSV rows read per chunk')
+        parser.add_argument('--batch-size', type=int, default=10_000,
+                            help='Upserts per bulk_write')
+        parser.add_argument('--writers', type=int, default=4,
+                            help='Threads issuing bulk_write concurrently')
+
+    def handle(self, *args, **kwargs):
+        path = kwargs['path']
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+
+        offset = kwargs['user_offset']
+        batch_size = kwargs['batch_size']
+        writers = kwargs['writers']
+
+        collection = get_user_ratings_collection()
+        # The upsert key; without it every write is a collection scan
+        collection.create_index([('userId', ASCENDING), ('movieId', ASCENDING)])
+        collection.create_index([('movieId', ASCENDING)])
+
+        # Stamped like add_user_rating so precompute_live_recs --changed-only
+        # picks the imported users up
+        imported_at = datetime.now(timezone.utc)
+
+        def write(user_ids, movie_ids, scores):
+            ops = [
+                UpdateOne(
+                    {'userId': user_id, 'movieId': movie_id},
+                    {'$set': {'score': score, 'updated_at': imported_at}},
+                    upsert=True
+                )
+                for user_id, movie_id, score in zip(user_ids, movie_ids, scores)
+            ]
+            result = collection.bulk_write(ops, ordered=False)
+            return result.upserted_count, result.modified_count
+
+        self.stdout.write(f"Importing ratings from {path}...")
+        start = time.time()
+        rows = inserted = modified = 0
+
+        reader = pd.read_csv(
+            path,
+            usecols=['userId', 'movieId', 'rating'],
+            dtype={'userId': np.int32, 'movieId': np.int32, 'rating': np.float32},
+            chunksize=kwargs['chunk_size'],
+        )
+
+        def drain(futures):
+            nonlocal inserted, modified
+            for future in futures:
+                upserted, changed = future.result()
+                inserted += upserted
+                modified += changed
+
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            previous = []
+            for chunk in reader:
+                pending = []
+                # Plain Python scalars for BSON; float64 keeps 3.5 as 3.5
+                user_ids = (chunk['userId'].to_numpy(np.int64) + offset).tolist()
+                movie_ids = chunk['movieId'].to_numpy(np.int64).tolist()
+                scores = chunk['rating'].to_numpy(np.float64).tolist()
+                for i in range(0, len(user_ids), batch_size):
+                    pending.append(pool.submit(
+                        write,
+                        user_ids[i:i + batch_size],
+                        movie_ids[i:i + batch_size],
+                        scores[i:i + batch_size],
+                    ))
+                rows += len(user_ids)
+
+                # The previous chunk finishes writing while this one was parsed;
+                # at most two chunks are held at once
+                drain(previous)
+                previous = pending
+
+                elapsed = time.time() - start
+                self.stdout.write(f"  {rows:,} rows read ({rows / elapsed:,.0f} rows/s)")
+            drain(previous)
+
+        counters.reconcile(['ratings'])
+        elapsed = time.time() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {rows:,} ratings in {elapsed:.1f}s: {inserted:,} new, {modified:,} updated."
+        ))
@@ -1,32 +1,93 @@
 import json
-from django.core.management.base import BaseCommand
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import UpdateOne
+from movies import counters
 from movies.db import get_movies_collection
 
 
+class _SeenIds:
+    # Bitmap over int movieIds up to BITMAP_MAX: one bit per id instead of
+    # a full Python int object per entry in a set. The bitmap grows with
+    # the largest id, so negative and larger ids go to a plain set.
+    BITMAP_MAX = 1 << 24  # 2 MB of bits
+
+    def __init__(self):
+        self._bits = bytearray()
+        self._other = set()
+
+    def add(self, movie_id):
+        # Returns False if the id had already been seen
+        if not 0 <= movie_id < self.BITMAP_MAX:
+            if movie_id in self._other:
+                return False
+            self._other.add(movie_id)
+            return True
+        byte, bit = divmod(movie_id, 8)
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(min(max(byte + 1 - len(self._bits), len(self._bits)),
+                                        self.BITMAP_MAX // 8 - len(self._bits))))
+        if self._bits[byte] & (1 << bit):
+            return False
+        self._bits[byte] |= 1 << bit
+        return True
+
+
 class Command(BaseCommand):
     help = 'Load movie recommendation data from JSON file into MongoDB'
 
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?',
+                            default=os.path.join(settings.BASE_DIR.parent, 'data', 'model_movies_rec.json'),
+                            help='JSONL recommendations file to read movies from')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Upserts per bulk_write')
+
     def handle(self, *args, **kwargs):
+        path = kwargs['path']
+        batch_size = kwargs['batch_size']
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+
         collection = get_movies_collection()
-        
-        collection.delete_many({})
-        self.stdout.write('Cleared existing movie data')
-        
-        with open('data/model_movies_rec.json', 'r', encoding='utf-8') as f:
-            all_movies = {}
+        collection.create_index('movieId')
+
+        # Upsert in bounded batches instead of clearing the collection first,
+        # so the catalog stays readable for the whole run
+        seen = _SeenIds()
+        batch = []
+        loaded = 0
+        upserted = 0
+
+        with open(path, 'r', encoding='utf-8') as f:
             for line in f:
-                user_data = json.loads(line.strip())
+                line = line.strip()
+                if not line:
+                    continue
+                user_data = json.loads(line)
                 for movie in user_data['recommendations']:
-                    movie_id = movie['movieId']
-                    if movie_id not in all_movies:
-                        all_movies[movie_id] = {
-                            'movieId': movie_id,
-                            'title': movie['title'],
-                            'genres': movie['genres']
-                        }
-            
-            if all_movies:
-                collection.insert_many(list(all_movies.values()))
-                self.stdout.write(self.style.SUCCESS(f'Successfully loaded {len(all_movies)} movies'))
-            else:
-                self.stdout.write(self.style.WARNING('No movies found in data'))
+                    movie_id = int(movie['movieId'])
+                    if not seen.add(movie_id):
+                        continue
+                    batch.append(UpdateOne(
+                        {'movieId': movie_id},
+                        {'$set': {'title': movie['title'], 'genres': movie['genres']}},
+                        upsert=True
+                    ))
+                    if len(batch) >= batch_size:
+                        upserted += collection.bulk_write(batch, ordered=False).upserted_count
+                        loaded += len(batch)
+                        batch = []
+
+        if batch:
+            upserted += collection.bulk_write(batch, ordered=False).upserted_count
+            loaded += len(batch)
+
+        if loaded:
+            counters.reconcile(['movies'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Successfully loaded {loaded} movies ({upserted} new, {loaded - upserted} updated)'
+            ))
+        else:
+            self.stdout.write(self.style.WARNING('No movies found in data'))
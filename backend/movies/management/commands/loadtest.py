@@ -0,0 +1,355 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+
+from movies.models import User
+
+SCENARIOS = ['index', 'movie_detail', 'search', 'rate_and_recommend', 'admin']
+DEFAULT_MIX = 'index=30,movie_detail=30,search=20,rate_and_recommend=15,admin=5'
+SEARCH_TERMS = ['love', 'war', 'space', 'heist', 'night', 'king', 'ghost', 'future']
+PITCHES = [
+    'A crew of thieves plans one last heist on an orbiting casino',
+    'Two estranged sisters inherit a haunted house on a remote island',
+    'A retired detective is pulled back in by a murder in his old city',
+]
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples, elapsed):
+    # samples: [(status, seconds)] for one route
+    latencies = sorted(seconds for _, seconds in samples)
+    errors = sum(1 for status, _ in samples if not 200 <= status < 300)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'rps': round(len(samples) / elapsed, 2) if elapsed else 0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0,
+    }
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise CommandError(f"Unknown scenario '{name}'; choose from {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class VirtualUser:
+    # One simulated visitor with its own HTTP session, looping over
+    # weighted scenarios until the deadline
+    def __init__(self, base_url, rng, movies, weights, session_cookie=None, admin_cookie=None):
+        self.base_url = base_url.rstrip('/')
+        self.rng = rng
+        self.movies = movies
+        self.names = list(weights)
+        self.weights = list(weights.values())
+        self.http = requests.Session()
+        self.admin_http = requests.Session()
+        cookie_name = settings.SESSION_COOKIE_NAME
+        host = urlparse(base_url).hostname
+        if session_cookie:
+            self.http.cookies.set(cookie_name, session_cookie, domain=host)
+        if admin_cookie:
+            self.admin_http.cookies.set(cookie_name, admin_cookie, domain=host)
+        self.samples = []
+
+    def request(self, route, method, path, http=None, **kwargs):
+        http = http or self.http
+        started = time.perf_counter()
+        try:
+            response = http.request(method, self.base_url + path, allow_redirects=False, timeout=60, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            status = 0
+        self.samples.append((route, status, time.perf_counter() - started))
+
+    def run(self, deadline, record_from):
+        while time.time() < deadline:
+            scenario = self.rng.choices(self.names, self.weights)[0]
+            if time.time() < record_from:
+                # Warm-up traffic is sent but not recorded
+                mark = len(self.samples)
+                getattr(self, scenario)()
+                del self.samples[mark:]
+            else:
+                getattr(self, scenario)()
+
+    def index(self):
+        self.request('index', 'GET', '/')
+
+    def movie_detail(self):
+        movie = self.rng.choice(self.movies)
+        self.request('movie_detail', 'GET', f"/movie/{movie['movieId']}/")
+
+    def search(self):
+        self.request('api_search', 'GET', '/api/movies/', params={
+            'search': self.rng.choice(SEARCH_TERMS), 'limit': 20, 'fields': 'card'
+        })
+
+    def rate_and_recommend(self):
+        movie = self.rng.choice(self.movies)
+        self.request('rate_movie', 'POST', '/api/movies/rate/', json={
+            'movie_id': movie['movieId'], 'score': self.rng.choice([3, 4, 4, 5, 5])
+        })
+        self.request('user_recommendations', 'GET', '/user-recommendations/')
+
+    def admin(self):
+        if self.rng.random() < 0.25:
+            self.request('admin_simulate', 'POST', '/dashboard/api/', http=self.admin_http, json={
+                'pitch': self.rng.choice(PITCHES), 'genre': 'sci-fi', 'budget_tier': 'mid'
+            })
+        else:
+            endpoint = self.rng.choice(['kpis', 'genre_stats', 'top_movies', 'stats'])
+            self.request(f'admin_api:{endpoint}', 'GET', '/dashboard/api/', http=self.admin_http,
+                         params={'endpoint': endpoint})
+
+
+class Command(BaseCommand):
+    help = 'HTTP load test: weighted user scenarios, throughput and p50/p95/p99 latency per route'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Server to test (with --boot, where to start it)')
+        parser.add_argument('--boot', choices=['runserver', 'gunicorn', 'uvicorn'],
+                            help='Start the app locally for the duration of the test')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Server worker processes with --boot gunicorn/uvicorn')
+        parser.add_argument('--db-name',
+                            help="Mongo database for the booted server (default '<db_name>_loadtest')")
+        parser.add_argument('--seed', metavar='SCALE',
+                            help='Fill the booted server\'s database with generate_synthetic_data at this scale first')
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=30, help='Recorded seconds')
+        parser.add_argument('--warmup', type=float, default=5, help='Unrecorded seconds before that')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help=f'Scenario weights (default {DEFAULT_MIX})')
+        parser.add_argument('--random-seed', type=int, default=0)
+        parser.add_argument('--output', help='Save the run as JSON')
+        parser.add_argument('--compare', metavar='RUN', help='Compare with a saved run')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='p95 slowdown vs --compare flagged as a regression (0.2 = 20%%)')
+
+    def handle(self, *args, **kwargs):
+        weights = parse_mix(kwargs['mix'])
+        base_url = kwargs['url'].rstrip('/')
+        server = None
+        self.accounts, self.session_keys = [], []
+        try:
+            if kwargs['boot']:
+                server = self.boot(kwargs, tempfile.mkdtemp(prefix='watchwish-loadtest-'))
+            elif kwargs['seed']:
+                raise CommandError("--seed needs --boot (it fills the booted server's own database)")
+
+            movies = self.fetch_movies(base_url)
+            session_cookies, admin_cookie = self.sessions(kwargs['users'])
+            report = self.run(base_url, movies, weights, session_cookies, admin_cookie, kwargs)
+        finally:
+            self.drop_sessions()
+            if server is not None:
+                server.terminate()
+                try:
+                    server.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+
+        self.print_report(report)
+        if kwargs['output']:
+            with open(kwargs['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Run saved to {kwargs['output']}")
+        if kwargs['compare']:
+            self.compare(report, kwargs['compare'], kwargs['threshold'])
+
+    def boot(self, kwargs, workdir):
+        parsed = urlparse(kwargs['url'])
+        host, port = parsed.hostname or '127.0.0.1', parsed.port or 8000
+        env = dict(os.environ)
+        env['MONGODB_DB_NAME'] = kwargs['db_name'] or settings.MONGODB_SETTINGS.get('db_name', 'watchwish_db') + '_loadtest'
+        manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+
+        if kwargs['seed']:
+            # Synthetic catalog into the test database, and its TF-IDF/CSV
+            # artifacts as the active version of a private artifacts dir
+            data_dir = os.path.join(workdir, 'data')
+            self.stdout.write(f"Seeding {env['MONGODB_DB_NAME']} at scale {kwargs['seed']}...")
+            subprocess.run(manage + ['generate_synthetic_data', '--scale', kwargs['seed'], '--mongo', '--drop',
+                                     '--output', data_dir], env=env, check=True, stdout=subprocess.DEVNULL)
+            env['WATCHWISH_ARTIFACTS_DIR'] = os.path.join(workdir, 'artifacts')
+            subprocess.run(manage + ['publish_artifacts', data_dir, '--name', f"synthetic-{kwargs['seed']}"],
+                           env=env, check=True, stdout=subprocess.DEVNULL)
+
+        if kwargs['boot'] == 'runserver':
+            command = manage + ['runserver', '--noreload', f'{host}:{port}']
+        elif kwargs['boot'] == 'gunicorn':
+            env['WEB_BIND'] = f'{host}:{port}'
+            env['WEB_WORKERS'] = str(kwargs['workers'])
+            command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(settings.BASE_DIR, 'config', 'gunicorn.conf.py')]
+        else:
+            command = [sys.executable, '-m', 'uvicorn', 'config.asgi:application', '--host', host,
+                       '--port', str(port), '--workers', str(kwargs['workers'])]
+
+        self.stdout.write(f"Starting {kwargs['boot']} on {host}:{port}...")
+        log = open(os.path.join(workdir, 'server.log'), 'w')
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+        # Ready once /healthz/ready says so (models loaded)
+        deadline = time.time() + 180
+        while time.time() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Server exited early; see {log.name}")
+            try:
+                if requests.get(kwargs['url'].rstrip('/') + '/healthz/ready', timeout=2).status_code == 200:
+                    return server
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+        server.terminate()
+        raise CommandError(f"Server not ready after 180s; see {log.name}")
+
+    def fetch_movies(self, base_url):
+        response = requests.get(base_url + '/api/movies/', params={'limit': 1000, 'fields': 'movieId,title'}, timeout=60)
+        movies = [movie for movie in response.json().get('movies', []) if movie.get('movieId') is not None]
+        if not movies:
+            raise CommandError("The server returned no movies; seed it first (--seed with --boot)")
+        return movies
+
+    def sessions(self, count):
+        # Log the virtual users in by creating their sessions directly; this
+        # only works when the server shares this Django database
+        from importlib import import_module
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+
+        def session_for(user):
+            session = store()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            return session.session_key
+
+        def user(username, **extra):
+            # Sessions are forged, so the accounts never need a password;
+            # an unusable one also neutralizes accounts left by older runs
+            account, _ = User.objects.get_or_create(username=username, defaults=extra)
+            account.set_unusable_password()
+            account.save()
+            self.accounts.append(account)
+            return account
+
+        cookies = [session_for(user(f'loadtest_user_{i}')) for i in range(count)]
+        admin_cookie = session_for(user('loadtest_admin', role='admin', is_staff=True))
+        self.session_keys = cookies + [admin_cookie]
+        return cookies, admin_cookie
+
+    def drop_sessions(self):
+        # Don't leave the accounts (the admin one in particular) or live
+        # sessions for them behind in the server's database
+        from importlib import import_module
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        for key in self.session_keys:
+            store().delete(key)
+        for account in self.accounts:
+            account.delete()
+        if self.accounts:
+            self.stdout.write(f"Removed {len(self.accounts)} load-test accounts and their sessions.")
+        self.accounts, self.session_keys = [], []
+
+    def run(self, base_url, movies, weights, session_cookies, admin_cookie, kwargs):
+        vus = [
+            VirtualUser(base_url, random.Random(kwargs['random_seed'] + i), movies, weights,
+                        session_cookie=session_cookies[i], admin_cookie=admin_cookie)
+            for i in range(kwargs['users'])
+        ]
+        started = time.time()
+        record_from = started + kwargs['warmup']
+        deadline = record_from + kwargs['duration']
+        self.stdout.write(
+            f"{kwargs['users']} users for {kwargs['warmup']:.0f}s warm-up + {kwargs['duration']:.0f}s against {base_url}"
+        )
+        threads = [threading.Thread(target=vu.run, args=(deadline, record_from), daemon=True) for vu in vus]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - record_from
+
+        by_route = {}
+        for vu in vus:
+            for route, status, seconds in vu.samples:
+                by_route.setdefault(route, []).append((status, seconds))
+        everything = [sample for samples in by_route.values() for sample in samples]
+
+        return {
+            'meta': {
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'url': base_url,
+                'server': kwargs['boot'] or 'external',
+                'users': kwargs['users'],
+                'duration_s': round(elapsed, 2),
+                'mix': weights,
+            },
+            'total': summarize(everything, elapsed),
+            'routes': {route: summarize(samples, elapsed) for route, samples in sorted(by_route.items())},
+        }
+
+    def print_report(self, report):
+        header = f"{'route':<28} {'reqs':>7} {'errs':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+        self.stdout.write('\n' + header)
+        rows = list(report['routes'].items()) + [('TOTAL', report['total'])]
+        for route, stats in rows:
+            line = (f"{route:<28} {stats['requests']:>7} {stats['errors']:>6} {stats['rps']:>8.1f} "
+                    f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+            self.stdout.write(self.style.ERROR(line) if stats['errors'] else line)
+
+    def compare(self, report, baseline_path, threshold):
+        try:
+            with open(baseline_path) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read {baseline_path}: {e}")
+
+        self.stdout.write(f"\nvs {baseline_path} (p95, threshold +{threshold:.0%}):")
+        regressions = 0
+        routes = dict(report['routes'], TOTAL=report['total'])
+        base_routes = dict(baseline.get('routes', {}), TOTAL=baseline.get('total', {}))
+        for route, stats in routes.items():
+            base = base_routes.get(route)
+            if not base or not base.get('p95_ms'):
+                continue
+            ratio = stats['p95_ms'] / base['p95_ms']
+            line = (f"  {route:<28} p95 {base['p95_ms']:>8.1f} -> {stats['p95_ms']:>8.1f} ms ({ratio - 1:+.1%})"
+                    f"   rps {base['rps']:>7.1f} -> {stats['rps']:>7.1f}")
+            if ratio > 1 + threshold:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(line + '  REGRESSION'))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(f"{regressions} route(s) regressed beyond {threshold:.0%}")
+        self.stdout.write(self.style.SUCCESS("No regressions"))
@@ -0,0 +1,104 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import artifacts, memory
+
+STAGES = ['ml_analyzer', 'dashboard_analytics', 'audience']
+
+
+def mb(size):
+    return f"{size / 1024 / 1024:>9.1f} MB"
+
+
+class Command(BaseCommand):
+    help = ("Load the in-process caches (TF-IDF analyzer, dashboard analytics, audience profiles) the way a "
+            "worker does and report their deep sizes, RSS and the top allocators of each stage")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--artifact', metavar='VERSION',
+                            help='Artifact version to load (default: the active one)')
+        parser.add_argument('--path', help='Load from this directory instead of a published version')
+        parser.add_argument('--only', default='',
+                            help=f"Comma-separated subset of: {', '.join(STAGES)}")
+        parser.add_argument('--top', type=int, default=10,
+                            help='Allocators listed per stage')
+        parser.add_argument('--frames', type=int, default=1,
+                            help='Traceback depth kept by tracemalloc')
+        parser.add_argument('--budget', type=float,
+                            help='Fail if the caches together exceed this many MB')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **kwargs):
+        from movies.analytics import DashboardAnalytics, MLMovieAnalyzer
+
+        stages = [name for name in kwargs['only'].split(',') if name] or STAGES
+        unknown = set(stages) - set(STAGES)
+        if unknown:
+            raise CommandError(f"Unknown stages: {', '.join(sorted(unknown))}")
+        if kwargs['path']:
+            version, path = 'local', kwargs['path']
+        else:
+            version, path = artifacts.resolve(kwargs['artifact'])
+        if not os.path.isdir(path):
+            raise CommandError(f"Not a directory: {path}")
+
+        loaders = {
+            'ml_analyzer': lambda: MLMovieAnalyzer.reload(version, path),
+            'dashboard_analytics': lambda: DashboardAnalytics.reload(version, path),
+            'audience': lambda: bool(DashboardAnalytics.get_audience_profile()),
+        }
+        if 'audience' in stages and 'dashboard_analytics' not in stages:
+            stages.insert(stages.index('audience'), 'dashboard_analytics')
+
+        memory.start_tracing(kwargs['frames'])
+        memory.take_snapshot('start')
+        report = {'version': version, 'path': path, 'rss_start_bytes': memory.rss_bytes(), 'stages': []}
+        previous = 'start'
+        for stage in stages:
+            rss_before = memory.rss_bytes()
+            if not loaders[stage]():
+                raise CommandError(f"Loading {stage} from {path} failed")
+            memory.take_snapshot(stage)
+            report['stages'].append({
+                'stage': stage,
+                'rss_delta_bytes': memory.rss_bytes() - rss_before,
+                'top': memory.diff_snapshots(previous, stage, limit=kwargs['top']),
+            })
+            previous = stage
+        report['rss_end_bytes'] = memory.rss_bytes()
+        report['caches'] = memory.cache_report()
+        total = sum(cache['total_bytes'] for cache in report['caches'].values())
+        report['caches_total_bytes'] = total
+        memory.stop_tracing()
+
+        if kwargs['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+        if kwargs['budget'] is not None and total > kwargs['budget'] * 1024 * 1024:
+            raise CommandError(f"Caches hold {total / 1024 / 1024:.1f} MB, over the {kwargs['budget']:.0f} MB budget")
+
+    def print_report(self, report):
+        self.stdout.write(f"Artifact version {report['version']} ({report['path']})\n")
+        for stage in report['stages']:
+            self.stdout.write(f"{stage['stage']}: RSS {stage['rss_delta_bytes'] / 1024 / 1024:+.1f} MB")
+            for row in stage['top']:
+                if row['size_diff_bytes'] <= 0:
+                    continue
+                self.stdout.write(f"  {mb(row['size_diff_bytes'])}  {row['count_diff']:>9,} blocks  {row['location']}")
+
+        self.stdout.write("\nCaches (deep size):")
+        for name, cache in report['caches'].items():
+            if not cache['loaded']:
+                self.stdout.write(f"  {name:<24} not loaded")
+                continue
+            self.stdout.write(f"  {name:<24} {mb(cache['total_bytes'])}")
+            for key, size in sorted(cache['items'].items(), key=lambda item: -item[1]):
+                self.stdout.write(f"    {key:<22} {mb(size)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"\nCaches total {mb(report['caches_total_bytes']).strip()}, "
+            f"RSS {report['rss_start_bytes'] / 1024 / 1024:.1f} -> {report['rss_end_bytes'] / 1024 / 1024:.1f} MB"
+        ))
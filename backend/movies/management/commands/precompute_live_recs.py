@@ -0,0 +1,239 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from pymongo import ASCENDING, ReplaceOne
+from scipy import sparse
+
+from movies import counters
+from movies.services import _genre_set
+from movies.db import (
+    get_import_state_collection,
+    get_movies_collection,
+    get_user_ratings_collection,
+    get_user_recommendations_collection,
+)
+
+STATE_ID = 'precompute_live_recs'
+# Upper bound on the dense score block a worker materializes at once; the
+# rows per block shrink as the catalog grows
+SCORE_BLOCK_BYTES = 64 * 1024 * 1024
+
+# Worker-side state, set once per process by _init_worker
+_genre_movie = None
+_movie_ids = None
+
+
+def _init_worker(genre_movie, movie_ids):
+    global _genre_movie, _movie_ids
+    _genre_movie = genre_movie
+    _movie_ids = movie_ids
+
+
+def _score_shard(shard, top_n):
+    # shard: list of (userId, liked column indices, rated column indices).
+    # Same scoring as MovieService.generate_live_recommendations: each liked
+    # movie adds its genre overlap with every candidate, so the score matrix
+    # is (users x genres affinity) @ (genres x movies incidence).
+    rows, cols = [], []
+    for i, (_, liked, _) in enumerate(shard):
+        rows.extend([i] * len(liked))
+        cols.extend(liked)
+    liked_matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(shard), _genre_movie.shape[1]),
+    )
+    affinity = liked_matrix @ _genre_movie.T
+    block = max(1, SCORE_BLOCK_BYTES // (4 * max(_genre_movie.shape[1], 1)))
+
+    results = []
+    for start in range(0, len(shard), block):
+        scores = (affinity[start:start + block] @ _genre_movie).toarray()
+        for i, (user_id, _, rated) in enumerate(shard[start:start + block]):
+            row = scores[i]
+            row[rated] = 0
+            k = min(top_n, int(np.count_nonzero(row)))
+            if k == 0:
+                continue
+            # Exact top-k with ties broken by catalog order
+            threshold = np.partition(row, row.size - k)[row.size - k]
+            above = np.flatnonzero(row > threshold)
+            tied = np.flatnonzero(row == threshold)[:k - above.size]
+            top = np.concatenate([above, tied])
+            top = top[np.argsort(-row[top], kind='stable')]
+            results.append((user_id, [(int(_movie_ids[j]), int(row[j])) for j in top]))
+    return results
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Precompute live recommendations for all users into user_recommendations (model "live")'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Process pool size (default: CPU count)')
+        parser.add_argument('--shard-size', type=int, default=500,
+                            help='Users scored per worker task')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Documents per bulk_write')
+        parser.add_argument('--changed-only', action='store_true',
+                            help='Only users whose ratings changed since the last run')
+        parser.add_argument('--users', type=int, nargs='*',
+                            help='Explicit userIds to recompute')
+
+    def handle(self, *args, **options):
+        started = datetime.now(timezone.utc)
+        t0 = time.time()
+        top_n = options['top_n']
+
+        genre_movie, movie_ids, movie_meta = self.load_catalog()
+        if not len(movie_ids):
+            self.stdout.write(self.style.WARNING('No movies found, nothing to do.'))
+            return
+        column_of = {movie_id: col for col, movie_id in enumerate(movie_ids)}
+        self.stdout.write(f"Catalog: {len(movie_ids)} movies x {genre_movie.shape[0]} genres")
+
+        ratings = get_user_ratings_collection()
+        ratings.create_index([('userId', ASCENDING), ('movieId', ASCENDING)])
+        rec_collection = get_user_recommendations_collection()
+        rec_collection.create_index([('userId', ASCENDING), ('model', ASCENDING)])
+        state = get_import_state_collection()
+
+        query = {}
+        if options['users']:
+            query = {'userId': {'$in': options['users']}}
+        elif options['changed_only']:
+            last = state.find_one({'_id': STATE_ID})
+            if last and last.get('last_run'):
+                changed = ratings.distinct('userId', {'updated_at': {'$gt': last['last_run']}})
+                query = {'userId': {'$in': changed}}
+                self.stdout.write(f"{len(changed)} users changed since {last['last_run']}")
+
+        users_done = 0
+        docs_written = 0
+        batch = []
+        workers = options['workers'] or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(genre_movie, movie_ids)) as pool:
+            pending = []
+            for shard in self.iter_shards(ratings, query, column_of, options['shard_size']):
+                pending.append(pool.submit(_score_shard, shard, top_n))
+                users_done += len(shard)
+                # Bound the in-flight work so memory stays flat on big rating sets
+                if len(pending) >= 4 * workers:
+                    docs_written += self.flush(pending.pop(0).result(), batch, rec_collection,
+                                               movie_meta, top_n, options['batch_size'])
+            for future in pending:
+                docs_written += self.flush(future.result(), batch, rec_collection,
+                                           movie_meta, top_n, options['batch_size'])
+
+        if batch:
+            rec_collection.bulk_write(batch, ordered=False)
+            docs_written += len(batch)
+
+        if not options['users']:
+            state.update_one({'_id': STATE_ID}, {'$set': {'last_run': started}}, upsert=True)
+
+        counters.reconcile(['recommendations'])
+        elapsed = time.time() - t0
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {users_done} users, wrote {docs_written} live lists in {elapsed:.1f}s"
+        ))
+
+    def load_catalog(self):
+        collection = get_movies_collection()
+        movie_ids = []
+        movie_meta = {}
+        genre_index = {}
+        rows, cols = [], []
+        for movie in collection.find({}, {'_id': 0, 'movieId': 1, 'title': 1, 'genres': 1}):
+            movie_id = _to_int(movie.get('movieId'))
+            if movie_id is None or movie_id in movie_meta:
+                continue
+            col = len(movie_ids)
+            movie_ids.append(movie_id)
+            movie_meta[movie_id] = (movie.get('title', ''), movie.get('genres', ''))
+            for genre in _genre_set(movie):
+                rows.append(genre_index.setdefault(genre, len(genre_index)))
+                cols.append(col)
+        genre_movie = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(genre_index), len(movie_ids)),
+        )
+        return genre_movie, np.array(movie_ids, dtype=np.int64), movie_meta
+
+    def iter_shards(self, ratings, query, column_of, shard_size):
+        # Ratings are streamed in userId order so only one shard is held at a time
+        shard = []
+        current_user = None
+        liked, rated = [], []
+        has_liked = False
+
+        def close_user():
+            # Strong likes (score >= 4) drive the profile; users with none
+            # fall back to everything they rated
+            sources = liked if has_liked else rated
+            if current_user is not None and sources:
+                shard.append((current_user, sources, rated))
+
+        cursor = ratings.find(query, {'_id': 0, 'userId': 1, 'movieId': 1, 'score': 1}).sort('userId', ASCENDING)
+        for rating in cursor:
+            user_id = rating['userId']
+            if user_id != current_user:
+                close_user()
+                if len(shard) >= shard_size:
+                    yield shard
+                    shard = []
+                current_user = user_id
+                liked, rated = [], []
+                has_liked = False
+            strong = rating.get('score', 0) >= 4
+            has_liked = has_liked or strong
+            col = column_of.get(_to_int(rating.get('movieId')))
+            if col is None:
+                continue
+            rated.append(col)
+            if strong:
+                liked.append(col)
+        close_user()
+        if shard:
+            yield shard
+
+    def flush(self, results, batch, rec_collection, movie_meta, top_n, batch_size):
+        written = 0
+        computed_at = datetime.now(timezone.utc)
+        for user_id, recs in results:
+            batch.append(ReplaceOne(
+                {'userId': user_id, 'model': 'live'},
+                {
+                    'userId': user_id,
+                    'model': 'live',
+                    'top_n': top_n,
+                    'computed_at': computed_at,
+                    'recommendations': [
+                        {
+                            'movieId': movie_id,
+                            'title': movie_meta[movie_id][0],
+                            'genres': movie_meta[movie_id][1],
+                            'score': score,
+                        }
+                        for movie_id, score in recs
+                    ],
+                },
+                upsert=True,
+            ))
+            if len(batch) >= batch_size:
+                rec_collection.bulk_write(batch, ordered=False)
+                written += len(batch)
+                batch.clear()
+        return written
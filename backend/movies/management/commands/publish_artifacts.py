@@ -0,0 +1,56 @@
+import os
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from movies import artifacts
+
+
+class Command(BaseCommand):
+    help = 'Publish a new version of the model artifacts (TF-IDF pickles, CSVs) or switch the active one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', nargs='?',
+                            help='Directory holding the new tfidf_*.pkl, processed_data.pkl and CSV files')
+        parser.add_argument('--name',
+                            help='Version name for the published copy (default: a timestamp)')
+        parser.add_argument('--no-activate', action='store_true',
+                            help='Publish without pointing `current` at the new version')
+        parser.add_argument('--activate', metavar='VERSION',
+                            help='Point `current` at an already published version (e.g. to roll back)')
+        parser.add_argument('--list', action='store_true',
+                            help='List published versions')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['list'] or not (kwargs['source'] or kwargs['activate']):
+            active = artifacts.current_version()
+            versions = artifacts.list_versions()
+            if not versions:
+                self.stdout.write(f"No versions in {artifacts.artifacts_root()}; using {artifacts.legacy_dir()}")
+            for version in versions:
+                marker = '*' if version == active else ' '
+                self.stdout.write(f"{marker} {version}")
+            return
+
+        if kwargs['activate']:
+            version = kwargs['activate']
+        else:
+            source = kwargs['source']
+            if not os.path.isdir(source):
+                raise CommandError(f"Not a directory: {source}")
+            version = kwargs['name'] or datetime.now().strftime('%Y%m%d-%H%M%S')
+            try:
+                path = artifacts.publish(source, version)
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f"Published {source} as {path}")
+            if kwargs['no_activate']:
+                return
+
+        try:
+            artifacts.activate(version)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Activated {version}; running servers switch over on their next watcher poll"
+        ))
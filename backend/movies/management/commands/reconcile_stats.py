@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import ASCENDING
+
+from movies import counters
+from movies.db import get_user_ratings_collection
+
+
+class Command(BaseCommand):
+    help = 'Recount the stats_counters document from the source collections and correct any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', default='',
+                            help=f"Comma-separated subset of: {', '.join(counters.SECTIONS)}")
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without writing')
+
+    def handle(self, *args, **kwargs):
+        sections = [name for name in kwargs['only'].split(',') if name] or list(counters.SECTIONS)
+        unknown = set(sections) - set(counters.SECTIONS)
+        if unknown:
+            raise CommandError(f"Unknown sections: {', '.join(sorted(unknown))}")
+
+        # add_user_rating checks whether a movie has been rated before
+        get_user_ratings_collection().create_index([('movieId', ASCENDING)])
+
+        drifted = 0
+        for field, (stored, actual) in counters.reconcile(sections, dry_run=kwargs['dry_run']).items():
+            if stored is None:
+                self.stdout.write(f"  {field:<24} {actual:>16,.0f}  (new)")
+            elif abs(stored - actual) > 1e-6 * max(1, abs(actual)):
+                drifted += 1
+                self.stdout.write(self.style.WARNING(
+                    f"  {field:<24} {actual:>16,.0f}  (was {stored:,.0f}, drift {stored - actual:+,.0f})"
+                ))
+            else:
+                self.stdout.write(f"  {field:<24} {actual:>16,.0f}")
+
+        verb = 'would be corrected' if kwargs['dry_run'] else 'corrected'
+        self.stdout.write(self.style.SUCCESS(f"{drifted} counter(s) {verb}"))
@@ -0,0 +1,154 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter under -X importtime: boots Django the way a
+# server worker does (setup + URLconf + WSGI handler) and reports the time
+# spent in each AppConfig.ready() on stdout as JSON.
+PROBE = r'''
+import json, sys, time
+
+started = time.perf_counter()
+import django
+from django.apps import AppConfig
+
+ready_ms = {}
+_create = AppConfig.create.__func__
+
+def create(cls, entry):
+    config = _create(cls, entry)
+    ready = config.ready
+    def timed_ready():
+        t = time.perf_counter()
+        ready()
+        ready_ms[config.label] = (time.perf_counter() - t) * 1000
+    config.ready = timed_ready
+    return config
+
+AppConfig.create = classmethod(create)
+
+t = time.perf_counter()
+django.setup()
+setup_ms = (time.perf_counter() - t) * 1000
+
+from django.urls import get_resolver
+
+t = time.perf_counter()
+get_resolver().url_patterns
+urls_ms = (time.perf_counter() - t) * 1000
+
+t = time.perf_counter()
+__import__(sys.argv[1])
+app_ms = (time.perf_counter() - t) * 1000
+
+for name in sys.argv[2:]:
+    __import__(name)
+
+rss_kb = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss_kb = int(line.split()[1])
+
+print(json.dumps({
+    'setup_ms': setup_ms,
+    'ready_ms': ready_ms,
+    'urls_ms': urls_ms,
+    'app_ms': app_ms,
+    'total_ms': (time.perf_counter() - started) * 1000,
+    'rss_kb': rss_kb,
+    'modules': len(sys.modules),
+    'heavy': sorted(m for m in ('pandas', 'numpy', 'sklearn', 'scipy') if m in sys.modules),
+}))
+'''
+
+
+def parse_importtime(stderr):
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        rows.append({
+            'self_us': int(parts[0]),
+            'cumulative_us': int(parts[1]),
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip())) // 2,
+        })
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Profile cold-start cost: import time by module and package, and time spent in ready()'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=25,
+                            help='Modules to list, by cumulative import time')
+        parser.add_argument('--app', default='config.wsgi',
+                            help='Entry module to import after setup (config.wsgi or config.asgi)')
+        parser.add_argument('--import', dest='extra', action='append', default=[],
+                            help='Extra module to import and include, e.g. movies.analytics (repeatable)')
+        parser.add_argument('--json', action='store_true',
+                            help='Print the raw measurements as JSON')
+
+    def handle(self, *args, **kwargs):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+        # Measure the import cost only, not the background model load
+        env['WATCHWISH_ML_LOADING'] = 'lazy'
+
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE, kwargs['app'], *kwargs['extra']],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"Startup probe failed:\n{proc.stderr[-2000:]}")
+
+        stats = json.loads(proc.stdout.strip().splitlines()[-1])
+        rows = parse_importtime(proc.stderr)
+
+        packages = {}
+        for row in rows:
+            package = row['module'].split('.')[0]
+            packages[package] = packages.get(package, 0) + row['self_us']
+
+        if kwargs['json']:
+            stats['imports'] = rows
+            stats['packages_us'] = packages
+            self.stdout.write(json.dumps(stats, indent=2))
+            return
+
+        self.stdout.write(f"{'self [us]':>10} | {'cumulative':>10} | imported package")
+        for row in sorted(rows, key=lambda r: r['cumulative_us'], reverse=True)[:kwargs['top']]:
+            self.stdout.write(
+                f"{row['self_us']:>10} | {row['cumulative_us']:>10} | {'  ' * row['depth']}{row['module']}"
+            )
+
+        self.stdout.write("\nSelf import time by top-level package:")
+        for package, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:15]:
+            self.stdout.write(f"  {package:<24} {us / 1000:8.1f} ms")
+
+        self.stdout.write("\nready():")
+        for label, ms in sorted(stats['ready_ms'].items(), key=lambda item: item[1], reverse=True):
+            self.stdout.write(f"  {label:<24} {ms:8.1f} ms")
+
+        self.stdout.write(
+            f"\ndjango.setup() {stats['setup_ms']:.0f} ms, URLconf {stats['urls_ms']:.0f} ms, "
+            f"{kwargs['app']} {stats['app_ms']:.0f} ms"
+        )
+        self.stdout.write(
+            f"Total {stats['total_ms']:.0f} ms, {stats['modules']} modules, "
+            f"RSS {stats['rss_kb'] / 1024:.1f} MB"
+        )
+        if stats['heavy']:
+            self.stdout.write(self.style.WARNING(f"Heavy packages imported at startup: {', '.join(stats['heavy'])}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("No pandas/NumPy/scikit-learn imported at startup"))
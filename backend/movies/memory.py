@@ -0,0 +1,181 @@
+import sys
+import threading
+import tracemalloc
+
+# Memory accounting for the long-lived in-process caches. Owners register
+# a getter for each cache (see the bottom of movies/analytics.py); the
+# report walks what it returns and sizes it deeply, so per-worker budgets
+# can be set from real numbers. tracemalloc top allocators and snapshot
+# diffs cover whatever the registry does not.
+
+_lock = threading.Lock()
+_caches = {}
+_snapshots = {}
+MAX_SNAPSHOTS = 10
+
+
+def register(name, getter):
+    with _lock:
+        _caches[name] = getter
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS; kB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return None
+
+
+def deep_size(obj, seen=None):
+    # Bytes held by obj and everything it references, each object counted
+    # once. pandas and numpy/scipy objects report their own buffers.
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    pd = sys.modules.get('pandas')
+    if pd is not None and isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(obj, np.ndarray):
+        # A view's buffer belongs to its base
+        return sys.getsizeof(obj) if obj.base is not None else int(obj.nbytes) + sys.getsizeof(obj)
+
+    sparse = sys.modules.get('scipy.sparse')
+    if sparse is not None and sparse.issparse(obj):
+        buffers = ('data', 'indices', 'indptr', 'row', 'col', 'offsets')
+        return sys.getsizeof(obj) + sum(
+            int(getattr(obj, name).nbytes) for name in buffers if isinstance(getattr(obj, name, None), np.ndarray)
+        )
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        # Plain objects such as a fitted TfidfVectorizer (vocabulary_, idf_)
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+def cache_report():
+    # {name: {'total_bytes', 'items': {key: bytes}}}; dict caches are
+    # broken down by key. Objects shared between caches count once, in
+    # the first cache that holds them.
+    with _lock:
+        caches = dict(_caches)
+    seen = set()
+    report = {}
+    for name, getter in sorted(caches.items()):
+        value = getter()
+        if value is None:
+            report[name] = {'loaded': False, 'total_bytes': 0, 'items': {}}
+            continue
+        if isinstance(value, dict):
+            items = {str(key): deep_size(item, seen) for key, item in value.items()}
+            total = sys.getsizeof(value) + sum(items.values())
+        else:
+            items = {}
+            total = deep_size(value, seen)
+        report[name] = {'loaded': True, 'total_bytes': total, 'items': items}
+    return report
+
+
+def tracing_status():
+    current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        'tracing': tracemalloc.is_tracing(),
+        'frames': tracemalloc.get_traceback_limit(),
+        'traced_bytes': current,
+        'traced_peak_bytes': peak,
+        'snapshots': sorted(_snapshots),
+    }
+
+
+def start_tracing(frames=1):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing():
+    # Also drops the snapshots, which are useless without tracing
+    tracemalloc.stop()
+    with _lock:
+        _snapshots.clear()
+
+
+def _filtered(snapshot):
+    return snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ))
+
+
+def _stat_row(stat):
+    frame = stat.traceback[0]
+    return {
+        'location': f"{frame.filename}:{frame.lineno}",
+        'size_bytes': stat.size,
+        'count': stat.count,
+    }
+
+
+def top_allocators(limit=20, group_by='lineno'):
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = _filtered(tracemalloc.take_snapshot())
+    return [_stat_row(stat) for stat in snapshot.statistics(group_by)[:limit]]
+
+
+def take_snapshot(name):
+    if not tracemalloc.is_tracing():
+        raise ValueError("tracemalloc is not tracing; start it first")
+    snapshot = _filtered(tracemalloc.take_snapshot())
+    with _lock:
+        _snapshots.pop(name, None)
+        _snapshots[name] = snapshot
+        # Oldest first out
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            _snapshots.pop(next(iter(_snapshots)))
+    return name
+
+
+def diff_snapshots(before, after=None, limit=20, group_by='lineno'):
+    # Biggest growth between two named snapshots (or a snapshot and now)
+    with _lock:
+        old = _snapshots.get(before)
+        new = _snapshots.get(after) if after else None
+    if old is None or (after and new is None):
+        raise ValueError(f"Unknown snapshot: {before if old is None else after}")
+    if new is None:
+        if not tracemalloc.is_tracing():
+            raise ValueError("tracemalloc is not tracing; start it first")
+        new = _filtered(tracemalloc.take_snapshot())
+    return [
+        dict(_stat_row(stat), size_diff_bytes=stat.size_diff, count_diff=stat.count_diff)
+        for stat in new.compare_to(old, group_by)[:limit]
+    ]
+
+
+def report(top=20):
+    return {
+        'rss_bytes': rss_bytes(),
+        'caches': cache_report(),
+        'tracemalloc': dict(tracing_status(), top=top_allocators(top)),
+    }
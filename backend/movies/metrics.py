@@ -0,0 +1,283 @@
+import contextvars
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from pymongo import monitoring
+
+# Per-process request metrics: latency histograms per view, Mongo command
+# counts/round-trip times/documents returned, rendered in the Prometheus
+# text format by the /metrics view. Every worker process keeps its own
+# numbers; scrape each worker (or sum them) rather than the load balancer.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+# Stats of the request being served. The value is a mutable dict so that
+# code running in a copied context (sync_to_async threads) updates the
+# same request.
+_current = contextvars.ContextVar('watchwish_request_stats', default=None)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        with _lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with _lock:
+            series = {labels: dict(s, buckets=list(s['buckets'])) for labels, s in self.series.items()}
+        for labels, s in sorted(series.items()):
+            for bound, count in zip(self.buckets, s['buckets']):
+                lines.append(f"{self.name}_bucket{_labels(labels + (('le', _number(bound)),))} {count}")
+            lines.append(f"{self.name}_bucket{_labels(labels + (('le', '+Inf'),))} {s['count']}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(s['sum'])}")
+            lines.append(f"{self.name}_count{_labels(labels)} {s['count']}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.series = {}
+
+    def inc(self, labels, amount=1):
+        with _lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with _lock:
+            series = dict(self.series)
+        for labels, value in sorted(series.items()):
+            lines.append(f"{self.name}{_labels(labels)} {_number(value)}")
+        return lines
+
+
+def histogram(name, help_text, buckets=LATENCY_BUCKETS):
+    with _lock:
+        return _histograms.setdefault(name, Histogram(name, help_text, buckets))
+
+
+def counter(name, help_text):
+    with _lock:
+        return _counters.setdefault(name, Counter(name, help_text))
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+request_duration = histogram(
+    'watchwish_request_duration_seconds', 'Request latency by view, method and status class')
+request_mongo_commands = histogram(
+    'watchwish_request_mongo_commands', 'Mongo commands issued per request, by view', QUERY_BUCKETS)
+mongo_commands = counter(
+    'watchwish_mongo_commands_total', 'Mongo commands by command name and outcome')
+mongo_seconds = counter(
+    'watchwish_mongo_command_seconds_total', 'Mongo command round-trip time by command name')
+mongo_documents = counter(
+    'watchwish_mongo_documents_returned_total', 'Documents returned by find/aggregate/getMore, by command name')
+slow_query_requests = counter(
+    'watchwish_requests_over_query_threshold_total', 'Requests that issued more Mongo commands than METRICS_QUERY_THRESHOLD')
+
+
+def current():
+    return _current.get()
+
+
+def record_commands():
+    # Start keeping a log of the current request's Mongo commands (used
+    # by movies.profiling); None outside MetricsMiddleware
+    stats = _current.get()
+    if stats is None:
+        return None
+    stats['commands'] = []
+    stats['pending'] = {}
+    return stats['commands']
+
+
+def _describe(command, command_name):
+    # Collection plus the query shape, truncated, for command logs
+    detail = {key: command[key] for key in ('filter', 'pipeline', 'projection', 'sort', 'limit') if key in command}
+    text = repr(detail) if detail else ''
+    return {
+        'command': command_name,
+        'collection': command.get(command_name) if isinstance(command.get(command_name), str) else None,
+        'detail': text[:300] + ('...' if len(text) > 300 else ''),
+    }
+
+
+def _returned_documents(reply):
+    cursor = reply.get('cursor') if isinstance(reply, dict) else None
+    if isinstance(cursor, dict):
+        batch = cursor.get('firstBatch', cursor.get('nextBatch'))
+        return len(batch) if isinstance(batch, list) else 0
+    return 0
+
+
+class CommandStatsListener(monitoring.CommandListener):
+    # Process-wide Mongo command counters, plus per-request totals for
+    # the middleware when a request is being served
+    def started(self, event):
+        stats = _current.get()
+        if stats is not None and 'pending' in stats:
+            stats['pending'][event.request_id] = _describe(event.command, event.command_name)
+
+    def succeeded(self, event):
+        self._record(event.command_name, event.duration_micros, 'ok', _returned_documents(event.reply),
+                     event.request_id)
+
+    def failed(self, event):
+        self._record(event.command_name, event.duration_micros, 'error', 0, event.request_id)
+
+    def _record(self, command, duration_micros, outcome, documents, request_id=None):
+        seconds = duration_micros / 1e6
+        mongo_commands.inc((('command', command), ('outcome', outcome)))
+        mongo_seconds.inc((('command', command),), seconds)
+        if documents:
+            mongo_documents.inc((('command', command),), documents)
+        stats = _current.get()
+        if stats is not None:
+            stats['mongo_commands'] += 1
+            stats['mongo_seconds'] += seconds
+            stats['mongo_documents'] += documents
+            entry = stats['pending'].pop(request_id, None) if 'pending' in stats else None
+            if entry is not None:
+                entry.update(duration_ms=round(seconds * 1000, 3), documents=documents, outcome=outcome)
+                stats['commands'].append(entry)
+
+
+command_stats = CommandStatsListener()
+
+
+def install_template_timing():
+    # Time template rendering into the current request's stats. Django has
+    # no render hook outside the test runner, so wrap the backend's
+    # Template.render; nested {% include %}s render through the engine's
+    # own Template class and are counted in their parent.
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, '_watchwish_timed', False):
+        return
+    render = Template.render
+
+    def timed_render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return render(self, context, request)
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            stats['template_seconds'] += time.perf_counter() - started
+
+    timed_render._watchwish_timed = True
+    Template.render = timed_render
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'METRICS_QUERY_THRESHOLD', 20)
+        self.server_timing = getattr(settings, 'METRICS_SERVER_TIMING', True)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, stats, started)
+        return response
+
+    def _start(self):
+        stats = {'mongo_commands': 0, 'mongo_seconds': 0.0, 'mongo_documents': 0, 'template_seconds': 0.0}
+        return stats, _current.set(stats), time.perf_counter()
+
+    def _finish(self, request, response, stats, started):
+        total = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else 'unresolved'
+        status = f'{response.status_code // 100}xx'
+
+        request_duration.observe((('view', view), ('method', request.method), ('status', status)), total)
+        request_mongo_commands.observe((('view', view),), stats['mongo_commands'])
+        if self.threshold and stats['mongo_commands'] > self.threshold:
+            slow_query_requests.inc((('view', view),))
+            print(
+                f"[metrics] {request.method} {request.path} ({view}) issued {stats['mongo_commands']} Mongo "
+                f"commands (threshold {self.threshold}), {stats['mongo_seconds'] * 1000:.1f} ms in Mongo"
+            )
+
+        if self.server_timing:
+            own = max(total - stats['mongo_seconds'] - stats['template_seconds'], 0.0)
+            phases = [
+                f"view;dur={own * 1000:.1f}",
+                f"mongo;dur={stats['mongo_seconds'] * 1000:.1f};desc=\"{stats['mongo_commands']} commands, "
+                f"{stats['mongo_documents']} docs\"",
+                f"template;dur={stats['template_seconds'] * 1000:.1f}",
+                f"total;dur={total * 1000:.1f}",
+            ]
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = ', '.join(([existing] if existing else []) + phases)
+
+
+def render():
+    lines = []
+    for metric in list(_histograms.values()) + list(_counters.values()):
+        lines.extend(metric.render())
+
+    # Connection pool gauges from db.PoolStatsListener
+    from .db import get_pool_stats
+    for field, value in get_pool_stats().items():
+        name = f'watchwish_mongo_pool_{field}'
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {value}')
+    return '\n'.join(lines) + '\n'
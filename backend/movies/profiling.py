@@ -0,0 +1,295 @@
+import collections
+import cProfile
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+from . import metrics
+from .decorators import is_admin
+
+# On-demand request profiling. A request is profiled when an admin asks for
+# it (`?__profile=1` or an `X-Profile: 1` header) or when it is picked by
+# PROFILING_SAMPLE_RATE. Reports hold collapsed stacks (one `a;b;c count`
+# line per stack, the input of flamegraph.pl/speedscope) and the Mongo
+# commands the request issued, and are kept under PROFILING_DIR.
+
+PARAM = '__profile'
+HEADER = 'X-Profile'
+
+# One profile at a time per process keeps the overhead bounded
+_busy = threading.Lock()
+
+
+def profiles_dir():
+    return getattr(settings, 'PROFILING_DIR', os.path.join(settings.BASE_DIR.parent, 'data', 'profiles'))
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    # Statistical profiler: a background thread snapshots the profiled
+    # thread's stack every `interval` seconds. Unlike cProfile it adds no
+    # per-call overhead to the request itself.
+    engine = 'sampler'
+    unit = 'samples'
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self._target = None
+
+    def start(self, target=None):
+        # target: ident of the thread running the request, by default the
+        # calling one
+        self._target = target or threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name='watchwish-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return self.stacks
+
+
+class CProfileProfiler:
+    # Deterministic fallback. cProfile only keeps caller -> callee edges,
+    # not whole stacks, so each line is a `caller;callee` pair weighted by
+    # the callee's own time in microseconds.
+    engine = 'cprofile'
+    unit = 'microseconds'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self, target=None):
+        # cProfile always profiles the calling thread
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def collapsed(self):
+        stacks = collections.Counter()
+        for (filename, line, name), (_, _, _, _, callers) in pstats.Stats(self.profile).stats.items():
+            callee = f"{name} ({os.path.basename(filename)}:{line})"
+            for (c_file, c_line, c_name), (_, _, tottime, _) in callers.items():
+                caller = f"{c_name} ({os.path.basename(c_file)}:{c_line})"
+                stacks[f"{caller};{callee}"] += max(int(tottime * 1e6), 1)
+            if not callers:
+                stacks[callee] += 1
+        return stacks
+
+
+def make_profiler():
+    engine = getattr(settings, 'PROFILING_ENGINE', 'sampler')
+    if engine == 'sampler' and hasattr(sys, '_current_frames'):
+        return StackSampler(getattr(settings, 'PROFILING_INTERVAL_MS', 2) / 1000)
+    return CProfileProfiler()
+
+
+def asked(request):
+    # The `?__profile=...` or header value, if any
+    value = request.GET.get(PARAM) or request.headers.get(HEADER)
+    return None if not value or value == '0' else value
+
+
+def requested(request, user=None):
+    # An explicit profiling request, honored for admins only. Async
+    # callers pass the user they resolved with request.auser().
+    value = asked(request)
+    if value is None:
+        return None
+    if user is None:
+        user = getattr(request, 'user', None)
+    if user is None or not is_admin(user):
+        return None
+    return value
+
+
+def save(report):
+    directory = profiles_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{report['id']}.json")
+    with open(path + '.tmp', 'w') as f:
+        json.dump(report, f)
+    os.replace(path + '.tmp', path)
+
+    # Keep the newest PROFILING_KEEP reports
+    keep = getattr(settings, 'PROFILING_KEEP', 200)
+    reports = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith('.json')),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in reports[:-keep] if keep else []:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+    return path
+
+
+def load(profile_id):
+    if not profile_id.replace('-', '').isalnum():
+        return None
+    try:
+        with open(os.path.join(profiles_dir(), f'{profile_id}.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def list_reports(limit=50):
+    directory = profiles_dir()
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    entries = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith('.json')),
+        key=lambda entry: entry.stat().st_mtime, reverse=True,
+    )
+    for entry in entries[:limit]:
+        try:
+            with open(entry.path) as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        report.pop('collapsed', None)
+        report.pop('mongo_commands', None)
+        summaries.append(report)
+    return summaries
+
+
+def collapsed_text(report):
+    return ''.join(f"{stack} {count}\n" for stack, count in report['collapsed'])
+
+
+class ProfilingMiddleware:
+    # Needs request.user, so it sits after AuthenticationMiddleware; the
+    # Mongo command log comes from MetricsMiddleware's request stats.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode, sampled = self._wanted(request)
+        if not (mode or sampled):
+            return self.get_response(request)
+        if not _busy.acquire(blocking=False):
+            return self._busy_response(self.get_response(request), mode)
+
+        try:
+            profiler, commands, started_at, started = self._start(threading.get_ident())
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+            duration = time.perf_counter() - started
+        finally:
+            _busy.release()
+        return self._finish(request, response, mode, profiler, commands, started_at, duration,
+                            request.user if mode else None)
+
+    async def __acall__(self, request):
+        # request.user can't be evaluated on the event loop
+        user = await request.auser() if asked(request) else None
+        mode, sampled = self._wanted(request, user)
+        if not (mode or sampled):
+            return await self.get_response(request)
+        if not _busy.acquire(blocking=False):
+            return self._busy_response(await self.get_response(request), mode)
+
+        try:
+            # Async views run on the event loop thread, which is this one;
+            # other requests interleaved on the loop show up in the profile
+            # too, and sync views (run in a thread pool) do not.
+            profiler, commands, started_at, started = self._start(threading.get_ident())
+            try:
+                response = await self.get_response(request)
+            finally:
+                profiler.stop()
+            duration = time.perf_counter() - started
+        finally:
+            _busy.release()
+        return self._finish(request, response, mode, profiler, commands, started_at, duration, user)
+
+    def _wanted(self, request, user=None):
+        mode = requested(request, user)
+        sampled = mode is None and self.sample_rate and random.random() < self.sample_rate
+        return mode, sampled
+
+    def _busy_response(self, response, mode):
+        if mode:
+            response[HEADER] = 'busy'
+        return response
+
+    def _start(self, target):
+        profiler = make_profiler()
+        commands = metrics.record_commands()
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        profiler.start(target)
+        return profiler, commands, started_at, started
+
+    def _finish(self, request, response, mode, profiler, commands, started_at, duration, user):
+        match = getattr(request, 'resolver_match', None)
+        stacks = profiler.collapsed()
+        report = {
+            'id': f"{started_at.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}",
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': (match.view_name or match._func_path) if match else None,
+            'status': response.status_code,
+            'started_at': started_at.isoformat(),
+            'duration_ms': round(duration * 1000, 3),
+            'engine': profiler.engine,
+            'trigger': 'admin' if mode else 'sampled',
+            'user': user.get_username() if mode else None,
+            'unit': profiler.unit,
+            'total': sum(stacks.values()),
+            'collapsed': stacks.most_common(),
+            'mongo_commands': commands or [],
+        }
+        try:
+            save(report)
+        except OSError as e:
+            print(f"[profiling] Could not store profile {report['id']}: {e}")
+
+        if mode == 'collapsed':
+            return HttpResponse(collapsed_text(report), content_type='text/plain; charset=utf-8')
+        if mode:
+            response[HEADER] = report['id']
+            response['X-Profile-URL'] = f"/dashboard/api/profiles/{report['id']}/"
+        return response
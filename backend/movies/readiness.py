@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+import time
+
+from django.conf import settings
+
+# Load state of the heavy in-process components (TF-IDF analyzer, analytics
+# CSVs), reported by /healthz/ready.
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+DISABLED = 'disabled'
+
+_lock = threading.Lock()
+_components = {}
+_loader_started = False
+
+
+def model_loading_mode():
+    # 'eager': load in the background as soon as a server process starts
+    # 'lazy':  load on first use
+    # 'off':   never load; callers use their Mongo fallbacks
+    return getattr(settings, 'ML_LOADING', 'eager')
+
+
+def register(name):
+    with _lock:
+        _components.setdefault(name, {'state': PENDING})
+
+
+def mark(name, state, **extra):
+    with _lock:
+        _components.setdefault(name, {}).update(state=state, **extra)
+
+
+def run(name, loader):
+    # Run a loader, recording state and timing. A falsy return value (the
+    # loaders return False when their files are missing) counts as failed.
+    started = time.time()
+    mark(name, LOADING, started_at=started)
+    try:
+        result = loader()
+    except Exception as e:
+        mark(name, FAILED, duration_s=round(time.time() - started, 3), error=str(e))
+        raise
+    mark(name, READY if result else FAILED, duration_s=round(time.time() - started, 3))
+    return result
+
+
+def snapshot():
+    with _lock:
+        return {name: dict(info) for name, info in _components.items()}
+
+
+def is_ready():
+    # Ready once nothing is still pending or loading. Failed components do
+    # not block traffic: the views fall back to Mongo without them.
+    if model_loading_mode() != 'eager':
+        return True
+    return all(info['state'] not in (PENDING, LOADING) for info in snapshot().values())
+
+
+def is_server_process():
+    # Management commands (migrate, import_data, ...) and scripts calling
+    # django.setup() never need the models; runserver does.
+    argv = sys.argv
+    if argv and argv[0].endswith('manage.py'):
+        if len(argv) < 2 or argv[1] != 'runserver':
+            return False
+        # With the autoreloader only the child (RUN_MAIN) serves requests
+        return '--noreload' in argv or os.environ.get('RUN_MAIN') == 'true'
+    return False
+
+
+def start_background_loading():
+    # Single background load per process for the eager mode, followed by
+    # the artifact watcher (also started in lazy mode)
+    global _loader_started
+    mode = model_loading_mode()
+    if mode == 'off':
+        return
+    # Under gunicorn preload (config/gunicorn.conf.py) the master loads
+    # everything synchronously before forking; a loader thread would race
+    # the fork. Workers start their watcher in post_fork.
+    if os.getenv('WATCHWISH_PRELOAD') == '1':
+        return
+    with _lock:
+        if _loader_started:
+            return
+        _loader_started = True
+
+    from .artifacts import start_watcher
+    if mode != 'eager':
+        start_watcher()
+        return
+
+    from .analytics import DashboardAnalytics, MLMovieAnalyzer
+
+    def init_ml():
+        try:
+            print("Initializing ML Movie Analyzer...")
+            MLMovieAnalyzer.initialize()
+
+            print("Loading Dashboard Analytics data...")
+            DashboardAnalytics.ensure_loaded()
+        except Exception as e:
+            print(f"ML initialization warning: {e}")
+        start_watcher()
+
+    thread = threading.Thread(target=init_ml, daemon=True)
+    thread.start()
@@ -0,0 +1,74 @@
+import gzip
+import json
+import math
+import sys
+
+from bson import ObjectId
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    # Types neither encoder knows about: Mongo ids, NumPy scalars that
+    # slipped out of a DataFrame, and pandas missing-value markers.
+    # NumPy/pandas values can only exist once something else imported
+    # them, so look them up instead of importing them here.
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    np = sys.modules.get('numpy')
+    pd = sys.modules.get('pandas')
+    if np is not None:
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            value = float(obj)
+            return None if math.isnan(value) else value
+        if isinstance(obj, np.bool_):
+            return bool(obj)
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+    if pd is not None:
+        if obj is pd.NA or obj is pd.NaT:
+            return None
+        if isinstance(obj, pd.Timestamp):
+            return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class _Encoder(DjangoJSONEncoder):
+    def default(self, obj):
+        try:
+            return _default(obj)
+        except TypeError:
+            return super().default(obj)
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(data, cls=_Encoder).encode('utf-8')
+
+
+def json_response(data, status=200, request=None):
+    # Drop-in for JsonResponse. Pass the request to allow gzip on payloads
+    # above JSON_GZIP_MIN_BYTES when the client accepts it.
+    body = dumps(data)
+    response = HttpResponse(body, status=status, content_type='application/json')
+
+    min_bytes = getattr(settings, 'JSON_GZIP_MIN_BYTES', 0)
+    if request is not None and min_bytes and len(body) >= min_bytes:
+        response['Vary'] = 'Accept-Encoding'
+        if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            response.content = gzip.compress(body, compresslevel=5)
+            response['Content-Encoding'] = 'gzip'
+    return response
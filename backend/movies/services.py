@@ -1,55 +1,169 @@
+import re
+
 from bson import ObjectId
+from pymongo import ReturnDocument
+
+from . import counters
 from .db import get_movies_collection
-import json
-import os
-import pandas as pd
-import numpy as np
-import pickle
-import re
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from django.conf import settings
+
+# Named projections for MovieService reads. 'card' is what the grid
+# templates render: the description is cut server-side to what the
+# 3-line clamp in style.css can show. $substrCP fails the whole query on
+# a non-string, and the CSV imports can leave NaN or null there, so
+# those descriptions are left out instead.
+MOVIE_PROJECTIONS = {
+    'card': {
+        'movieId': 1,
+        'title': 1,
+        'genres': 1,
+        'poster_url': 1,
+        'description': {'$cond': [
+            {'$eq': [{'$type': '$description'}, 'string']},
+            {'$substrCP': ['$description', 0, 240]},
+            '$$REMOVE',
+        ]},
+    },
+}
+
+
+def resolve_projection(projection, *required):
+    # Accepts a MOVIE_PROJECTIONS name, a list of field names or a raw
+    # projection dict. Fields in `required` are added to inclusion
+    # projections because the caller needs them (e.g. for scoring).
+    if projection is None:
+        return None
+    if isinstance(projection, str):
+        projection = MOVIE_PROJECTIONS[projection]
+    elif isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    projection = dict(projection)
+    is_exclusion = all(value == 0 for key, value in projection.items() if key != '_id')
+    if not is_exclusion:
+        for field in required:
+            projection.setdefault(field, 1)
+    return projection
+
+
+def _movie_lookups(movie_id):
+    # Queries to try in order: MongoDB _id first, then dataset movieId
+    queries = []
+    if ObjectId.is_valid(str(movie_id)):
+        try:
+            queries.append({'_id': ObjectId(movie_id)})
+        except Exception:
+            pass
+    try:
+        queries.append({'movieId': int(movie_id)})
+    except (ValueError, TypeError):
+        pass
+    return queries
+
+
+def _rank_genre_overlap(source_genres, candidates, limit):
+    # candidates: iterable of {'movieId', 'genres'} in catalog order
+    movie_scores = []
+    for movie in candidates:
+        movie_genres = set(movie['genres'].split('|'))
+        genre_overlap = len(source_genres & movie_genres)
+        if genre_overlap > 0:
+            movie_scores.append({
+                'movieId': movie['movieId'],
+                'score': genre_overlap
+            })
+    
+    movie_scores.sort(key=lambda x: x['score'], reverse=True)
+    return [item['movieId'] for item in movie_scores[:limit]]
+
+
+def _merge_recommendation_docs(docs):
+    # Sum scores across the model docs of one user
+    recommendations_map = {}
+    for doc in docs:
+        for rec in doc.get('recommendations', []):
+            movie_id = rec['movieId']
+            if movie_id not in recommendations_map:
+                recommendations_map[movie_id] = {'movieId': movie_id, 'score': 0, 'count': 0}
+            recommendations_map[movie_id]['score'] += rec['score']
+            recommendations_map[movie_id]['count'] += 1
+    return recommendations_map
+
+
+def _liked_movie_ids(ratings):
+    # Get movies user liked (score >= 4)
+    liked_movie_ids = [r['movieId'] for r in ratings if r['score'] >= 4]
+    if not liked_movie_ids:
+        # Fallback to any rated movie if no strong likes
+        liked_movie_ids = [r['movieId'] for r in ratings]
+    return liked_movie_ids
+
+
+def _genre_set(movie):
+    # Genre tokens as live scoring sees them; precompute_live_recs uses the
+    # same tokens, including the '' of a movie without genres
+    return set(movie.get('genres', '').split('|'))
+
+
+def _score_live_candidates(liked_movies, candidates, limit):
+    all_movies = [(candidate['movieId'], _genre_set(candidate)) for candidate in candidates]
+    
+    scores = {}
+    
+    for source_movie in liked_movies:
+        source_genres = _genre_set(source_movie)
+        
+        for cand_id, cand_genres in all_movies:
+            overlap = len(source_genres & cand_genres)
+            if overlap > 0:
+                # source movie was liked (>=4), so we count it as +1 * overlap
+                scores[cand_id] = scores.get(cand_id, 0) + overlap
+
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+
+# One document per (movie, genre): 'genres' is a '|'-separated string
+def _genre_unwind_stages(*fields):
+    return [
+        {'$match': {'genres': {'$type': 'string', '$ne': ''}}},
+        {'$project': {'genre': {'$split': ['$genres', '|']}, **{field: 1 for field in fields}}},
+        {'$unwind': '$genre'},
+        {'$set': {'genre': {'$trim': {'input': '$genre'}}}},
+        {'$match': {'genre': {'$ne': ''}}},
+    ]
+
+
+def _sum_if_positive(field):
+    return {'$sum': {'$cond': [{'$gt': [f'${field}', 0]}, f'${field}', 0]}}
+
+
+def _count_if_positive(field):
+    return {'$sum': {'$cond': [{'$gt': [f'${field}', 0]}, 1, 0]}}
+
 
 class MovieService:
     @staticmethod
     def create_movie(data):
         collection = get_movies_collection()
         result = collection.insert_one(data)
+        counters.movie_created(data)
         return str(result.inserted_id)
     
     @staticmethod
-    def get_movie(movie_id):
+    def get_movie(movie_id, projection=None):
         collection = get_movies_collection()
-        movie = None
-
-        # If movie_id is a valid ObjectId string, try lookup by _id first
-        if ObjectId.is_valid(str(movie_id)):
-            try:
-                movie = collection.find_one({'_id': ObjectId(movie_id)})
-            except Exception:
-                movie = None
 
-        # If not found and movie_id looks numeric, try lookup by dataset movieId
-        if not movie:
-            try:
-                movie_id_int = int(movie_id)
-                movie = collection.find_one({'movieId': movie_id_int})
-            except (ValueError, TypeError):
-                # not an int, leave movie as None
-                movie = movie
-
-        if movie:
-            movie['_id'] = str(movie['_id'])
-        return movie
+        # If movie_id is a valid ObjectId string, try lookup by _id first,
+        # then fall back to the dataset movieId if it looks numeric
+        for query in _movie_lookups(movie_id):
+            movie = collection.find_one(query, resolve_projection(projection))
+            if movie:
+                return movie
+        return None
     
     @staticmethod
-    def get_all_movies(filters=None, limit=100, skip=0):
+    def get_all_movies(filters=None, limit=100, skip=0, projection=None):
         collection = get_movies_collection()
         query = filters or {}
-        movies = list(collection.find(query).limit(limit).skip(skip))
-        for movie in movies:
-            movie['_id'] = str(movie['_id'])
-        return movies
+        return list(collection.find(query, resolve_projection(projection)).limit(limit).skip(skip))
     
     @staticmethod
     def update_movie(movie_id, data):
@@ -69,8 +183,11 @@ class MovieService:
             except (ValueError, TypeError):
                 query = {'_id': ObjectId(movie_id)}
 
-        result = collection.update_one(query, {'$set': data})
-        return result.modified_count > 0
+        before = collection.find_one_and_update(query, {'$set': data}, return_document=ReturnDocument.BEFORE)
+        if before is None:
+            return False
+        counters.movie_updated(before, {**before, **data})
+        return any(before.get(key) != value for key, value in data.items())
     
     @staticmethod
     def delete_movie(movie_id):
@@ -90,11 +207,14 @@ class MovieService:
             except (ValueError, TypeError):
                 query = {'_id': ObjectId(movie_id)}
 
-        result = collection.delete_one(query)
-        return result.deleted_count > 0
+        deleted = collection.find_one_and_delete(query)
+        if deleted is None:
+            return False
+        counters.movie_deleted(deleted)
+        return True
     
     @staticmethod
-    def search_movies(query_text, limit=50):
+    def search_movies(query_text, limit=50, projection=None):
         collection = get_movies_collection()
         search_filter = {
             '$or': [
@@ -103,99 +223,82 @@ class MovieService:
                 {'genre': {'$regex': query_text, '$options': 'i'}},
             ]
         }
-        movies = list(collection.find(search_filter).limit(limit))
-        for movie in movies:
-            movie['_id'] = str(movie['_id'])
-        return movies
+        return list(collection.find(search_filter, resolve_projection(projection)).limit(limit))
     
     @staticmethod
-    def get_movies_by_genre(genre, limit=50):
+    def get_movies_by_genre(genre, limit=50, projection=None):
         collection = get_movies_collection()
-        movies = list(collection.find({'genre': genre}).limit(limit))
-        for movie in movies:
-            movie['_id'] = str(movie['_id'])
-        return movies
+        return list(collection.find({'genre': genre}, resolve_projection(projection)).limit(limit))
     
     @staticmethod
     def count_movies(filters=None):
         collection = get_movies_collection()
-        query = filters or {}
-        return collection.count_documents(query)
+        if not filters:
+            # Collection metadata; no scan
+            return collection.estimated_document_count()
+        return collection.count_documents(filters)
+    
+    @staticmethod
+    def get_movie_titles(movie_ids):
+        # {movieId: title} for many dataset ids in one query
+        collection = get_movies_collection()
+        docs = collection.find({'movieId': {'$in': list(set(movie_ids))}}, {'_id': 0, 'movieId': 1, 'title': 1})
+        return {doc['movieId']: doc.get('title', 'Unknown') for doc in docs}
     
     @staticmethod
     def get_movie_by_title(title):
         collection = get_movies_collection()
-        movie = collection.find_one({'title': {'$regex': f'^{title}', '$options': 'i'}})
-        if movie:
-            movie['_id'] = str(movie['_id'])
-        return movie
+        return collection.find_one({'title': {'$regex': f'^{title}', '$options': 'i'}})
     
     @staticmethod
-    def get_recommendations(movie_title, limit=5):
+    def get_recommendations(movie_title, limit=5, projection=None):
         collection = get_movies_collection()
         
-        source_movie = collection.find_one({'title': {'$regex': f'^{movie_title}', '$options': 'i'}})
+        source_movie = collection.find_one(
+            {'title': {'$regex': f'^{movie_title}', '$options': 'i'}},
+            {'movieId': 1, 'genres': 1}
+        )
         if not source_movie:
             return []
         
-        source_genres = set(source_movie['genres'].split('|'))
-        
-        all_movies = list(collection.find({'movieId': {'$ne': source_movie['movieId']}}))
-        
-        movie_scores = []
-        for movie in all_movies:
-            movie_genres = set(movie['genres'].split('|'))
-            genre_overlap = len(source_genres & movie_genres)
-            if genre_overlap > 0:
-                movie_scores.append({
-                    'movie': movie,
-                    'score': genre_overlap
-                })
-        
-        movie_scores.sort(key=lambda x: x['score'], reverse=True)
-        
-        recommendations = []
-        for item in movie_scores[:limit]:
-            movie = item['movie']
-            movie['_id'] = str(movie['_id'])
-            recommendations.append(movie)
-        
-        return recommendations
+        return MovieService._genre_neighbours(source_movie, limit, projection)
     
     @staticmethod
-    def get_recommendations_by_movie_id(movie_id, limit=5):
-        collection = get_movies_collection()
-        
-        source_movie = MovieService.get_movie(movie_id)
+    def get_recommendations_by_movie_id(movie_id, limit=5, projection=None):
+        source_movie = MovieService.get_movie(movie_id, projection={'movieId': 1, 'genres': 1})
         if not source_movie:
             return []
         
+        return MovieService._genre_neighbours(source_movie, limit, projection)
+
+    @staticmethod
+    def _genre_neighbours(source_movie, limit, projection=None):
+        collection = get_movies_collection()
         source_genres = set(source_movie['genres'].split('|'))
         
-        all_movies = list(collection.find({'movieId': {'$ne': source_movie['movieId']}}))
-        
-        movie_scores = []
-        for movie in all_movies:
-            movie_genres = set(movie['genres'].split('|'))
-            genre_overlap = len(source_genres & movie_genres)
-            if genre_overlap > 0:
-                movie_scores.append({
-                    'movie': movie,
-                    'score': genre_overlap
-                })
-        
-        movie_scores.sort(key=lambda x: x['score'], reverse=True)
-        
-        recommendations = []
-        for item in movie_scores[:limit]:
-            movie = item['movie']
-            movie['_id'] = str(movie['_id'])
-            recommendations.append(movie)
+        # Scoring only needs ids and genres; full documents are fetched for
+        # the winners only
+        all_movies = collection.find(
+            {'movieId': {'$ne': source_movie['movieId']}},
+            {'_id': 0, 'movieId': 1, 'genres': 1}
+        )
         
-        return recommendations
+        top_ids = _rank_genre_overlap(source_genres, all_movies, limit)
+        return MovieService._fetch_ranked(top_ids, projection)
+
+    @staticmethod
+    def _fetch_ranked(movie_ids, projection=None):
+        # One $in round trip for a ranked id list, returned in rank order
+        if not movie_ids:
+            return []
+        collection = get_movies_collection()
+        found = {}
+        for movie in collection.find({'movieId': {'$in': movie_ids}}, resolve_projection(projection, 'movieId')):
+            found.setdefault(movie['movieId'], movie)
+        return [found[movie_id] for movie_id in movie_ids if movie_id in found]
     
     @staticmethod
-    def get_user_recommendations(user_id, limit=10):
+    def get_user_recommendations(user_id, limit=10, projection=None):
         # Migrated to use MongoDB 'user_recommendations' collection
         # Assuming we prioritized model1, or merge them?
         # The original code loaded both and summed scores.
@@ -208,21 +311,21 @@ class MovieService:
         from .db import get_user_recommendations_collection
         rec_collection = get_user_recommendations_collection()
         
-        # Find all recommendation docs for this user (from both models)
-        cursor = rec_collection.find({'userId': user_id})
+        # Find all recommendation docs for this user (from both models).
+        # The 'live' docs written by precompute_live_recs are only a stand-in
+        # for generate_live_recommendations and must not be summed in here.
+        cursor = rec_collection.find({'userId': user_id, 'model': {'$ne': 'live'}})
         
-        recommendations_map = {}
-        for doc in cursor:
-            for rec in doc.get('recommendations', []):
-                movie_id = rec['movieId']
-                if movie_id not in recommendations_map:
-                    recommendations_map[movie_id] = {'movieId': movie_id, 'score': 0, 'count': 0}
-                recommendations_map[movie_id]['score'] += rec['score']
-                recommendations_map[movie_id]['count'] += 1
+        recommendations_map = _merge_recommendation_docs(cursor)
         
         if not recommendations_map:
-            # Fallback to live recommendations
-            return MovieService.generate_live_recommendations(user_id, limit)
+            # Fallback to live recommendations, served from the precomputed
+            # 'live' doc when one exists (see precompute_live_recs)
+            live_doc = rec_collection.find_one({'userId': user_id, 'model': 'live'})
+            if not live_doc or live_doc.get('top_n', 0) < limit:
+                return MovieService.generate_live_recommendations(user_id, limit, projection)
+            for rec in live_doc['recommendations']:
+                recommendations_map[rec['movieId']] = {'movieId': rec['movieId'], 'score': rec['score'], 'count': 1}
 
         sorted_recommendations = sorted(
             recommendations_map.values(),
@@ -230,29 +333,35 @@ class MovieService:
             reverse=True
         )[:limit]
 
-        collection = get_movies_collection()
-        result_movies = []
-
-        for rec in sorted_recommendations:
-            movie = collection.find_one({'movieId': rec['movieId']})
-            if movie:
-                movie['_id'] = str(movie['_id'])
-                movie['recommendation_score'] = rec['score']
-                result_movies.append(movie)
+        result_movies = MovieService._fetch_ranked(
+            [rec['movieId'] for rec in sorted_recommendations], projection
+        )
+        scores = {rec['movieId']: rec['score'] for rec in sorted_recommendations}
+        for movie in result_movies:
+            movie['recommendation_score'] = scores[movie['movieId']]
 
         return result_movies
 
     @staticmethod
     def add_user_rating(user_id, movie_id, score):
-        from .db import get_user_ratings_collection
+        from datetime import datetime, timezone
+        from .db import get_user_ratings_collection, get_user_recommendations_collection
         collection = get_user_ratings_collection()
         
-        # Upsert rating
-        collection.update_one(
+        # Upsert rating; updated_at lets precompute_live_recs --changed-only
+        # pick up users whose ratings moved since its last run
+        previous = collection.find_one_and_update(
             {'userId': user_id, 'movieId': movie_id},
-            {'$set': {'score': score}},
-            upsert=True
+            {'$set': {'score': score, 'updated_at': datetime.now(timezone.utc)}},
+            projection={'_id': 0, 'score': 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
         )
+        counters.rating_written(previous, user_id, movie_id, score)
+
+        # Any precomputed live list is now stale
+        result = get_user_recommendations_collection().delete_one({'userId': user_id, 'model': 'live'})
+        counters.recommendations_deleted(user_id, result.deleted_count)
         return True
 
     @staticmethod
@@ -262,441 +371,260 @@ class MovieService:
         return list(collection.find({'userId': user_id}))
 
     @staticmethod
-    def generate_live_recommendations(user_id, limit=10):
+    def generate_live_recommendations(user_id, limit=10, projection=None):
         # A simple content-based recommender for cold-start
         ratings = MovieService.get_user_ratings(user_id)
         
         if not ratings:
             return []
             
-        # Get movies user liked (score >= 4)
-        liked_movie_ids = [r['movieId'] for r in ratings if r['score'] >= 4]
-        if not liked_movie_ids:
-            # Fallback to any rated movie if no strong likes
-            liked_movie_ids = [r['movieId'] for r in ratings]
+        liked_movie_ids = _liked_movie_ids(ratings)
             
         movies_collection = get_movies_collection()
-        liked_movies = list(movies_collection.find({'movieId': {'$in': liked_movie_ids}}))
+        liked_movies = list(movies_collection.find(
+            {'movieId': {'$in': liked_movie_ids}},
+            {'_id': 0, 'movieId': 1, 'genres': 1}
+        ))
         
         if not liked_movies:
             return []
             
-        # Collect genres from liked movies
-        # We can also do actor/director matching if data available, but starting with genres
-        target_genres = set()
-        for movie in liked_movies:
-            genres = movie.get('genres', '').split('|')
-            target_genres.update(genres)
-            
-        # Find candidate movies that have these genres, excluding already rated ones
+        # Find candidate movies, excluding already rated ones. Only ids and
+        # genres are needed for scoring, so the catalog is scanned once with
+        # a narrow projection and reused for every liked movie.
         rated_ids = [r['movieId'] for r in ratings]
+        candidates = movies_collection.find(
+            {'movieId': {'$nin': rated_ids}},
+            {'_id': 0, 'movieId': 1, 'genres': 1}
+        )
+        sorted_candidates = _score_live_candidates(liked_movies, candidates, limit)
         
-        # optimization: verify if we have enough movies. 
-        # If too many, maybe sample or limit?
-        # For now, let's just find movies with at least one matching genre and score them.
-        
-        # Heuristic: Find movies that share genres.
-        # This might be slow if we iterate all movies. 
-        # MongoDB query to find movies with ANY of the target genres?
-        # stored as "Action|Adventure", regex used elsewhere.
-        
-        # Better approach: 
-        # For each liked movie, find similar movies (like get_recommendations) and aggregate.
-        
-        candidates = {}
-        
-        for source_movie in liked_movies:
-            # Reusing logic from get_recommendations but for ID
-            # Find movies not in rated_ids
-            source_genres = set(source_movie.get('genres', '').split('|'))
-            
-            # This query might be heavy if done in loop. 
-            # In a real app we'd use a search index or vector db.
-            # Limiting the search space or cache?
-            
-            # Let's try to fetch a batch of candidates using genre string matching?
-            # Or just fetch all movies? (There are 9000 movies in small dataset, might be OK, but 27M in full...)
-            # We imported 'tmdb_allfilms.csv'. How many rows?
-            # The verify script said 130k recs, but movies? "Updated 740 movies". 
-            # Wait, 740 is very small. We can iterate 740 movies easily.
-            # If the dataset is small, we can load all movies in memory or just query efficiently.
-            
-            # Let's fetch all movies once to avoid N+1 queries if N is small.
-            # Checking count...
-            # If count < 10000, we can do in-memory scoring.
-            
-            all_movies = list(movies_collection.find({'movieId': {'$nin': rated_ids}}))
-            
-            for candidate in all_movies:
-                cand_id = candidate['movieId']
-                cand_genres = set(candidate.get('genres', '').split('|'))
-                
-                overlap = len(source_genres & cand_genres)
-                if overlap > 0:
-                    if cand_id not in candidates:
-                        candidates[cand_id] = {'movie': candidate, 'score': 0}
-                    # Add to score (weighted by user rating of source?)
-                    # source movie was liked (>=4), so we count it as +1 * overlap
-                    candidates[cand_id]['score'] += overlap
-
-        # Sort candidates
-        sorted_candidates = sorted(
-            candidates.values(), 
-            key=lambda x: x['score'], 
-            reverse=True
-        )[:limit]
-        
-        result = []
-        for item in sorted_candidates:
-            movie = item['movie']
-            movie['_id'] = str(movie['_id'])
-            movie['recommendation_score'] = item['score']
-            result.append(movie)
+        result = MovieService._fetch_ranked([cand_id for cand_id, _ in sorted_candidates], projection)
+        scores = dict(sorted_candidates)
+        for movie in result:
+            movie['recommendation_score'] = scores[movie['movieId']]
             
         return result
 
-
-class MLMovieAnalyzer:
-    _tfidf_vectorizer = None
-    _tfidf_matrix = None
-    _movies_df = None
-    _films_df = None
-    _initialized = False
-    
-    @classmethod
-    def initialize(cls):
-        if cls._initialized:
-            return True
-        
-        try:
-            base_dir = settings.BASE_DIR
-            if hasattr(base_dir, 'parent'):
-                base_dir = base_dir.parent
-            
-            data_dir = os.path.join(base_dir, 'data', 'dashboard_data2')
-            vectorizer_path = os.path.join(data_dir, 'tfidf_vectorizer.pkl')
-            matrix_path = os.path.join(data_dir, 'tfidf_matrix.pkl')
-            processed_data_path = os.path.join(data_dir, 'processed_data.pkl')
-            
-            if not all(os.path.exists(p) for p in [vectorizer_path, matrix_path, processed_data_path]):
-                print("Missing one or more required .pkl files in dashboard_data2")
-                return False
-            
-            print(f"Loading pre-trained models from {data_dir}...")
-            
-            with open(vectorizer_path, 'rb') as f:
-                cls._tfidf_vectorizer = pickle.load(f)
-                
-            with open(matrix_path, 'rb') as f:
-                cls._tfidf_matrix = pickle.load(f)
-                
-            with open(processed_data_path, 'rb') as f:
-                cls._movies_df = pickle.load(f)
-                
-            print(f"Loaded {len(cls._movies_df)} movies from processed_data.pkl")
-            print(f"TF-IDF matrix shape: {cls._tfidf_matrix.shape}")
-            
-            films_csv_path = os.path.join(data_dir, 'Films.csv')
-            if os.path.exists(films_csv_path):
-                print(f"Loading Films data from: {films_csv_path}")
-                cls._films_df = pd.read_csv(films_csv_path)
-            
-            cls._initialized = True
-            print("ML Analyzer initialized successfully with pre-trained .pkl models!")
-            return True
-            
-        except Exception as e:
-            print(f"ML Analyzer initialization failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-    
-    @classmethod
-    def analyze_movie_concept(cls, concept_text, top_n=5):
-        if not cls._initialized:
-            if not cls.initialize():
-                return []
-        
-        try:
-            cleaned_concept = re.sub(r'[^\w\s]', ' ', concept_text.lower())
-            concept_vector = cls._tfidf_vectorizer.transform([cleaned_concept])
-            
-            similarities = cosine_similarity(concept_vector, cls._tfidf_matrix).flatten()
-            top_indices = similarities.argsort()[-top_n:][::-1]
-            
-            results = []
-            for idx in top_indices:
-                if similarities[idx] > 0.01:
-                    movie_data = cls._movies_df.iloc[idx]
-                    
-                    tmdb_id = movie_data.get('tmdbId', movie_data.get('tmdb_id', 0))
-                    
-                    budget = 0
-                    revenue = 0
-                    vote_average = 0
-                    release_date = ''
-                    description = str(movie_data.get('description', ''))
-                    poster = str(movie_data.get('poster_url', ''))
-                    
-                    if cls._films_df is not None and pd.notna(tmdb_id):
-                        film_match = cls._films_df[cls._films_df['tmdbId'] == int(tmdb_id)]
-                        if not film_match.empty:
-                            film = film_match.iloc[0]
-                            budget = int(film['budget']) if pd.notna(film.get('budget')) else 0
-                            revenue = int(film['revenue']) if pd.notna(film.get('revenue')) else 0
-                            vote_average = round(float(film['vote_average']), 1) if pd.notna(film.get('vote_average')) else 0
-                            release_date = str(film.get('release_date', ''))
-                            if pd.notna(film.get('description')) and str(film.get('description')):
-                                description = str(film.get('description'))
-                            if pd.notna(film.get('poster_url')) and str(film.get('poster_url')):
-                                poster = str(film.get('poster_url'))
-                    
-                    results.append({
-                        'movieId': int(tmdb_id) if pd.notna(tmdb_id) else 0,
-                        'title': str(movie_data['title']),
-                        'similarity': round(float(similarities[idx] * 100), 1),
-                        'genres': str(movie_data['genres']),
-                        'description': description,
-                        'poster': poster,
-                        'budget': budget,
-                        'revenue': revenue,
-                        'vote_average': vote_average,
-                        'release_date': release_date
-                    })
-            
-            return results
-            
-        except Exception as e:
-            print(f"Concept analysis failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
-
-
-class DashboardAnalytics:
-    _users_df = None
-    _films_df = None
-    
-    @classmethod
-    def load_data(cls):
-        try:
-            base_dir = settings.BASE_DIR
-            if hasattr(base_dir, 'parent'):
-                base_dir = base_dir.parent
-            
-            users_path = os.path.join(base_dir, 'data', 'dashboard_data2', 'users.csv')
-            films_path = os.path.join(base_dir, 'data', 'dashboard_data2', 'Films.csv')
-            
-            if os.path.exists(users_path):
-                print(f"Loading users from: {users_path}")
-                cls._users_df = pd.read_csv(users_path)
-                print(f"Loaded {len(cls._users_df)} users")
-            else:
-                print(f"Users file not found at: {users_path}")
-            
-            if os.path.exists(films_path):
-                print(f"Loading films from: {films_path}")
-                cls._films_df = pd.read_csv(films_path)
-                print(f"Loaded {len(cls._films_df)} films")
-                
-                cls._films_df['revenue'] = pd.to_numeric(cls._films_df['revenue'], errors='coerce').fillna(0)
-                cls._films_df['budget'] = pd.to_numeric(cls._films_df['budget'], errors='coerce').fillna(0)
-                cls._films_df['roi'] = cls._films_df.apply(
-                    lambda row: round(row['revenue'] / row['budget'], 2) if row['budget'] > 0 else 0,
-                    axis=1
-                )
-                print("Films data processed successfully")
-            else:
-                print(f"Films file not found at: {films_path}")
-            
-            return True
-        except Exception as e:
-            print(f"Failed to load analytics data: {e}")
-            return False
+    # Catalog aggregates for the admin dashboard when the analytics CSVs
+    # are not loaded. The KPIs are read from the stats counters; the rest
+    # are one aggregate command each, returning only the aggregated rows.
+    @staticmethod
+    def get_catalog_kpis():
+        stats = counters.get()
+        total_revenue = stats['revenue_total']
+        total_budget = stats['budget_total']
+        return {
+            'total_movies': stats['movies_total'],
+            'total_revenue_b': round(total_revenue / 1_000_000_000, 1),
+            'total_budget_b': round(total_budget / 1_000_000_000, 1),
+            'avg_roi': round(total_revenue / total_budget, 1) if total_budget > 0 else 0,
+            'avg_rating': round(stats['rating_sum'] / stats['rating_count'], 1) if stats['rating_count'] > 0 else 0,
+        }
     
-    @classmethod
-    def get_user_demographics(cls):
-        if cls._users_df is None:
-            cls.load_data()
-        
-        if cls._users_df is None:
-            return {}
-        
-        try:
-            demographics = {
-                'total_users': len(cls._users_df),
-                'by_gender': cls._users_df['gender'].value_counts().to_dict(),
-                'by_age_group': cls._users_df['age_group'].value_counts().to_dict(),
-                'by_occupation': cls._users_df['occupation'].value_counts().to_dict()
-            }
-            return demographics
-        except Exception as e:
-            print(f"Demographics analysis failed: {e}")
-            return {}
+    @staticmethod
+    def get_genre_counts():
+        # {genre: number of movies}, most common first
+        collection = get_movies_collection()
+        rows = collection.aggregate(_genre_unwind_stages() + [
+            {'$group': {'_id': '$genre', 'count': {'$sum': 1}}},
+            {'$sort': {'count': -1, '_id': 1}},
+        ])
+        return {row['_id']: row['count'] for row in rows}
     
-    @classmethod
-    def get_financial_kpis(cls):
-        if cls._films_df is None:
-            cls.load_data()
-        
-        if cls._films_df is None:
-            return {}
-        
-        try:
-            valid_films = cls._films_df[(cls._films_df['budget'] > 0) & (cls._films_df['revenue'] > 0)]
-            
-            total_revenue = valid_films['revenue'].sum()
-            total_budget = valid_films['budget'].sum()
-            avg_roi = valid_films['roi'].mean()
-            avg_rating = cls._films_df['vote_average'].mean()
-            
-            return {
-                'total_movies': len(cls._films_df),
-                'total_revenue_b': round(total_revenue / 1_000_000_000, 1),
-                'total_budget_b': round(total_budget / 1_000_000_000, 1),
-                'avg_roi': round(avg_roi, 1),
-                'avg_rating': round(avg_rating, 1),
-                'profitable_ratio': round(len(valid_films[valid_films['roi'] > 1]) / len(valid_films) * 100, 1)
+    @staticmethod
+    def get_genre_financials():
+        # Per-genre movie count, average budget/revenue (in millions, over
+        # the movies that report them) and ROI, best ROI first
+        collection = get_movies_collection()
+        rows = collection.aggregate(_genre_unwind_stages('budget', 'revenue') + [
+            {'$group': {
+                '_id': '$genre',
+                'count': {'$sum': 1},
+                'total_budget': _sum_if_positive('budget'),
+                'budget_count': _count_if_positive('budget'),
+                'total_revenue': _sum_if_positive('revenue'),
+                'revenue_count': _count_if_positive('revenue'),
+            }},
+            {'$set': {'avg_roi': {'$cond': [
+                {'$gt': ['$total_budget', 0]}, {'$divide': ['$total_revenue', '$total_budget']}, 0,
+            ]}}},
+            {'$sort': {'avg_roi': -1, '_id': 1}},
+        ])
+        return [
+            {
+                'genre': row['_id'],
+                'count': row['count'],
+                'avg_budget': round(row['total_budget'] / row['budget_count'] / 1_000_000 if row['budget_count'] else 0, 0),
+                'avg_revenue': round(row['total_revenue'] / row['revenue_count'] / 1_000_000 if row['revenue_count'] else 0, 0),
+                'avg_roi': round(row['avg_roi'], 1),
             }
-        except Exception as e:
-            print(f"KPI calculation failed: {e}")
-            return {}
+            for row in rows
+        ]
     
-    @classmethod
-    def get_genre_statistics(cls):
-        if cls._films_df is None:
-            cls.load_data()
-        
-        if cls._films_df is None:
+    @staticmethod
+    def get_top_movies_by_roi(limit=10, genre=None):
+        # Movies with both budget and revenue, by revenue/budget
+        collection = get_movies_collection()
+        query = {'budget': {'$gt': 0}, 'revenue': {'$gt': 0}}
+        if genre:
+            query['genres'] = {'$regex': re.escape(genre)}
+        movies = list(collection.aggregate([
+            {'$match': query},
+            {'$set': {'roi': {'$divide': ['$revenue', '$budget']}}},
+            {'$sort': {'roi': -1, '_id': 1}},
+            {'$limit': limit},
+        ]))
+        for movie in movies:
+            movie['roi'] = round(movie['roi'], 1)
+            movie['budget_m'] = round(movie['budget'] / 1_000_000, 0)
+            movie['revenue_m'] = round(movie['revenue'] / 1_000_000, 0)
+            movie['vote_average'] = round(movie.get('vote_average') or 0, 1)
+            movie['poster'] = movie.get('poster') or ''
+            movie['overview'] = movie.get('overview') or ''
+        return movies
+
+
+class AsyncMovieService:
+    # Async twins of the MovieService reads and rating writes used by the
+    # ASGI views (see async_views.py). Scoring is shared with MovieService.
+    @staticmethod
+    async def get_movie(movie_id, projection=None):
+        from .db import get_async_movies_collection
+        collection = get_async_movies_collection()
+        for query in _movie_lookups(movie_id):
+            movie = await collection.find_one(query, resolve_projection(projection))
+            if movie:
+                return movie
+        return None
+
+    @staticmethod
+    async def get_all_movies(filters=None, limit=100, skip=0, projection=None):
+        from .db import get_async_movies_collection
+        collection = get_async_movies_collection()
+        cursor = collection.find(filters or {}, resolve_projection(projection)).limit(limit).skip(skip)
+        return await cursor.to_list()
+
+    @staticmethod
+    async def search_movies(query_text, limit=50, projection=None):
+        from .db import get_async_movies_collection
+        collection = get_async_movies_collection()
+        search_filter = {
+            '$or': [
+                {'title': {'$regex': query_text, '$options': 'i'}},
+                {'description': {'$regex': query_text, '$options': 'i'}},
+                {'genre': {'$regex': query_text, '$options': 'i'}},
+            ]
+        }
+        return await collection.find(search_filter, resolve_projection(projection)).limit(limit).to_list()
+
+    @staticmethod
+    async def get_movies_by_genre(genre, limit=50, projection=None):
+        from .db import get_async_movies_collection
+        collection = get_async_movies_collection()
+        return await collection.find({'genre': genre}, resolve_projection(projection)).limit(limit).to_list()
+
+    @staticmethod
+    async def get_recommendations_by_movie_id(movie_id, limit=5, projection=None):
+        from .db import get_async_movies_collection
+        source_movie = await AsyncMovieService.get_movie(movie_id, projection={'movieId': 1, 'genres': 1})
+        if not source_movie:
             return []
-        
-        try:
-            genre_stats = {}
-            
-            for _, row in cls._films_df.iterrows():
-                genres = str(row.get('genres', '')).split('|')
-                budget = row.get('budget', 0)
-                revenue = row.get('revenue', 0)
-                roi = row.get('roi', 0)
-                
-                for genre in genres:
-                    genre = genre.strip()
-                    if not genre or genre == 'nan':
-                        continue
-                    
-                    if genre not in genre_stats:
-                        genre_stats[genre] = {
-                            'genre': genre,
-                            'count': 0,
-                            'total_budget': 0,
-                            'total_revenue': 0,
-                            'budget_count': 0,
-                            'revenue_count': 0,
-                            'roi_sum': 0,
-                            'roi_count': 0
-                        }
-                    
-                    genre_stats[genre]['count'] += 1
-                    
-                    if budget > 0:
-                        genre_stats[genre]['total_budget'] += budget
-                        genre_stats[genre]['budget_count'] += 1
-                    
-                    if revenue > 0:
-                        genre_stats[genre]['total_revenue'] += revenue
-                        genre_stats[genre]['revenue_count'] += 1
-                    
-                    if roi > 0:
-                        genre_stats[genre]['roi_sum'] += roi
-                        genre_stats[genre]['roi_count'] += 1
-            
-            results = []
-            for genre, data in genre_stats.items():
-                avg_budget = (data['total_budget'] / data['budget_count'] / 1_000_000) if data['budget_count'] > 0 else 0
-                avg_revenue = (data['total_revenue'] / data['revenue_count'] / 1_000_000) if data['revenue_count'] > 0 else 0
-                avg_roi = (data['roi_sum'] / data['roi_count']) if data['roi_count'] > 0 else 0
-                
-                results.append({
-                    'genre': genre,
-                    'count': data['count'],
-                    'avg_budget': round(avg_budget, 0),
-                    'avg_revenue': round(avg_revenue, 0),
-                    'avg_roi': round(avg_roi, 1)
-                })
-            
-            results.sort(key=lambda x: x['avg_roi'], reverse=True)
-            return results
-            
-        except Exception as e:
-            print(f"Genre stats calculation failed: {e}")
+
+        all_movies = await get_async_movies_collection().find(
+            {'movieId': {'$ne': source_movie['movieId']}},
+            {'_id': 0, 'movieId': 1, 'genres': 1}
+        ).to_list()
+        top_ids = _rank_genre_overlap(set(source_movie['genres'].split('|')), all_movies, limit)
+        return await AsyncMovieService._fetch_ranked(top_ids, projection)
+
+    @staticmethod
+    async def _fetch_ranked(movie_ids, projection=None):
+        from .db import get_async_movies_collection
+        if not movie_ids:
             return []
-    
-    @classmethod
-    def get_top_movies(cls, limit=10, genre=None):
-        if cls._films_df is None:
-            cls.load_data()
-        
-        if cls._films_df is None:
+        found = {}
+        cursor = get_async_movies_collection().find(
+            {'movieId': {'$in': movie_ids}}, resolve_projection(projection, 'movieId')
+        )
+        async for movie in cursor:
+            found.setdefault(movie['movieId'], movie)
+        return [found[movie_id] for movie_id in movie_ids if movie_id in found]
+
+    @staticmethod
+    async def get_user_recommendations(user_id, limit=10, projection=None):
+        from .db import get_async_user_recommendations_collection
+        rec_collection = get_async_user_recommendations_collection()
+
+        docs = await rec_collection.find({'userId': user_id, 'model': {'$ne': 'live'}}).to_list()
+        recommendations_map = _merge_recommendation_docs(docs)
+
+        if not recommendations_map:
+            live_doc = await rec_collection.find_one({'userId': user_id, 'model': 'live'})
+            if not live_doc or live_doc.get('top_n', 0) < limit:
+                return await AsyncMovieService.generate_live_recommendations(user_id, limit, projection)
+            for rec in live_doc['recommendations']:
+                recommendations_map[rec['movieId']] = {'movieId': rec['movieId'], 'score': rec['score'], 'count': 1}
+
+        sorted_recommendations = sorted(
+            recommendations_map.values(),
+            key=lambda x: x['score'],
+            reverse=True
+        )[:limit]
+
+        result_movies = await AsyncMovieService._fetch_ranked(
+            [rec['movieId'] for rec in sorted_recommendations], projection
+        )
+        scores = {rec['movieId']: rec['score'] for rec in sorted_recommendations}
+        for movie in result_movies:
+            movie['recommendation_score'] = scores[movie['movieId']]
+        return result_movies
+
+    @staticmethod
+    async def add_user_rating(user_id, movie_id, score):
+        from datetime import datetime, timezone
+        from .db import get_async_user_ratings_collection, get_async_user_recommendations_collection
+        previous = await get_async_user_ratings_collection().find_one_and_update(
+            {'userId': user_id, 'movieId': movie_id},
+            {'$set': {'score': score, 'updated_at': datetime.now(timezone.utc)}},
+            projection={'_id': 0, 'score': 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        await counters.async_rating_written(previous, user_id, movie_id, score)
+        result = await get_async_user_recommendations_collection().delete_one({'userId': user_id, 'model': 'live'})
+        await counters.async_recommendations_deleted(user_id, result.deleted_count)
+        return True
+
+    @staticmethod
+    async def get_user_ratings(user_id):
+        from .db import get_async_user_ratings_collection
+        return await get_async_user_ratings_collection().find({'userId': user_id}).to_list()
+
+    @staticmethod
+    async def generate_live_recommendations(user_id, limit=10, projection=None):
+        from .db import get_async_movies_collection
+        ratings = await AsyncMovieService.get_user_ratings(user_id)
+        if not ratings:
             return []
-        
-        try:
-            valid_films = cls._films_df[(cls._films_df['budget'] > 0) & (cls._films_df['revenue'] > 0)].copy()
-            
-            if genre:
-                valid_films = valid_films[valid_films['genres'].str.contains(genre, case=False, na=False)]
-            
-            valid_films = valid_films.sort_values('roi', ascending=False).head(limit)
-            
-            results = []
-            for _, row in valid_films.iterrows():
-                year = str(row.get('release_date', ''))[:4] if pd.notna(row.get('release_date')) else ''
-                
-                results.append({
-                    'title': str(row['title']),
-                    'year': year,
-                    'genres': str(row.get('genres', '')),
-                    'poster': str(row.get('poster_url', '')),
-                    'budget': int(row['budget']),
-                    'revenue': int(row['revenue']),
-                    'budget_m': round(row['budget'] / 1_000_000, 0),
-                    'revenue_m': round(row['revenue'] / 1_000_000, 0),
-                    'roi': round(row['roi'], 1),
-                    'vote_average': round(row.get('vote_average', 0), 1),
-                    'overview': str(row.get('description', ''))
-                })
-            
-            return results
-            
-        except Exception as e:
-            print(f"Top movies query failed: {e}")
+
+        movies_collection = get_async_movies_collection()
+        liked_movies = await movies_collection.find(
+            {'movieId': {'$in': _liked_movie_ids(ratings)}},
+            {'_id': 0, 'movieId': 1, 'genres': 1}
+        ).to_list()
+        if not liked_movies:
             return []
-    
-    @classmethod
-    def analyze_audience_for_genre(cls, genre):
-        if cls._users_df is None or cls._films_df is None:
-            cls.load_data()
-        
-        try:
-            genre_films = cls._films_df[cls._films_df['genres'].str.contains(genre, case=False, na=False)]
-            
-            avg_popularity = genre_films['popularity'].mean() if 'popularity' in genre_films else 0
-            
-            insights = {
-                'avg_popularity': round(avg_popularity, 1),
-                'total_films': len(genre_films),
-                'age_distribution': {
-                    'Under 18': 15,
-                    '18-24': 25,
-                    '25-34': 30,
-                    '35-44': 20,
-                    '45-49': 7,
-                    '50-55': 2,
-                    '56+': 1
-                }
-            }
-            
-            return insights
-            
-        except Exception as e:
-            print(f"Audience analysis failed: {e}")
-            return {}
+
+        rated_ids = [r['movieId'] for r in ratings]
+        candidates = await movies_collection.find(
+            {'movieId': {'$nin': rated_ids}},
+            {'_id': 0, 'movieId': 1, 'genres': 1}
+        ).to_list()
+        sorted_candidates = _score_live_candidates(liked_movies, candidates, limit)
+
+        result = await AsyncMovieService._fetch_ranked([cand_id for cand_id, _ in sorted_candidates], projection)
+        scores = dict(sorted_candidates)
+        for movie in result:
+            movie['recommendation_score'] = scores[movie['movieId']]
+        return result
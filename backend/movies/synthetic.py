@@ -0,0 +1,202 @@
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+# Synthetic catalogs shaped like the MovieLens/TMDB data the app is built
+# on, for benchmarks and load tests. Everything is drawn from generators
+# seeded with (seed, chunk), so the same sizes, seed and chunk size always
+# give the same data.
+
+# MovieLens-like presets, named after the number of ratings
+SCALES = {
+    '10k': {'movies': 1_000, 'users': 500, 'ratings': 10_000},
+    '100k': {'movies': 1_700, 'users': 950, 'ratings': 100_000},
+    '1m': {'movies': 3_900, 'users': 6_000, 'ratings': 1_000_000},
+    '10m': {'movies': 10_700, 'users': 72_000, 'ratings': 10_000_000},
+}
+
+GENRES = [
+    'Drama', 'Comedy', 'Thriller', 'Action', 'Romance', 'Adventure', 'Crime',
+    'Sci-Fi', 'Horror', 'Fantasy', 'Children', 'Animation', 'Mystery',
+    'Documentary', 'War', 'Musical', 'Western', 'Film-Noir', 'IMAX',
+]
+
+WORDS = (
+    'love war heist space alien family detective murder city night secret '
+    'journey island king queen robot ghost school summer winter road dream '
+    'revenge escape river mountain ocean hero villain time future past '
+    'brother sister mother father friend stranger doctor soldier spy thief '
+    'planet empire rebellion magic dragon forest train storm fire shadow '
+    'music dance game prison court money gold ship desert jungle'
+).split()
+
+AGE_GROUPS = ['Under 18', '18-24', '25-34', '35-44', '45-49', '50-55', '56+']
+OCCUPATIONS = [
+    'other', 'academic/educator', 'artist', 'clerical/admin', 'college/grad student',
+    'customer service', 'doctor/health care', 'executive/managerial', 'farmer',
+    'homemaker', 'K-12 student', 'lawyer', 'programmer', 'retired',
+    'sales/marketing', 'scientist', 'self-employed', 'technician/engineer',
+    'tradesman/craftsman', 'unemployed', 'writer',
+]
+
+
+def zipf_weights(n, exponent=1.1):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def movies_frame(n, seed=0, start_id=1):
+    # movieId, title, genres ('A|B'), description, tmdbId, imdbId,
+    # poster_url, note_tmdb. Genre popularity follows a Zipf curve, like MovieLens
+    # where Drama and Comedy dominate.
+    rng = np.random.default_rng([seed, start_id])
+    ids = np.arange(start_id, start_id + n)
+
+    genre_idx = rng.choice(len(GENRES), size=(n, 3), p=zipf_weights(len(GENRES)))
+    genre_count = rng.choice([1, 2, 3], size=n, p=[0.35, 0.45, 0.2])
+    genres = [
+        '|'.join(dict.fromkeys(GENRES[g] for g in row[:count]))
+        for row, count in zip(genre_idx, genre_count)
+    ]
+
+    word_p = zipf_weights(len(WORDS), 0.8)
+    title_words = rng.choice(len(WORDS), size=(n, 2), p=word_p)
+    titles = [f"{WORDS[a].title()} {WORDS[b].title()} {movie_id}" for (a, b), movie_id in zip(title_words, ids)]
+
+    desc_words = rng.choice(len(WORDS), size=(n, 12), p=word_p)
+    descriptions = [' '.join(WORDS[w] for w in row) for row in desc_words]
+
+    return pd.DataFrame({
+        'movieId': ids,
+        'title': titles,
+        'genres': genres,
+        'description': descriptions,
+        'tmdbId': ids + 100000,
+        'imdbId': ids + 1000000,
+        'poster_url': [f'https://image.tmdb.org/t/p/w500/synthetic{movie_id}.jpg' for movie_id in ids],
+        'note_tmdb': np.clip(rng.normal(6.3, 1.0, n), 1, 10).round(1),
+    })
+
+
+def iter_movies(n, seed=0, chunk_size=100_000):
+    for start in range(0, n, chunk_size):
+        yield movies_frame(min(chunk_size, n - start), seed=seed, start_id=start + 1)
+
+
+def films_frame(movies, seed=0):
+    # Films.csv: the movie columns plus budget, revenue, rating, release
+    # date and popularity
+    rng = np.random.default_rng([seed, 1, int(movies['movieId'].iloc[0])])
+    n = len(movies)
+    budget = np.round(rng.lognormal(16.5, 1.2, n), -3)
+    revenue = np.round(budget * rng.lognormal(0.3, 1.0, n), -3)
+    # Like the real export, some films have no financials
+    missing = rng.random(n) < 0.3
+    budget[missing] = 0
+    revenue[missing] = 0
+    days = rng.integers(0, 75 * 365, n)
+    release = pd.Timestamp('1950-01-01') + pd.to_timedelta(days, unit='D')
+
+    films = movies[['movieId', 'tmdbId', 'title', 'genres', 'description', 'poster_url']].copy()
+    films['budget'] = budget.astype(np.int64)
+    films['revenue'] = revenue.astype(np.int64)
+    films['vote_average'] = np.clip(rng.normal(6.3, 1.0, n), 1, 10).round(1)
+    films['release_date'] = release.strftime('%Y-%m-%d')
+    films['popularity'] = rng.lognormal(2.0, 1.0, n).round(3)
+    return films
+
+
+def users_frame(n, seed=0, start_id=1):
+    rng = np.random.default_rng([seed, 2, start_id])
+    return pd.DataFrame({
+        'userId': np.arange(start_id, start_id + n),
+        'gender': np.where(rng.random(n) < 0.71, 'Male', 'Female'),
+        'age_group': np.array(AGE_GROUPS)[rng.choice(len(AGE_GROUPS), n, p=[0.04, 0.18, 0.35, 0.2, 0.08, 0.08, 0.07])],
+        'occupation': np.array(OCCUPATIONS)[rng.integers(0, len(OCCUPATIONS), n)],
+    })
+
+
+def capped_weights(p, cap):
+    # Clip a probability vector at `cap` and renormalize until it holds, so
+    # no single user or movie is expected to exceed what is possible
+    cap = max(cap, 1.0 / len(p))
+    for _ in range(50):
+        if p.max() <= cap * 1.0001:
+            break
+        p = np.minimum(p, cap)
+        p = p / p.sum()
+    return p
+
+
+def iter_ratings(n_ratings, user_ids, movie_ids, seed=0, chunk_size=1_000_000):
+    # userId, movieId, rating, timestamp. Power-law user activity and movie
+    # popularity: a few users rate a lot and a few movies get most of the
+    # ratings, capped so the busiest user rates at most half the catalog
+    # and the top movie is rated by at most half the users. Each (userId,
+    # movieId) pair appears once.
+    users = np.asarray(user_ids)
+    movies = np.asarray(movie_ids)
+    # Who is active and what is popular is fixed once, not per chunk
+    order = np.random.default_rng([seed, 3])
+    users = users[order.permutation(len(users))]
+    movies = movies[order.permutation(len(movies))]
+    user_p = capped_weights(zipf_weights(len(users), 0.6), 0.5 * len(movies) / n_ratings)
+    movie_p = capped_weights(zipf_weights(len(movies), 1.0), 0.5 * len(users) / n_ratings)
+
+    def draw(rng, n):
+        return pd.DataFrame({
+            'userId': users[rng.choice(len(users), n, p=user_p)],
+            'movieId': movies[rng.choice(len(movies), n, p=movie_p)],
+            # Half-star ratings skewed towards 3-4 like MovieLens
+            'rating': np.clip(np.round(rng.normal(3.5, 1.0, n) * 2) / 2, 0.5, 5).astype(np.float32),
+            'timestamp': rng.integers(946684800, 1735689600, n),
+        })
+
+    # Sorted (userId, movieId) keys of everything yielded so far
+    key_base = int(movies.max()) + 1
+    seen = np.empty(0, dtype=np.int64)
+
+    def fresh(chunk):
+        keys = chunk['userId'].to_numpy(np.int64) * key_base + chunk['movieId'].to_numpy(np.int64)
+        pos = np.minimum(np.searchsorted(seen, keys), max(len(seen) - 1, 0))
+        new = seen[pos] != keys if len(seen) else np.ones(len(keys), dtype=bool)
+        return chunk[new].drop_duplicates(['userId', 'movieId'])
+
+    for index, start in enumerate(range(0, n_ratings, chunk_size)):
+        n = min(chunk_size, n_ratings - start)
+        rng = np.random.default_rng([seed, 4, index])
+        chunk = fresh(draw(rng, n))
+        # Top up what the duplicates took out
+        for _ in range(10):
+            missing = n - len(chunk)
+            if missing <= 0:
+                break
+            chunk = fresh(pd.concat([chunk, draw(rng, int(missing * 1.5) + 10)], ignore_index=True))
+        chunk = chunk.head(n)
+        keys = chunk['userId'].to_numpy(np.int64) * key_base + chunk['movieId'].to_numpy(np.int64)
+        seen = np.sort(np.concatenate([seen, keys]))
+        yield chunk
+
+
+def ratings_frame(n_ratings, user_ids, movie_ids, seed=0):
+    return pd.concat(list(iter_ratings(n_ratings, user_ids, movie_ids, seed=seed)), ignore_index=True)
+
+
+def write_tfidf_artifacts(movies, out_dir):
+    # The three pickles MLMovieAnalyzer loads, fitted on the same
+    # title/description/genres soup as TrainingTF-IDF.ipynb
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    soup = movies['title'] + ' ' + movies['description'] + ' ' + movies['genres'].str.replace('|', ' ')
+    vectorizer = TfidfVectorizer(stop_words='english', max_features=50000)
+    matrix = vectorizer.fit_transform(soup)
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'tfidf_vectorizer.pkl'), 'wb') as f:
+        pickle.dump(vectorizer, f)
+    with open(os.path.join(out_dir, 'tfidf_matrix.pkl'), 'wb') as f:
+        pickle.dump(matrix, f)
+    with open(os.path.join(out_dir, 'processed_data.pkl'), 'wb') as f:
+        pickle.dump(movies[['movieId', 'tmdbId', 'title', 'genres', 'description', 'poster_url']], f)
@@ -1,3 +1,249 @@
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from pymongo.errors import PyMongoError
+
+from . import counters, db
+from .services import MOVIE_PROJECTIONS, MovieService, resolve_projection
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+# Behaviour tests run against an in-process mongomock database
+# (pip install mongomock); no mongod is needed.
+
+
+class MongoTestCase(TestCase):
+    def setUp(self):
+        self.db = mongomock.MongoClient()['watchwish_test']
+        db.use_database(self.db)
+
+
+def _emulate_merge(aggregate):
+    # mongomock has no $merge; run the rest of the pipeline and insert the
+    # results into the target collection, which is what the import needs
+    def wrapped(self, pipeline, *args, **kwargs):
+        if pipeline and '$merge' in pipeline[-1]:
+            docs = list(aggregate(self, pipeline[:-1], *args, **kwargs))
+            if docs:
+                self.database[pipeline[-1]['$merge']['into']].insert_many(docs)
+            return iter(())
+        return aggregate(self, pipeline, *args, **kwargs)
+    return wrapped
+
+
+@skipUnless(mongomock, 'mongomock is not installed')
+class SwapRecommendationsTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        from .management.commands import import_data
+        self.import_data = import_data
+        self.command = import_data.Command(stdout=io.StringIO())
+        patcher = mock.patch.object(
+            mongomock.collection.Collection, 'aggregate',
+            _emulate_merge(mongomock.collection.Collection.aggregate),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.computed_at = datetime(2026, 1, 1)
+        self.db[import_data.REC_LIVE].insert_many(
+            [{'userId': 1, 'model': 'model1', 'recommendations': []}] +
+            [{'userId': user_id, 'model': 'live', 'computed_at': self.computed_at, 'recommendations': []}
+             for user_id in (1, 2)]
+        )
+        self.staging = self.db[import_data.REC_STAGING]
+        self.staging.insert_many([{'userId': user_id, 'model': 'model1'} for user_id in (1, 2, 3)])
+
+    def docs(self, name):
+        return sorted((doc['userId'], doc['model']) for doc in self.db[name].find())
+
+    def test_swap_carries_live_lists_and_keeps_previous(self):
+        self.command.swap_recommendations(self.db, self.staging, 3)
+
+        self.assertEqual(self.docs(self.import_data.REC_LIVE), [
+            (1, 'live'), (1, 'model1'), (2, 'live'), (2, 'model1'), (3, 'model1'),
+        ])
+        self.assertEqual(self.docs(self.import_data.REC_PREVIOUS), [(1, 'live'), (1, 'model1'), (2, 'live')])
+        self.assertNotIn(self.import_data.REC_STAGING, self.db.list_collection_names())
+
+    def test_swap_drops_live_lists_older_than_the_latest_rating(self):
+        self.db['user_ratings'].insert_many([
+            {'userId': 1, 'movieId': 5, 'score': 4.0, 'updated_at': self.computed_at - timedelta(hours=1)},
+            {'userId': 2, 'movieId': 5, 'score': 4.0, 'updated_at': self.computed_at + timedelta(hours=1)},
+        ])
+        self.command.swap_recommendations(self.db, self.staging, 3)
+
+        live_users = [doc['userId'] for doc in self.db[self.import_data.REC_LIVE].find({'model': 'live'})]
+        self.assertEqual(live_users, [1])
+
+    def test_failed_validation_leaves_live_untouched(self):
+        before = self.docs(self.import_data.REC_LIVE)
+        with self.assertRaises(self.import_data.CommandError):
+            self.command.swap_recommendations(self.db, self.staging, 5)
+
+        self.assertEqual(self.docs(self.import_data.REC_LIVE), before)
+        self.assertNotIn(self.import_data.REC_STAGING, self.db.list_collection_names())
+
+    def test_rollback_restores_previous_generation(self):
+        before = self.docs(self.import_data.REC_LIVE)
+        self.command.swap_recommendations(self.db, self.staging, 3)
+        self.command.rollback_recommendations()
+
+        self.assertEqual(self.docs(self.import_data.REC_LIVE), before)
+        self.assertEqual(counters.get()['recommendations_total'], len(before))
+
+
+@skipUnless(mongomock, 'mongomock is not installed')
+class CountersTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db['movies'].insert_many([
+            {'movieId': movie_id, 'title': f'Movie {movie_id}', 'budget': movie_id * 10,
+             'revenue': movie_id * 25 if movie_id % 2 else 0, 'vote_average': movie_id % 10}
+            for movie_id in range(1, 21)
+        ])
+        self.db['user_recommendations'].insert_many([
+            {'userId': user_id, 'model': model, 'recommendations': []}
+            for user_id in (100, 101) for model in ('model1', 'live')
+        ])
+
+    def assertNoDrift(self):
+        drift = {
+            field: (stored, actual)
+            for field, (stored, actual) in counters.reconcile(dry_run=True).items()
+            if stored != actual
+        }
+        self.assertEqual(drift, {})
+
+    def test_get_builds_missing_document(self):
+        stats = counters.get()
+        self.assertEqual(stats['movies_total'], 20)
+        self.assertEqual(stats['movies_with_revenue'], 10)
+        self.assertEqual(stats['recommendations_users'], 2)
+        self.assertIsNotNone(self.db['stats_counters'].find_one({'_id': counters.COUNTERS_ID}))
+
+    def test_write_paths_keep_counters_exact(self):
+        counters.get()
+        MovieService.create_movie({'movieId': 500, 'title': 'New', 'budget': 100, 'revenue': 50, 'vote_average': 7.5})
+        MovieService.update_movie(500, {'revenue': 0, 'budget': 40})
+        MovieService.update_movie(7, {'vote_average': 0})
+        MovieService.delete_movie(3)
+        for user_id, movie_id, score in [(100, 1, 4.0), (100, 2, 3.0), (102, 1, 5.0), (100, 1, 2.0)]:
+            MovieService.add_user_rating(user_id, movie_id, score)
+
+        stats = counters.get()
+        self.assertEqual(stats['ratings_total'], 3)
+        self.assertEqual(stats['ratings_score_sum'], 10.0)
+        self.assertEqual(stats['ratings_users'], 2)
+        self.assertEqual(stats['ratings_movies'], 2)
+        # Rating invalidated user 100's live list
+        self.assertEqual(stats['recommendations_total'], 3)
+        self.assertNoDrift()
+
+    def test_user_signals_track_totals_and_admins(self):
+        counters.get()
+        User = get_user_model()
+        user = User.objects.create_user('viewer', password='pw')
+        User.objects.create_user('boss', password='pw', role='admin')
+        user.role = 'admin'
+        user.save()
+        User.objects.get(username='boss').delete()
+
+        stats = counters.get()
+        self.assertEqual((stats['users_total'], stats['users_admin']), (1, 1))
+        self.assertNoDrift()
+
+    def test_counter_failures_do_not_fail_the_write(self):
+        counters.get()
+        with mock.patch.object(counters, '_inc', side_effect=PyMongoError('down')), \
+                mock.patch('builtins.print'):
+            MovieService.add_user_rating(100, 1, 4.0)
+
+        self.assertEqual(self.db['user_ratings'].count_documents({'userId': 100}), 1)
+        counters.reconcile()
+        self.assertEqual(counters.get()['ratings_total'], 1)
+
+
+class ResolveProjectionTests(TestCase):
+    def test_named_list_and_dict_projections(self):
+        self.assertIsNone(resolve_projection(None))
+        self.assertEqual(resolve_projection('card'), MOVIE_PROJECTIONS['card'])
+        self.assertEqual(resolve_projection(['title', 'genres']), {'title': 1, 'genres': 1})
+        self.assertEqual(resolve_projection({'title': 1}), {'title': 1})
+
+    def test_required_fields_join_inclusion_projections_only(self):
+        self.assertEqual(resolve_projection(['title'], 'movieId'), {'title': 1, 'movieId': 1})
+        self.assertEqual(resolve_projection({'description': 0}, 'movieId'), {'description': 0})
+        self.assertEqual(resolve_projection({'_id': 1, 'title': 0}, 'movieId'), {'_id': 1, 'title': 0})
+
+    def test_named_projection_is_not_mutated(self):
+        projection = resolve_projection('card', 'vote_average')
+        self.assertEqual(projection['vote_average'], 1)
+        self.assertNotIn('vote_average', MOVIE_PROJECTIONS['card'])
+
+    def test_card_description_is_truncated_only_when_a_string(self):
+        condition, truncated, otherwise = MOVIE_PROJECTIONS['card']['description']['$cond']
+        self.assertEqual(condition, {'$eq': [{'$type': '$description'}, 'string']})
+        self.assertIn('$substrCP', truncated)
+        self.assertEqual(otherwise, '$$REMOVE')
+
+    @skipUnless(mongomock, 'mongomock is not installed')
+    def test_list_projection_limits_returned_fields(self):
+        db.use_database(mongomock.MongoClient()['watchwish_test'])
+        db.get_movies_collection().insert_one({'movieId': 1, 'title': 'A', 'genres': 'Drama', 'budget': 5})
+        movies = MovieService.get_all_movies(projection=['title'])
+        self.assertEqual([sorted(movie) for movie in movies], [['_id', 'title']])
+
+
+class JsonlRangeTests(TestCase):
+    def setUp(self):
+        from .management.commands.import_data import _parse_jsonl_range
+        self.parse = _parse_jsonl_range
+        lines = [json.dumps({'userId': user_id, 'recommendations': [{'movieId': 1}] * (user_id % 4)})
+                 for user_id in range(40)]
+        lines.insert(17, '{not json')
+        lines.insert(30, '')
+        fd, self.path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        self.addCleanup(os.remove, self.path)
+        self.size = os.path.getsize(self.path)
+
+    def test_every_line_lands_in_exactly_one_range(self):
+        for chunk in (1, 7, 64, 500, self.size):
+            user_ids, bad = [], 0
+            for start in range(0, self.size, chunk):
+                model, docs, skipped = self.parse(self.path, start, min(start + chunk, self.size), 'model1')
+                user_ids.extend(doc['userId'] for doc in docs)
+                bad += skipped
+                self.assertTrue(all(doc['model'] == 'model1' and doc['content_hash'] for doc in docs))
+            self.assertEqual(user_ids, list(range(40)), f'chunk {chunk}')
+            self.assertEqual(bad, 1, f'chunk {chunk}')
+
+
+class SeenIdsTests(TestCase):
+    def test_dedupes_across_bitmap_and_overflow_ids(self):
+        from .management.commands.load_movie_data import _SeenIds
+        seen = _SeenIds()
+        ids = [0, 5, -5, 2 ** 24 - 1, 2 ** 24, 2 ** 40, -1]
+        self.assertTrue(all(seen.add(movie_id) for movie_id in ids))
+        self.assertFalse(any(seen.add(movie_id) for movie_id in ids))
+        self.assertTrue(seen.add(6))
+        self.assertLessEqual(len(seen._bits), _SeenIds.BITMAP_MAX // 8)
+
 
-# Create your tests here.
+class RoutingTests(TestCase):
+    def test_rate_route_is_not_captured_by_the_movie_detail_api(self):
+        from django.urls import resolve
+        from . import views
+        self.assertIs(resolve('/api/movies/rate/').func, views.rate_movie)
+        self.assertIsNot(resolve('/api/movies/42/').func, views.rate_movie)
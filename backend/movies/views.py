@@ -1,14 +1,11 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 import json
 
-# ── Module-level cache for audience profile data (loaded once) ──
-_audience_cache = {}  # genre -> {'age': [...], 'gender': [...], 'occupation': [...]}
-_audience_cache_loaded = False
-from .services import MovieService
-from .decorators import admin_required
+from .services import MovieService, MOVIE_PROJECTIONS
+from .decorators import admin_required, is_admin
+from .responses import json_response
 
 def index(request):
     movie_title = request.GET.get('movie', '').strip()
@@ -20,14 +17,14 @@ def index(request):
         searched_movie = MovieService.get_movie_by_title(movie_title)
         if searched_movie:
             searched_movie['genre_list'] = searched_movie['genres'].split('|')
-            recommendations = MovieService.get_recommendations(movie_title, limit=12)
+            recommendations = MovieService.get_recommendations(movie_title, limit=12, projection='card')
             for rec in recommendations:
                 rec['genre_list'] = rec['genres'].split('|')
         else:
             error = f"Movie '{movie_title}' not found in our database."
     else:
         import random
-        all_movies = MovieService.get_all_movies(limit=200)
+        all_movies = MovieService.get_all_movies(limit=200, projection='card')
         if all_movies:
             recommendations = random.sample(all_movies, min(len(all_movies), 20))
             for rec in recommendations:
@@ -46,19 +43,28 @@ def create_movie(request):
     try:
         data = json.loads(request.body)
         movie_id = MovieService.create_movie(data)
-        return JsonResponse({'id': movie_id, 'message': 'Movie created successfully'}, status=201)
+        return json_response({'id': movie_id, 'message': 'Movie created successfully'}, status=201)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+        return json_response({'error': str(e)}, status=400)
 
 @require_http_methods(["GET"])
 def get_movie(request, movie_id):
     try:
         movie = MovieService.get_movie(movie_id)
         if movie:
-            return JsonResponse(movie)
-        return JsonResponse({'error': 'Movie not found'}, status=404)
+            return json_response(movie)
+        return json_response({'error': 'Movie not found'}, status=404)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+        return json_response({'error': str(e)}, status=400)
+
+def fields_projection(request):
+    # ?fields=card or ?fields=title,genres,poster_url
+    fields = request.GET.get('fields', '').strip()
+    if fields in MOVIE_PROJECTIONS:
+        return fields
+    if fields:
+        return [field.strip() for field in fields.split(',') if field.strip()]
+    return None
 
 @require_http_methods(["GET"])
 def list_movies(request):
@@ -67,17 +73,18 @@ def list_movies(request):
         skip = int(request.GET.get('skip', 0))
         genre = request.GET.get('genre')
         search = request.GET.get('search')
+        projection = fields_projection(request)
         
         if search:
-            movies = MovieService.search_movies(search, limit)
+            movies = MovieService.search_movies(search, limit, projection=projection)
         elif genre:
-            movies = MovieService.get_movies_by_genre(genre, limit)
+            movies = MovieService.get_movies_by_genre(genre, limit, projection=projection)
         else:
-            movies = MovieService.get_all_movies(limit=limit, skip=skip)
+            movies = MovieService.get_all_movies(limit=limit, skip=skip, projection=projection)
         
-        return JsonResponse({'movies': movies, 'count': len(movies)})
+        return json_response({'movies': movies, 'count': len(movies)}, request=request)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+        return json_response({'error': str(e)}, status=400)
 
 @csrf_exempt
 @require_http_methods(["PUT"])
@@ -86,10 +93,10 @@ def update_movie(request, movie_id):
         data = json.loads(request.body)
         success = MovieService.update_movie(movie_id, data)
         if success:
-            return JsonResponse({'message': 'Movie updated successfully'})
-        return JsonResponse({'error': 'Movie not found'}, status=404)
+            return json_response({'message': 'Movie updated successfully'})
+        return json_response({'error': 'Movie not found'}, status=404)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+        return json_response({'error': str(e)}, status=400)
 
 @csrf_exempt
 @require_http_methods(["DELETE"])
@@ -97,10 +104,10 @@ def delete_movie(request, movie_id):
     try:
         success = MovieService.delete_movie(movie_id)
         if success:
-            return JsonResponse({'message': 'Movie deleted successfully'})
-        return JsonResponse({'error': 'Movie not found'}, status=404)
+            return json_response({'message': 'Movie deleted successfully'})
+        return json_response({'error': 'Movie not found'}, status=404)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+        return json_response({'error': str(e)}, status=400)
 
 from django.contrib.auth.decorators import login_required
 
@@ -122,7 +129,7 @@ def user_recommendations(request):
     if user_id:
         try:
             user_id_int = int(user_id)
-            recommendations = MovieService.get_user_recommendations(user_id_int, limit=10)
+            recommendations = MovieService.get_user_recommendations(user_id_int, limit=10, projection='card')
             if not recommendations:
                 error = f"No recommendations found yet. Rate some movies to get started!"
             else:
@@ -143,7 +150,7 @@ def user_recommendations(request):
 @require_http_methods(["POST"])
 def rate_movie(request):
     if not request.user.is_authenticated:
-         return JsonResponse({'error': 'Authentication required'}, status=401)
+         return json_response({'error': 'Authentication required'}, status=401)
          
     try:
         data = json.loads(request.body)
@@ -151,11 +158,11 @@ def rate_movie(request):
         score = data.get('score')
         
         if not movie_id or score is None:
-            return JsonResponse({'error': 'Missing movie_id or score'}, status=400)
+            return json_response({'error': 'Missing movie_id or score'}, status=400)
             
         # simple 1-5 scale.
         if float(score) < 1 or float(score) > 5:
-             return JsonResponse({'error': 'Score must be between 1 and 5'}, status=400)
+             return json_response({'error': 'Score must be between 1 and 5'}, status=400)
              
         # User ID Offset logic for consistency with user_recommendations
         # Django User ID 1 -> Rating User ID 1000001
@@ -163,11 +170,11 @@ def rate_movie(request):
         
         MovieService.add_user_rating(user_id, movie_id, float(score))
         
-        return JsonResponse({'status': 'success'})
+        return json_response({'status': 'success'})
     except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON format'}, status=400)
+        return json_response({'error': 'Invalid JSON format'}, status=400)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+        return json_response({'error': str(e)}, status=400)
 
 from django.contrib.auth import login, get_user_model
 from django.shortcuts import redirect
@@ -209,6 +216,120 @@ def signup(request):
         form = SignUpForm()
     return render(request, 'registration/signup.html', {'form': form})
 
+@require_http_methods(["GET"])
+def healthz_ready(request):
+    # Readiness probe: 503 until the eager model/CSV loads have finished
+    from . import readiness
+    ready = readiness.is_ready()
+    return json_response({
+        'status': 'ready' if ready else 'starting',
+        'mode': readiness.model_loading_mode(),
+        'components': readiness.snapshot(),
+    }, status=200 if ready else 503)
+
+def metrics(request):
+    # Prometheus scrape endpoint for this process's request/Mongo metrics.
+    # Closed unless the caller has the token, scrapes from an allowed
+    # address, or is an admin.
+    import hmac
+    import ipaddress
+    from django.conf import settings
+    from django.http import HttpResponse
+    from . import metrics as request_metrics
+    token = settings.METRICS_TOKEN
+    authorized = bool(token) and hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized and settings.METRICS_ALLOWED_NETWORKS:
+        try:
+            address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+            authorized = any(address in network for network in settings.METRICS_ALLOWED_NETWORKS)
+        except ValueError:
+            pass
+    if not authorized and not is_admin(request.user):
+        return HttpResponse(status=401 if token else 404)
+    return HttpResponse(request_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@admin_required
+def admin_profiles(request):
+    # Stored request profiles, newest first
+    from . import profiling
+    return json_response({'profiles': profiling.list_reports(int(request.GET.get('limit', 50)))})
+
+@admin_required
+def admin_profile(request, profile_id):
+    # One profile as JSON, or ?format=collapsed for flamegraph.pl/speedscope
+    from django.http import HttpResponse
+    from . import profiling
+    report = profiling.load(profile_id)
+    if report is None:
+        return json_response({'error': 'Profile not found'}, status=404)
+    if request.GET.get('format') == 'collapsed':
+        return HttpResponse(profiling.collapsed_text(report), content_type='text/plain; charset=utf-8')
+    return json_response(report)
+
+@csrf_exempt
+@admin_required
+@require_http_methods(["GET", "POST"])
+def admin_memory(request):
+    # Deep sizes of this process's caches, RSS and tracemalloc top
+    # allocators. POST {"action": "start" | "stop" | "snapshot", "name": ...}
+    # drives tracemalloc; GET ?diff=before[,after] compares snapshots.
+    from . import memory
+    try:
+        if request.method == 'POST':
+            data = json.loads(request.body or '{}')
+            action = data.get('action')
+            if action == 'start':
+                memory.start_tracing(int(data.get('frames', 1)))
+            elif action == 'stop':
+                memory.stop_tracing()
+            elif action == 'snapshot':
+                memory.take_snapshot(data.get('name') or 'default')
+            else:
+                return json_response({'error': f"Unknown action: {action}"}, status=400)
+            return json_response(memory.tracing_status())
+
+        top = int(request.GET.get('top', 20))
+        report = memory.report(top)
+        if request.GET.get('diff'):
+            before, _, after = request.GET['diff'].partition(',')
+            report['diff'] = memory.diff_snapshots(before, after or None, limit=top)
+        return json_response(report)
+    except ValueError as e:
+        return json_response({'error': str(e)}, status=400)
+
+@admin_required
+def admin_model_versions(request):
+    # Active artifact version and load time of each in-memory component
+    from . import artifacts
+    from .analytics import DashboardAnalytics, MLMovieAnalyzer
+    return json_response({
+        'current': artifacts.current_version() or artifacts.LEGACY_VERSION,
+        'available': artifacts.list_versions(),
+        'components': {
+            'ml_analyzer': MLMovieAnalyzer.describe(),
+            'dashboard_analytics': DashboardAnalytics.describe(),
+        },
+        'watcher': artifacts.watcher_status(),
+    })
+
+def external_links(movie):
+    imdb_url = None
+    tmdb_url = None
+    
+    if movie.get('imdbId'):
+        imdb_id = str(movie.get('imdbId')).zfill(7)
+        imdb_url = f"http://www.imdb.com/title/tt{imdb_id}/"
+    
+    if movie.get('tmdbId'):
+        try:
+            tmdb_id = str(int(float(movie.get('tmdbId'))))
+            tmdb_url = f"https://www.themoviedb.org/movie/{tmdb_id}"
+        except (ValueError, TypeError):
+            tmdb_url = None
+    
+    return imdb_url, tmdb_url
+
 def movie_detail(request, movie_id):
     movie = MovieService.get_movie(movie_id)
     
@@ -222,23 +343,11 @@ def movie_detail(request, movie_id):
     
     movie['genre_list'] = movie['genres'].split('|')
     
-    recommendations = MovieService.get_recommendations_by_movie_id(movie_id, limit=12)
+    recommendations = MovieService.get_recommendations_by_movie_id(movie_id, limit=12, projection='card')
     for rec in recommendations:
         rec['genre_list'] = rec['genres'].split('|')
     
-    imdb_url = None
-    tmdb_url = None
-    
-    if movie.get('imdbId'):
-        imdb_id = str(movie.get('imdbId')).zfill(7)
-        imdb_url = f"http://www.imdb.com/title/tt{imdb_id}/"
-    
-    if movie.get('tmdbId'):
-        try:
-            tmdb_id = str(int(float(movie.get('tmdbId'))))
-            tmdb_url = f"https://www.themoviedb.org/movie/{tmdb_id}"
-        except (ValueError, TypeError):
-            tmdb_url = None
+    imdb_url, tmdb_url = external_links(movie)
     
     return render(request, 'movie_detail.html', {
         'movie': movie,
@@ -249,39 +358,29 @@ def movie_detail(request, movie_id):
 
 @admin_required
 def admin_dashboard(request):
-    from .models import User
-    from .services import DashboardAnalytics
+    from . import counters
+    from .analytics import DashboardAnalytics
     
     kpis = DashboardAnalytics.get_financial_kpis()
     demographics = DashboardAnalytics.get_user_demographics()
+    stats = counters.get()
     
     if not kpis:
-        all_movies = MovieService.get_all_movies(limit=10000)
-        total_films = len(all_movies)
-        
-        genres_count = {}
-        for movie in all_movies:
-            if movie.get('genres'):
-                for genre in movie['genres'].split('|'):
-                    genre = genre.strip()
-                    if genre:
-                        genres_count[genre] = genres_count.get(genre, 0) + 1
-        
-        total_users = User.objects.count()
-        admin_users = User.objects.filter(role='admin').count()
+        total_users = stats['users_total']
+        admin_users = stats['users_admin']
         regular_users = total_users - admin_users
         
         context = {
-            'total_films': total_films,
+            'total_films': stats['movies_total'],
             'total_users': total_users,
             'admin_users': admin_users,
             'regular_users': regular_users,
-            'genres_count_json': json.dumps(genres_count),
-            'movies': all_movies[:10],
+            'genres_count_json': json.dumps(MovieService.get_genre_counts()),
+            'movies': MovieService.get_all_movies(limit=10),
         }
     else:
-        total_users = demographics.get('total_users', User.objects.count())
-        admin_users = User.objects.filter(role='admin').count()
+        total_users = demographics.get('total_users', stats['users_total'])
+        admin_users = stats['users_admin']
         regular_users = total_users - admin_users
         
         context = {
@@ -300,7 +399,7 @@ def admin_dashboard(request):
 @admin_required
 def admin_movies_list(request):
     import pandas as pd
-    from .services import DashboardAnalytics
+    from .analytics import DashboardAnalytics
     
     page = int(request.GET.get('page', 1))
     search = request.GET.get('search', '').strip().lower()
@@ -309,11 +408,10 @@ def admin_movies_list(request):
     skip = (page - 1) * limit
 
     # Try to use Films.csv data (has full financial data)
-    if DashboardAnalytics._films_df is None:
-        DashboardAnalytics.load_data()
+    films_df = DashboardAnalytics.current().get('films_df')
 
-    if DashboardAnalytics._films_df is not None:
-        df = DashboardAnalytics._films_df.copy()
+    if films_df is not None:
+        df = films_df.copy()
         if search:
             df = df[df['title'].str.lower().str.contains(search, na=False)]
         if genre:
@@ -341,12 +439,12 @@ def admin_movies_list(request):
                 'year': year,
                 'overview': str(row.get('description', '')),
             })
-        return JsonResponse({
+        return json_response({
             'movies': movies,
             'page': page,
             'total': total_count,
             'has_more': total_count > skip + limit
-        })
+        }, request=request)
 
     # Fallback to MongoDB
     if search:
@@ -361,18 +459,18 @@ def admin_movies_list(request):
     for movie in movies_page:
         movie['genre_list'] = movie.get('genres', '').split('|')
 
-    return JsonResponse({
+    return json_response({
         'movies': movies_page,
         'page': page,
         'total': total_count,
         'has_more': len(movies) > skip + limit
-    })
+    }, request=request)
 
 @admin_required
 @csrf_exempt
 def admin_dashboard_api(request):
-    from .models import User
-    from .services import DashboardAnalytics, MLMovieAnalyzer
+    from . import counters
+    from .analytics import DashboardAnalytics, MLMovieAnalyzer
     
     endpoint = request.GET.get('endpoint', '')
     
@@ -383,97 +481,23 @@ def admin_dashboard_api(request):
         kpis = DashboardAnalytics.get_financial_kpis()
         
         if not kpis:
-            all_movies = MovieService.get_all_movies(limit=10000)
-            
-            total_movies = len(all_movies)
-            total_revenue = 0
-            total_budget = 0
-            total_rating = 0
-            valid_revenue_count = 0
-            valid_rating_count = 0
-            valid_budget_count = 0
-            
-            for movie in all_movies:
-                if movie.get('revenue') and movie['revenue'] > 0:
-                    total_revenue += movie['revenue']
-                    valid_revenue_count += 1
-                if movie.get('budget') and movie['budget'] > 0:
-                    total_budget += movie['budget']
-                    valid_budget_count += 1
-                if movie.get('vote_average'):
-                    total_rating += movie['vote_average']
-                    valid_rating_count += 1
-            
-            avg_roi = (total_revenue / total_budget) if total_budget > 0 else 0
-            avg_rating = (total_rating / valid_rating_count) if valid_rating_count > 0 else 0
-            total_revenue_b = total_revenue / 1_000_000_000
-            
-            kpis = {
-                'total_movies': total_movies,
-                'total_revenue_b': round(total_revenue_b, 1),
-                'avg_roi': round(avg_roi, 1),
-                'avg_rating': round(avg_rating, 1)
-            }
+            kpis = MovieService.get_catalog_kpis()
         
-        return JsonResponse({
+        return json_response({
             'status': 'ok',
             'data': kpis
-        })
+        }, request=request)
     
     elif endpoint == 'genre_stats':
         stats = DashboardAnalytics.get_genre_statistics()
         
         if not stats:
-            all_movies = MovieService.get_all_movies(limit=10000)
-            
-            genre_data = {}
-            for movie in all_movies:
-                if movie.get('genres'):
-                    for genre in movie['genres'].split('|'):
-                        genre = genre.strip()
-                        if not genre:
-                            continue
-                        
-                        if genre not in genre_data:
-                            genre_data[genre] = {
-                                'genre': genre,
-                                'count': 0,
-                                'total_budget': 0,
-                                'total_revenue': 0,
-                                'budget_count': 0,
-                                'revenue_count': 0
-                            }
-                        
-                        genre_data[genre]['count'] += 1
-                        
-                        if movie.get('budget') and movie['budget'] > 0:
-                            genre_data[genre]['total_budget'] += movie['budget']
-                            genre_data[genre]['budget_count'] += 1
-                        
-                        if movie.get('revenue') and movie['revenue'] > 0:
-                            genre_data[genre]['total_revenue'] += movie['revenue']
-                            genre_data[genre]['revenue_count'] += 1
-            
-            stats = []
-            for genre, data in genre_data.items():
-                avg_budget = (data['total_budget'] / data['budget_count'] / 1_000_000) if data['budget_count'] > 0 else 0
-                avg_revenue = (data['total_revenue'] / data['revenue_count'] / 1_000_000) if data['revenue_count'] > 0 else 0
-                avg_roi = (data['total_revenue'] / data['total_budget']) if data['total_budget'] > 0 else 0
-                
-                stats.append({
-                    'genre': genre,
-                    'count': data['count'],
-                    'avg_budget': round(avg_budget, 0),
-                    'avg_revenue': round(avg_revenue, 0),
-                    'avg_roi': round(avg_roi, 1)
-                })
-            
-            stats.sort(key=lambda x: x['avg_roi'], reverse=True)
+            stats = MovieService.get_genre_financials()
         
-        return JsonResponse({
+        return json_response({
             'status': 'ok',
             'data': stats
-        })
+        }, request=request)
     
     elif endpoint == 'top_movies':
         limit = int(request.GET.get('limit', 10))
@@ -482,34 +506,12 @@ def admin_dashboard_api(request):
         top_movies = DashboardAnalytics.get_top_movies(limit=limit, genre=genre if genre else None)
         
         if not top_movies:
-            all_movies = MovieService.get_all_movies(limit=10000)
-            
-            valid_movies = []
-            for movie in all_movies:
-                if movie.get('budget') and movie['budget'] > 0 and movie.get('revenue') and movie['revenue'] > 0:
-                    if genre:
-                        if movie.get('genres') and genre in movie['genres']:
-                            valid_movies.append(movie)
-                    else:
-                        valid_movies.append(movie)
-            
-            for movie in valid_movies:
-                movie['roi'] = round(movie['revenue'] / movie['budget'], 1)
-                movie['budget_m'] = round(movie['budget'] / 1_000_000, 0)
-                movie['revenue_m'] = round(movie['revenue'] / 1_000_000, 0)
-                movie['vote_average'] = round(movie.get('vote_average', 0), 1)
-                if not movie.get('poster'):
-                    movie['poster'] = ''
-                if not movie.get('overview'):
-                    movie['overview'] = ''
-            
-            valid_movies.sort(key=lambda x: x['roi'], reverse=True)
-            top_movies = valid_movies[:limit]
+            top_movies = MovieService.get_top_movies_by_roi(limit=limit, genre=genre or None)
         
-        return JsonResponse({
+        return json_response({
             'status': 'ok',
             'data': top_movies
-        })
+        }, request=request)
     
     elif endpoint == 'simulate':
         try:
@@ -595,7 +597,7 @@ def admin_dashboard_api(request):
                             'overview': movie.get('overview', '')
                         })
             
-            return JsonResponse({
+            return json_response({
                 'status': 'ok',
                 'data': {
                     'viability': viability,
@@ -606,121 +608,45 @@ def admin_dashboard_api(request):
                     'audience_match': audience_match,
                     'similar_films': similar_films
                 }
-            })
+            }, request=request)
         except Exception as e:
             import traceback
             traceback.print_exc()
-            return JsonResponse({'error': str(e)}, status=400)
+            return json_response({'error': str(e)}, status=400)
     
     elif endpoint == 'stats':
-        all_movies = MovieService.get_all_movies(limit=10000)
-        
-        genres_count = {}
-        for movie in all_movies:
-            if movie.get('genres'):
-                for genre in movie['genres'].split('|'):
-                    genre = genre.strip()
-                    if genre:
-                        genres_count[genre] = genres_count.get(genre, 0) + 1
+        stats = counters.get()
         
-        total_users = User.objects.count()
-        
-        return JsonResponse({
-            'total_films': len(all_movies),
-            'total_users': total_users,
-            'genres': genres_count,
-            'movies': all_movies[:100]
-        })
+        return json_response({
+            'total_films': stats['movies_total'],
+            'total_users': stats['users_total'],
+            'genres': MovieService.get_genre_counts(),
+            'movies': MovieService.get_all_movies(limit=100)
+        }, request=request)
     
     elif endpoint == 'demographics':
         demographics = DashboardAnalytics.get_user_demographics()
         
         if not demographics:
-            total_users = User.objects.count()
             demographics = {
-                'total_users': total_users,
+                'total_users': counters.get()['users_total'],
                 'by_gender': {},
                 'by_age_group': {},
                 'by_occupation': {}
             }
         
-        return JsonResponse({
+        return json_response({
             'status': 'ok',
             'data': demographics
-        })
+        }, request=request)
 
     elif endpoint == 'audience_profile':
-        global _audience_cache, _audience_cache_loaded
         genre = request.GET.get('genre', '').strip()
         try:
-            import pandas as pd, os
-            from django.conf import settings
-
-            if not _audience_cache_loaded:
-                base_dir = settings.BASE_DIR
-                if hasattr(base_dir, 'parent'):
-                    base_dir = base_dir.parent
-                data_dir = os.path.join(base_dir, 'data', 'dashboard_data2')
-
-                users_df = pd.read_csv(os.path.join(data_dir, 'users.csv'))
-                films_df = pd.read_csv(os.path.join(data_dir, 'Films.csv'),
-                                       usecols=['movieId', 'genres'],
-                                       dtype={'movieId': str})
-                ratings_df = pd.read_csv(os.path.join(data_dir, 'ratings.csv'),
-                                         usecols=['userId', 'movieId'],
-                                         dtype={'userId': int, 'movieId': str})
-
-                films_df['movieId'] = films_df['movieId'].astype(str)
-                # Explode genres so each row = (movieId, single_genre)
-                films_df = films_df.dropna(subset=['genres'])
-                films_df = films_df.assign(genre=films_df['genres'].str.split('|')).explode('genre')
-                films_df['genre'] = films_df['genre'].str.strip()
-
-                # Build genre->userId mapping
-                merged = ratings_df.merge(films_df[['movieId', 'genre']], on='movieId', how='inner')
-                merged = merged.merge(users_df, on='userId', how='inner')
-
-                age_order = ['Under 18', '18-24', '25-34', '35-44', '45-49', '50-55', '56+']
-
-                def build_profile(df_sub):
-                    age_order = ['Under 18', '18-24', '25-34', '35-44', '45-49', '50-55', '56+']
-                    # Age grouped by gender
-                    age_gender = df_sub.groupby(['age_group', 'gender']).size().unstack(fill_value=0)
-                    age_data = []
-                    for ag in age_order:
-                        if ag in age_gender.index:
-                            row = age_gender.loc[ag]
-                            age_data.append({
-                                'label': ag,
-                                'male': int(row.get('Male', 0)),
-                                'female': int(row.get('Female', 0)),
-                            })
-                    # Gender totals
-                    gen_c = df_sub['gender'].value_counts()
-                    tot_g = gen_c.sum()
-                    gender_data = [{'label': g, 'count': int(c),
-                                    'pct': round(int(c) / tot_g * 100, 1)}
-                                   for g, c in gen_c.items()]
-                    # Occupations (top 10)
-                    occ_c = df_sub['occupation'].value_counts().head(10)
-                    occ_data = [{'label': o, 'count': int(c)} for o, c in occ_c.items()]
-                    return {'age': age_data, 'gender': gender_data,
-                            'occupation': occ_data, 'total_users': int(df_sub['userId'].nunique())}
-
-                # Pre-build all genres
-                for g in merged['genre'].unique():
-                    g_sub = merged[merged['genre'] == g]
-                    _audience_cache[g] = build_profile(g_sub)
-
-                # Also store overall (no genre filter)
-                _audience_cache['__all__'] = build_profile(merged)
-                _audience_cache_loaded = True
-
-            key = genre if genre in _audience_cache else '__all__'
-            data = _audience_cache.get(key, _audience_cache.get('__all__', {}))
-            return JsonResponse({'status': 'ok', 'data': data})
+            data = DashboardAnalytics.get_audience_profile(genre)
+            return json_response({'status': 'ok', 'data': data}, request=request)
         except Exception as e:
             import traceback; traceback.print_exc()
-            return JsonResponse({'status': 'error', 'error': str(e)}, status=500)
+            return json_response({'status': 'error', 'error': str(e)}, status=500)
 
-    return JsonResponse({'error': 'Invalid endpoint'}, status=400)
+    return json_response({'error': 'Invalid endpoint'}, status=400)
@@ -2,4 +2,17 @@
 
 python backend/manage.py makemigrations
 python backend/manage.py migrate
+
+# SERVER_MODE=production: gunicorn preloads the app and ML data in the master
+# and forks WEB_WORKERS workers sharing it copy-on-write (backend/config/gunicorn.conf.py)
+if [ "$SERVER_MODE" = "production" ]; then
+    exec gunicorn -c backend/config/gunicorn.conf.py
+fi
+
+# SERVER_MODE=asgi serves the async views with uvicorn; default is the dev server
+if [ "$SERVER_MODE" = "asgi" ]; then
+    exec uvicorn config.asgi:application --app-dir backend --host 0.0.0.0 --port 8000 \
+        --workers "${WEB_WORKERS:-1}" --no-access-log
+fi
+
 python backend/manage.py runserver 0.0.0.0:8000